@@ -1,6 +1,20 @@
+import heapq
+import time
+from collections import Counter
+from operator import itemgetter
+
+
 class AdaptiveBPE:
-    def __init__(self, initial_merges):
+    def __init__(self, initial_merges, top_k=10, frequency_threshold=5):
         self.merges = initial_merges
+        self.top_k = top_k
+        self.frequency_threshold = frequency_threshold
+
+        # Running statistics kept between reviews
+        self.token_frequencies = Counter()
+        self.pair_frequencies = {}
+        self._pending = Counter()
+        self.review_times = []
 
     def perform_merges(self, token_frequencies):
         # Analyze token frequencies to determine merge operations
@@ -17,15 +31,60 @@ class AdaptiveBPE:
                 else:
                     pair_frequencies[pair] = freq
 
-        # Sort pairs by frequency
-        sorted_pairs = sorted(
-            pair_frequencies.items(), key=lambda x: x[1], reverse=True
-        )
-
         # Update merges with top pairs
-        for pair, freq in sorted_pairs[:10]:  # Limit to top 10 pairs for example
+        self._merge_top_pairs(pair_frequencies, self.top_k)
+
+    def observe(self, token_counts):
+        """Queue token counts seen since the last review"""
+        self._pending.update(token_counts)
+
+    def review(self, top_k=None):
+        """Fold pending counts into the running statistics and merge the top pairs
+
+        Only tokens seen since the previous review are scanned, and the top
+        pairs are picked with a heap instead of sorting every pair. Returns the
+        tokens that crossed `frequency_threshold` during this window.
+        """
+        started = time.perf_counter()
+
+        frequent_tokens = []
+        pair_frequencies = self.pair_frequencies
+        for token, count in self._pending.items():
+            previous = self.token_frequencies[token]
+            total = previous + count
+            self.token_frequencies[token] = total
+            if previous <= self.frequency_threshold < total:
+                frequent_tokens.append(token)
+
+            for i in range(len(token) - 1):
+                pair = (token[i], token[i + 1])
+                if pair in pair_frequencies:
+                    pair_frequencies[pair] += count
+                else:
+                    pair_frequencies[pair] = count
+        self._pending = Counter()
+
+        self._merge_top_pairs(pair_frequencies, top_k or self.top_k)
+
+        self.review_times.append(time.perf_counter() - started)
+        return frequent_tokens
+
+    def _merge_top_pairs(self, pair_frequencies, top_k):
+        # nlargest keeps the same tie order as a stable descending sort
+        top_pairs = heapq.nlargest(top_k, pair_frequencies.items(), key=itemgetter(1))
+        for pair, freq in top_pairs:
             self.merges[pair] = "".join(pair)
             print(f"Merged pair {pair} with frequency {freq}")
 
+    def review_stats(self):
+        """How many reviews ran and how long they took"""
+        return {
+            "reviews": len(self.review_times),
+            "total_seconds": round(sum(self.review_times), 6),
+            "last_seconds": round(self.review_times[-1], 6) if self.review_times else 0,
+            "tracked_tokens": len(self.token_frequencies),
+            "tracked_pairs": len(self.pair_frequencies),
+        }
+
     def get_merges(self):
         return self.merges
@@ -0,0 +1,28 @@
+import re
+from typing import List
+
+# Character classes of the Devanagari block used to build aksharas
+_CONSONANT = r"[\u0915-\u0939\u0958-\u095F\u0978-\u097F]"
+_NUKTA = r"\u093C"
+_HALANT = r"\u094D"
+_JOINER = r"[\u200C\u200D]"
+_INDEPENDENT_VOWEL = r"[\u0904-\u0914\u0960\u0961\u0972-\u0977]"
+_MATRA = r"[\u093A\u093B\u093E-\u094C\u094E\u094F\u0955-\u0957\u0962\u0963]"
+_MODIFIER = r"[\u0900-\u0903\u0951-\u0954]"
+
+# One akshara (orthographic syllable): a consonant cluster joined by halants
+# with an optional trailing halant or matras, or an independent vowel, each
+# followed by any anusvara/chandrabindu/visarga. Anything else, such as a stray
+# matra, is a single-character akshara of its own.
+AKSHARA = re.compile(
+    rf"(?:{_CONSONANT}{_NUKTA}?{_HALANT}{_JOINER}?)*"
+    rf"{_CONSONANT}{_NUKTA}?(?:{_HALANT}{_JOINER}?|{_MATRA}*){_MODIFIER}*"
+    rf"|{_INDEPENDENT_VOWEL}{_NUKTA}?{_MATRA}*{_MODIFIER}*"
+    "|.",
+    re.DOTALL,
+)
+
+
+def segment(word: str) -> List[str]:
+    """Split a word into aksharas, e.g. "स्त्रीलिंग" -> ["स्त्री", "लिं", "ग"]"""
+    return AKSHARA.findall(word)
@@ -0,0 +1,316 @@
+import json
+import mmap
+import os
+import struct
+import zlib
+from typing import Tuple
+
+MAGIC = b"HBPEBIN1"
+# magic, source version, string count, merge count, string bytes, string hash
+# slots, pair hash slots, metadata bytes
+_HEADER = struct.Struct("=8s16sIIIIII")
+_EMPTY = -1
+_MERGE_HISTORY_TAIL = 10
+
+
+def _slot_count(n: int) -> int:
+    """Power of two with at most 50% load for n keys"""
+    slots = 8
+    while slots < 2 * n:
+        slots *= 2
+    return slots
+
+
+def _pair_hash(left: int, right: int, n_strings: int) -> int:
+    return ((left * n_strings + right) * 0x9E3779B1) & 0xFFFFFFFF
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def write_binary_model(tokenizer, version: str, path: str):
+    """Write a loaded tokenizer's serving data as an mmap-able binary model
+
+    The file holds a string table, a string -> id hash table, the vocabulary
+    flags, the token numbers and the merge (rank) table with its own pair hash
+    table. It is written to a temporary file and renamed, so processes that
+    still map the previous file keep a consistent view.
+    """
+    token_numbers = tokenizer.get_token_numbers()
+    strings = set(tokenizer.vocab) | set(token_numbers)
+    for pair, merged in tokenizer.merges.items():
+        strings.update(pair)
+        strings.add(merged)
+    strings = sorted(strings)
+    ids = {token: i for i, token in enumerate(strings)}
+    n_strings = len(strings)
+
+    encoded = [token.encode("utf-8") for token in strings]
+    offsets = [0]
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+
+    string_slots = [_EMPTY] * _slot_count(n_strings)
+    mask = len(string_slots) - 1
+    for index, data in enumerate(encoded):
+        slot = zlib.crc32(data) & mask
+        while string_slots[slot] != _EMPTY:
+            slot = (slot + 1) & mask
+        string_slots[slot] = index
+
+    in_vocab = bytes(token in tokenizer.vocab for token in strings)
+    numbers = [token_numbers.get(token, -1) for token in strings]
+
+    # Merges in rank order
+    lefts, rights, results = [], [], []
+    for (left, right), merged in tokenizer.merges.items():
+        lefts.append(ids[left])
+        rights.append(ids[right])
+        results.append(ids[merged])
+    pair_slots = [_EMPTY] * _slot_count(len(lefts))
+    pair_mask = len(pair_slots) - 1
+    for rank, (left, right) in enumerate(zip(lefts, rights)):
+        slot = _pair_hash(left, right, n_strings) & pair_mask
+        while pair_slots[slot] != _EMPTY:
+            slot = (slot + 1) & pair_mask
+        pair_slots[slot] = rank
+
+    meta = json.dumps(
+        {
+            "segmentation": tokenizer.segmentation,
+            "initial_symbols": sorted(tokenizer.initial_symbols),
+            "vocab_size": len(tokenizer.vocab),
+            "learned_vocab_size": len(tokenizer.learned_vocab),
+            "merge_history_tail": tokenizer.merge_history[-_MERGE_HISTORY_TAIL:],
+        },
+        ensure_ascii=False,
+    ).encode("utf-8")
+
+    sections = [
+        struct.pack(f"={len(offsets)}I", *offsets),
+        b"".join(encoded),
+        struct.pack(f"={len(string_slots)}i", *string_slots),
+        in_vocab,
+        struct.pack(f"={n_strings}i", *numbers),
+        struct.pack(f"={len(lefts)}i", *lefts),
+        struct.pack(f"={len(rights)}i", *rights),
+        struct.pack(f"={len(results)}i", *results),
+        struct.pack(f"={len(pair_slots)}i", *pair_slots),
+        meta,
+    ]
+    header = _HEADER.pack(
+        MAGIC,
+        version.encode("ascii"),
+        n_strings,
+        len(lefts),
+        offsets[-1],
+        len(string_slots),
+        len(pair_slots),
+        len(meta),
+    )
+
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        for section in sections:
+            f.write(b"\0" * (_align(f.tell()) - f.tell()))
+            f.write(section)
+    os.replace(tmp_path, path)
+
+
+def read_binary_version(path: str) -> str:
+    """Version of the JSON model a binary model was built from"""
+    with open(path, "rb") as f:
+        header = f.read(_HEADER.size)
+    if len(header) < _HEADER.size or header[:8] != MAGIC:
+        return None
+    return _HEADER.unpack(header)[1].rstrip(b"\0").decode("ascii")
+
+
+class BinaryModel:
+    """Read-only view of a binary model mapped into memory
+
+    Every worker process maps the same file, so the page cache holds one copy
+    of the tables no matter how many workers serve it. Lookups hash into the
+    mapped tables instead of building Python dicts.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic,
+            version,
+            self.n_strings,
+            self.n_merges,
+            string_bytes,
+            string_slots,
+            pair_slots,
+            meta_len,
+        ) = _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a binary BPE model")
+        self.version = version.rstrip(b"\0").decode("ascii")
+
+        view = memoryview(self._mmap)
+        offset = _HEADER.size
+
+        def section(size, fmt=None):
+            nonlocal offset
+            offset = _align(offset)
+            data = view[offset : offset + size]
+            offset += size
+            return data.cast(fmt) if fmt else data
+
+        self._offsets = section(4 * (self.n_strings + 1), "I")
+        self._blob = section(string_bytes)
+        self._string_slots = section(4 * string_slots, "i")
+        self._in_vocab = section(self.n_strings)
+        self._numbers = section(4 * self.n_strings, "i")
+        self._lefts = section(4 * self.n_merges, "i")
+        self._rights = section(4 * self.n_merges, "i")
+        self._results = section(4 * self.n_merges, "i")
+        self._pair_slots = section(4 * pair_slots, "i")
+        self.meta = json.loads(bytes(section(meta_len)).decode("utf-8"))
+
+        self._string_mask = string_slots - 1
+        self._pair_mask = pair_slots - 1
+
+        self.vocab = BinaryVocab(self)
+        self.merges = BinaryMerges(self)
+        self.token_numbers = BinaryTokenNumbers(self)
+
+    def string_id(self, token: str) -> int:
+        """Index of a token in the string table, -1 if it is not there"""
+        data = token.encode("utf-8")
+        slots = self._string_slots
+        offsets = self._offsets
+        blob = self._blob
+        mask = self._string_mask
+        slot = zlib.crc32(data) & mask
+        while True:
+            index = slots[slot]
+            if index == _EMPTY:
+                return -1
+            if blob[offsets[index] : offsets[index + 1]] == data:
+                return index
+            slot = (slot + 1) & mask
+
+    def string(self, index: int) -> str:
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return bytes(self._blob[start:end]).decode("utf-8")
+
+    def merge_rank(self, pair: Tuple[str, str]) -> int:
+        """Rank of a merge, -1 if the pair is not merged"""
+        left = self.string_id(pair[0])
+        if left < 0:
+            return -1
+        right = self.string_id(pair[1])
+        if right < 0:
+            return -1
+        slots = self._pair_slots
+        mask = self._pair_mask
+        slot = _pair_hash(left, right, self.n_strings) & mask
+        while True:
+            rank = slots[slot]
+            if rank == _EMPTY:
+                return -1
+            if self._lefts[rank] == left and self._rights[rank] == right:
+                return rank
+            slot = (slot + 1) & mask
+
+    def close(self):
+        for name in (
+            "_offsets",
+            "_blob",
+            "_string_slots",
+            "_in_vocab",
+            "_numbers",
+            "_lefts",
+            "_rights",
+            "_results",
+            "_pair_slots",
+        ):
+            getattr(self, name).release()
+        self._mmap.close()
+
+
+class BinaryVocab:
+    """Set-like vocabulary backed by a binary model"""
+
+    def __init__(self, model: BinaryModel):
+        self._model = model
+        self._size = model.meta["vocab_size"]
+
+    def __contains__(self, token) -> bool:
+        index = self._model.string_id(token)
+        return index >= 0 and self._model._in_vocab[index] == 1
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self):
+        model = self._model
+        for index in range(model.n_strings):
+            if model._in_vocab[index]:
+                yield model.string(index)
+
+
+class BinaryMerges:
+    """Dict-like pair -> merged token mapping backed by a binary model"""
+
+    def __init__(self, model: BinaryModel):
+        self._model = model
+
+    def __contains__(self, pair) -> bool:
+        return self._model.merge_rank(pair) >= 0
+
+    def __getitem__(self, pair) -> str:
+        rank = self._model.merge_rank(pair)
+        if rank < 0:
+            raise KeyError(pair)
+        return self._model.string(self._model._results[rank])
+
+    def get(self, pair, default=None):
+        rank = self._model.merge_rank(pair)
+        return default if rank < 0 else self._model.string(self._model._results[rank])
+
+    def __len__(self) -> int:
+        return self._model.n_merges
+
+    def items(self):
+        model = self._model
+        for rank in range(model.n_merges):
+            pair = (model.string(model._lefts[rank]), model.string(model._rights[rank]))
+            yield pair, model.string(model._results[rank])
+
+
+class BinaryTokenNumbers:
+    """Dict-like token -> id mapping backed by a binary model"""
+
+    def __init__(self, model: BinaryModel):
+        self._model = model
+
+    def get(self, token, default=None):
+        index = self._model.string_id(token)
+        if index < 0:
+            return default
+        number = self._model._numbers[index]
+        return default if number < 0 else number
+
+    def __getitem__(self, token) -> int:
+        number = self.get(token)
+        if number is None:
+            raise KeyError(token)
+        return number
+
+    def __contains__(self, token) -> bool:
+        return self.get(token) is not None
+
+    def __len__(self) -> int:
+        return len(self._model.vocab)
+
+    def values(self):
+        return (number for number in self._model._numbers if number >= 0)
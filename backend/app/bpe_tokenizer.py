@@ -1,39 +1,157 @@
+from array import array
 from collections import defaultdict, Counter
+from functools import lru_cache
+from itertools import accumulate, chain
+from operator import itemgetter
 from typing import Dict, List, Tuple, Set
 import json
+import re
 from .hindi_tokenizer import HindiTokenizer  # Import the base class
-from tqdm import tqdm
 import os
 import time
-import re
-from app.adaptive_bpe import AdaptiveBPE
+import unicodedata
+from app.akshara import segment as segment_aksharas
+from app.pretokenizer import (
+    DEVANAGARI_WORD,
+    devanagari_words,
+    normalize,
+    pretokenize,
+)
+from app.usage_sketch import ShardedUsageCounter, SpaceSaving
 import logging
 
-logging.basicConfig(
-    level=logging.ERROR, format="%(asctime)s - %(levelname)s - %(message)s"
-)
+logger = logging.getLogger(__name__)
+
+# Splits text into whitespace-separated words (the unit the encode caches are
+# keyed by) with the whitespace runs between them kept
+_WORD_GAPS = re.compile(r"(\s+)")
+
+# Ids reserved right after the vocabulary ids for characters outside the id
+# table: ASCII characters get their byte value, other non-Devanagari characters
+# one id per character class (from 128 on) and Devanagari characters (danda,
+# digits, nukta, ...) one id per code point (from 256 on)
+FALLBACK_IDS = 384
+FALLBACK_CLASSES = ("latin", "letter", "digit", "punct", "symbol", "other")
+
+
+@lru_cache(maxsize=4096)
+def fallback_offset(token: str):
+    """Offset of a token's reserved id in the fallback block, or None
+
+    Every single character has one; longer strings do not.
+    """
+    if len(token) != 1:
+        return None
+    if "\u0900" <= token <= "\u097f":
+        return 256 + ord(token) - 0x900
+    if token < "\x80":
+        return ord(token)
+    category = unicodedata.category(token)[0]
+    if category == "L":
+        kind = "latin" if token <= "\u024f" else "letter"
+    else:
+        kind = {"N": "digit", "P": "punct", "S": "symbol"}.get(category, "other")
+    return 128 + FALLBACK_CLASSES.index(kind)
+
+
+def _write_json_atomic(path: str, data):
+    """Write JSON to a temporary file and rename it over `path`
+
+    The model registry hot-reloads model files, so it must never see one
+    half-written.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
 
 
 class BPETokenizer(HindiTokenizer):
-    def __init__(self, vocab_size=5000):
+    SEGMENTATIONS = ("char", "akshara")
+    BACKENDS = ("python", "numpy")
+
+    def __init__(
+        self,
+        vocab_size=5000,
+        word_cache_size=65536,
+        pair_stats_capacity=10000,
+        segmentation="char",
+        backend="python",
+        min_count=1,
+        spill_below=0,
+        tail_pass_interval=100,
+    ):
         # Call parent class's __init__ first to initialize BASE_VOCAB
         HindiTokenizer.__init__(self)  # or super().__init__()
 
+        if segmentation not in self.SEGMENTATIONS:
+            raise ValueError(
+                f"Unknown segmentation {segmentation!r}, "
+                f"expected one of {self.SEGMENTATIONS}"
+            )
+        if backend not in self.BACKENDS:
+            raise ValueError(
+                f"Unknown backend {backend!r}, expected one of {self.BACKENDS}"
+            )
+
         # Initialize BPE-specific attributes
         self.vocab_size = vocab_size
+        # Symbols words are split into before merging: characters or aksharas
+        self.segmentation = segmentation
+        self.initial_symbols = set()  # Aksharas added to the vocab in akshara mode
+        # Pair counting/merging: dict loop ("python") or packed arrays ("numpy")
+        self.backend = backend
+        # Training words seen fewer than `min_count` times are dropped; those
+        # seen fewer than `spill_below` times are kept on disk (app.word_tiers)
+        # and folded into pair counts every `tail_pass_interval` merges
+        self.min_count = min_count
+        self.spill_below = spill_below
+        self.tail_pass_interval = tail_pass_interval
         self.merges = {}  # Store merge operations
         self.vocab = set()  # Final vocabulary
         self.merge_history = []  # Track merge operations
-        self.token_usage = Counter()  # Track token usage
-        self.pair_frequencies = defaultdict(int)  # Track pair frequencies
+        self.token_usage = Counter()  # Track token usage during training
+        self.serving_usage = ShardedUsageCounter()  # Bounded usage from tokenization
+        # Bounded heavy-hitter view of pair frequencies seen during training
+        self.pair_frequencies = SpaceSaving(capacity=pair_stats_capacity)
         self.learned_vocab = set()  # Track learned tokens separately
+        self.token_numbers = None  # Token -> id, assigned on first use
+        self._fallback_base = None  # (token_numbers, first reserved id)
+        self.binary_model = None  # Shared mmap'd model when serving from one
+
+        # Per-word encode cache; cleared whenever vocab or merges change
+        self._encode_word = lru_cache(maxsize=word_cache_size)(
+            self._encode_word_uncached
+        )
+        # Per-word token ids and relative offsets for tokenize_offsets
+        self._word_offsets = lru_cache(maxsize=word_cache_size)(
+            self._word_offsets_uncached
+        )
 
     def initialize_vocab(self):
         """Initialize vocabulary with basic Hindi characters"""
         self.vocab = self.BASE_VOCAB.copy()  # Now BASE_VOCAB will be available
         self.learned_vocab = set()  # Reset learned tokens
+        self.initial_symbols = set()
+        self.clear_encode_cache()
         return len(self.vocab)
 
+    def clear_encode_cache(self):
+        """Drop cached word encodings after the vocabulary or merges change"""
+        self._encode_word.cache_clear()
+        self._word_offsets.cache_clear()
+        self.token_numbers = None
+
+    def encode_cache_info(self):
+        """Hit/miss statistics of the per-word encode cache"""
+        return self._encode_word.cache_info()
+
+    def _segment(self, word: str) -> List[str]:
+        """Split a word into the initial symbols BPE merges start from"""
+        if self.segmentation == "akshara":
+            return segment_aksharas(word)
+        return list(word)
+
     def _get_pair_frequencies(self, word_freqs: Dict[str, int]) -> Dict[tuple, int]:
         """Count frequencies of adjacent pairs"""
         pairs = defaultdict(int)
@@ -42,11 +160,46 @@ class BPETokenizer(HindiTokenizer):
             for i in range(len(symbols) - 1):
                 pair = (symbols[i], symbols[i + 1])
                 pairs[pair] += freq
-                self.pair_frequencies[pair] += freq
         return pairs
 
-    async def learn_bpe(self, text: str, manager=None, resume_from: str = None):
-        """Learn BPE merge operations with real-time updates"""
+    @staticmethod
+    def _pair_deltas(previous: Dict[tuple, int], current: Dict[tuple, int]):
+        """Signed changes between two pair count snapshots, changed pairs only"""
+        deltas = {}
+        for pair, count in current.items():
+            change = count - previous.get(pair, 0)
+            if change:
+                deltas[pair] = change
+        for pair in previous.keys() - current.keys():
+            deltas[pair] = -previous[pair]
+        return deltas
+
+    async def learn_bpe(
+        self,
+        text: str,
+        manager=None,
+        resume_from: str = None,
+        profile: bool = False,
+        profile_dump: str = None,
+        on_checkpoint=None,
+    ):
+        """Learn BPE merge operations with real-time updates
+
+        With `profile=True` the time spent in each training phase and periodic
+        tracemalloc snapshots are recorded in `training_progress["profile"]`.
+        `profile_dump` ("cprofile" or "pyinstrument") also writes a profiler report.
+        `on_checkpoint(path, num_merges)` is called after every checkpoint save;
+        training stops early when it returns True (see app.evaluation).
+        The text is only read to count its words; the per-merge metrics come
+        from those counts, so the text can be dropped by the caller.
+        """
+        # Training-only dependencies, kept out of the serving import path
+        from tqdm import tqdm
+
+        from app.adaptive_bpe import AdaptiveBPE
+        from app.training_profiler import TrainingProfiler
+
+        profiler = TrainingProfiler(enabled=profile, dump=profile_dump)
         if resume_from and os.path.exists(resume_from):
             print(f"Resuming training from {resume_from}")
             self.load_model(resume_from)
@@ -54,6 +207,40 @@ class BPETokenizer(HindiTokenizer):
         else:
             initial_vocab_size = self.initialize_vocab()
 
+        profiler.start()
+        print("Preparing word frequencies...")
+        tiers = None
+        tail_pairs = Counter()
+        pending_tail_merges = []
+        if self.min_count > 1 or self.spill_below > 1:
+            from app.word_tiers import TieredWordFreqs
+
+            tiers = TieredWordFreqs(self.min_count, self.spill_below)
+        word_freqs = self._get_word_frequencies(text, tiers)
+        if tiers is not None:
+            tail_pairs = tiers.tail_pass([])
+            print(
+                f"Word tiers: {tiers.stats['hot_words']} in memory, "
+                f"{tiers.stats['tail_words']} on disk, "
+                f"{tiers.stats['pruned_words']} pruned (min_count={self.min_count})"
+            )
+        if self.segmentation == "akshara":
+            # Aksharas are the starting symbols, so they are part of the base vocab
+            self.initial_symbols.update(
+                symbol for word in word_freqs for symbol in word.split()
+            )
+            if tiers is not None:
+                self.initial_symbols.update(tiers.tail_symbols)
+            self.initial_symbols -= self.BASE_VOCAB
+            self.vocab.update(self.initial_symbols)
+            initial_vocab_size = len(self.vocab)
+            print(f"Akshara segmentation: {len(self.initial_symbols)} initial aksharas")
+        packed_corpus = None
+        if self.backend == "numpy":
+            from app.packed_corpus import PackedCorpus
+
+            packed_corpus = PackedCorpus(word_freqs)
+
         # Track vocabulary growth details
         self.vocab_growth = {
             "tokens": [],
@@ -66,6 +253,7 @@ class BPETokenizer(HindiTokenizer):
         # Track learning progress
         self.training_progress = {
             "base_vocab_stats": self.base_vocab_stats,
+            "segmentation": self.segmentation,
             "initial_vocab_size": initial_vocab_size,
             "target_vocab_size": self.vocab_size,
             "steps": [],
@@ -76,13 +264,27 @@ class BPETokenizer(HindiTokenizer):
                 "merge_frequencies": [],
                 "unique_tokens": [initial_vocab_size],
             },
+            "profile": profiler.summary(),
         }
 
-        print("Preparing word frequencies...")
-        word_freqs = self._get_word_frequencies(text)
         num_merges = 0
+        stop_early = False
+        previous_pairs = {}  # pair counts the sketch was last brought up to
+
+        # Adaptive review keeps running pair statistics between reviews
+        adaptive_bpe = AdaptiveBPE(self.merges)
+        # Token counts of the training words, kept current merge by merge for
+        # the progress metrics instead of re-tokenizing the text; the tail
+        # counts are as of its last pass
+        token_counts = Counter()
+        for word, freq in word_freqs.items():
+            for symbol in word.split():
+                token_counts[symbol] += freq
+        tail_tokens = tiers.tail_tokens if tiers is not None else Counter()
         original_char_count = sum(
-            len("".join(word.split())) * freq for word, freq in word_freqs.items()
+            len(token) * count
+            for counts in (token_counts, tail_tokens)
+            for token, count in counts.items()
         )
 
         print(f"\nInitial State:")
@@ -94,16 +296,30 @@ class BPETokenizer(HindiTokenizer):
         # print(f"  {key}: {value}")
 
         with tqdm(
-            total=self.vocab_size - initial_vocab_size, desc="Learning merges"
+            total=max(self.vocab_size - initial_vocab_size, 0), desc="Learning merges"
         ) as pbar:
             while len(self.vocab) < self.vocab_size:
-                pairs = self._get_pair_frequencies(word_freqs)
+                with profiler.phase("pair_counting"):
+                    if packed_corpus is None:
+                        pairs = self._get_pair_frequencies(word_freqs)
+                    else:
+                        pairs = packed_corpus.pair_frequencies()
+                    # Tail pair counts as of the last full pass
+                    for pair, freq in tail_pairs.items():
+                        pairs[pair] = pairs.get(pair, 0) + freq
+                    # A merge only changes the pairs around it, so the sketch
+                    # gets those changes rather than every pair again
+                    self.pair_frequencies.update(
+                        self._pair_deltas(previous_pairs, pairs)
+                    )
+                    previous_pairs = pairs
                 if not pairs:
                     print("\nNo more pairs to merge!")
                     break
 
                 # Get most frequent pair
-                best_pair = max(pairs.items(), key=lambda x: x[1])
+                with profiler.phase("best_pair_selection"):
+                    best_pair = max(pairs.items(), key=lambda x: x[1])
                 new_token = "".join(best_pair[0])
                 frequency = best_pair[1]
 
@@ -112,8 +328,12 @@ class BPETokenizer(HindiTokenizer):
                     break
 
                 # Track metrics
-                current_tokens = self.tokenize_bpe(text)
-                compression_ratio = original_char_count / len(current_tokens)
+                with profiler.phase("metrics"):
+                    # Adding the counters also drops tokens merged away
+                    current_counts = token_counts + tail_tokens
+                    compression_ratio = original_char_count / max(
+                        sum(current_counts.values()), 1
+                    )
 
                 # Add to learned vocabulary
                 self.learned_vocab.add(new_token)
@@ -129,13 +349,16 @@ class BPETokenizer(HindiTokenizer):
                     print(f"Compression ratio: {compression_ratio:.2f}")
 
                     # Show example usage
-                    example_words = []
-                    bigram = " ".join(best_pair[0])  # Fix: Define bigram here
-                    for word, freq in word_freqs.items():
-                        if bigram in word:
-                            example_words.append(word.replace(" ", ""))
-                            if len(example_words) >= 3:
-                                break
+                    if packed_corpus is None:
+                        example_words = []
+                        bigram = self._bigram_pattern(best_pair[0])
+                        for word, freq in word_freqs.items():
+                            if bigram.search(word):
+                                example_words.append(word.replace(" ", ""))
+                                if len(example_words) >= 3:
+                                    break
+                    else:
+                        example_words = packed_corpus.words_with_pair(best_pair[0], 3)
                     if example_words:
                         print("Example words:", ", ".join(example_words))
 
@@ -151,7 +374,7 @@ class BPETokenizer(HindiTokenizer):
                 )
                 self.training_progress["metrics"]["merge_frequencies"].append(frequency)
                 self.training_progress["metrics"]["unique_tokens"].append(
-                    len(set(current_tokens))
+                    len(current_counts)
                 )
 
                 # Track merge operation
@@ -165,21 +388,49 @@ class BPETokenizer(HindiTokenizer):
                     "compression_ratio": compression_ratio,
                     "example_words": example_words if num_merges % 100 == 0 else [],
                 }
+                if tiers is not None:
+                    merge_info["tail_frequency"] = tail_pairs.get(best_pair[0], 0)
                 self.merge_history.append(merge_info)
                 self.training_progress["steps"].append(merge_info)
 
                 # Add to vocabulary and merges
                 self.vocab.add(new_token)
                 self.merges[best_pair[0]] = new_token
+                self.clear_encode_cache()
 
                 # Update word frequencies with merged pair
-                word_freqs = self._apply_merge(word_freqs, best_pair[0])
+                with profiler.phase("merge_application"):
+                    if packed_corpus is None:
+                        word_freqs = self._apply_merge(
+                            word_freqs, best_pair[0], token_counts
+                        )
+                    else:
+                        merged = packed_corpus.apply_merge(best_pair[0])
+                        token_counts[best_pair[0][0]] -= merged
+                        token_counts[best_pair[0][1]] -= merged
+                        token_counts[new_token] += merged
+                    if tiers is not None:
+                        # The tail gets the merge on its next full pass
+                        pending_tail_merges.append(best_pair[0])
+                        tail_pairs.pop(best_pair[0], None)
                 num_merges += 1
+
+                if tiers is not None and num_merges % self.tail_pass_interval == 0:
+                    with profiler.phase("tail_pass"):
+                        tail_pairs = tiers.tail_pass(pending_tail_merges)
+                        tail_tokens = tiers.tail_tokens
+                        pending_tail_merges = []
                 pbar.update(1)
 
                 # Save checkpoint more frequently
                 if num_merges % 100 == 0:
-                    self._save_intermediate_vocab("bpe_model_latest.json")
+                    with profiler.phase("checkpoint_io"):
+                        self._save_intermediate_vocab("bpe_model_latest.json")
+                    if on_checkpoint is not None:
+                        with profiler.phase("evaluation"):
+                            stop_early = on_checkpoint(
+                                "bpe_model_latest.json", num_merges
+                            )
 
                 # Track vocabulary growth
                 self.vocab_growth["tokens"].append(new_token)
@@ -190,43 +441,64 @@ class BPETokenizer(HindiTokenizer):
 
                 # Adaptive BPE: Review and adjust merge operations based on token frequency
                 if num_merges % 50 == 0:  # Review every 50 merges
-                    print("\nReviewing vocabulary...")
-                    # Example logic: prioritize tokens with higher frequency
-                    frequent_tokens = [
-                        token for token, freq in self.token_usage.items() if freq > 5
-                    ]
-                    print(f"Frequent tokens: {frequent_tokens}")
-
-                    # Adjust merges based on frequency using AdaptiveBPE
-                    adaptive_bpe = AdaptiveBPE(self.merges)
-                    adaptive_bpe.perform_merges(self.token_usage)
-                    self.merges = adaptive_bpe.get_merges()
-
-                    # Update vocabulary with frequent tokens
-                    for token in frequent_tokens:
-                        if token not in self.vocab:
-                            self.vocab.add(token)
-                            print(f"Added {token} to vocabulary based on frequency.")
-
-                    # Save updated model
-                    self._save_intermediate_vocab("bpe_model_latest.json")
+                    with profiler.phase("adaptive_review"):
+                        print("\nReviewing vocabulary...")
+                        # Fold the token counts seen since the last review
+                        frequent_tokens = adaptive_bpe.review()
+                        print(f"Newly frequent tokens: {len(frequent_tokens)}")
+                        self.merges = adaptive_bpe.get_merges()
+
+                        # Update vocabulary with frequent tokens
+                        for token in frequent_tokens:
+                            if token not in self.vocab:
+                                self.vocab.add(token)
+                                print(f"Added {token} to vocabulary based on frequency.")
+
+                        # Save updated model
+                        self._save_intermediate_vocab("bpe_model_latest.json")
+                    self.training_progress["adaptive_review"] = (
+                        adaptive_bpe.review_stats()
+                    )
 
                 # Track token frequency for Devanagari tokens only
-                devanagari_pattern = re.compile(r"[\u0900-\u097F]+")
-                devanagari_tokens = [
-                    token
-                    for token in current_tokens
-                    if devanagari_pattern.fullmatch(token)
-                ]
-                self.token_usage.update(devanagari_tokens)
+                with profiler.phase("metrics"):
+                    devanagari_counts = Counter(
+                        {
+                            token: count
+                            for token, count in current_counts.items()
+                            if DEVANAGARI_WORD.fullmatch(token)
+                        }
+                    )
+                    self.token_usage.update(devanagari_counts)
+                    adaptive_bpe.observe(devanagari_counts)
 
                 # Save token frequencies periodically
                 if num_merges % 100 == 0:
-                    self.save_token_frequencies("token_frequencies.json")
+                    with profiler.phase("checkpoint_io"):
+                        self.save_token_frequencies("token_frequencies.json")
 
                 # Update vocabulary based on token frequencies and threshold
                 if num_merges % 100 == 0:
-                    self.update_vocabulary_based_on_frequency(threshold=5)
+                    with profiler.phase("checkpoint_io"):
+                        self.update_vocabulary_based_on_frequency(threshold=5)
+
+                profiler.snapshot_memory(num_merges)
+                if profiler.enabled and num_merges % 100 == 0:
+                    self.training_progress["profile"] = profiler.summary()
+
+                if stop_early:
+                    print("\nHeld-out metrics stopped improving, stopping early")
+                    break
+
+        profiler.stop()
+        self.training_progress["profile"] = profiler.summary()
+        self.clear_encode_cache()
+        if tiers is not None:
+            self.training_progress["pruning"] = tiers.report(self.merge_history)
+            tiers.close()
+        if profiler.enabled:
+            # Keep the final phase timings with the served checkpoint
+            self._save_intermediate_vocab("bpe_model_latest.json")
 
         print("\nFinal Training Summary:")
         print(f"Base vocabulary size: {len(self.BASE_VOCAB)}")
@@ -234,6 +506,12 @@ class BPETokenizer(HindiTokenizer):
         print(f"Total vocabulary size: {len(self.vocab)}")
         print(f"Total merge operations: {len(self.merge_history)}")
         print(f"Final compression ratio: {compression_ratio:.2f}")
+        if tiers is not None:
+            pruning = self.training_progress["pruning"]
+            print(
+                f"Tail share of merge frequencies: {pruning['tail_frequency_share']}, "
+                f"merges driven by the tail: {pruning['tail_merges']}"
+            )
 
         return self.training_progress
 
@@ -245,23 +523,29 @@ class BPETokenizer(HindiTokenizer):
             "merges": {" ".join(k): v for k, v in self.merges.items()},
             "merge_history": self.merge_history,
             "base_vocab_stats": self.base_vocab_stats,
+            "segmentation": self.segmentation,
+            "initial_symbols": sorted(self.initial_symbols),
             "training_stats": {
                 "total_merges": len(self.merge_history),
                 "vocab_size": len(self.vocab),
                 "learned_vocab_size": len(self.learned_vocab),
             },
         }
+        profile = getattr(self, "training_progress", {}).get("profile")
+        if profile is not None:
+            checkpoint_data["profile"] = profile
 
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(checkpoint_data, f, ensure_ascii=False, indent=2)
+        _write_json_atomic(filename, checkpoint_data)
 
         print(f"\nSaved checkpoint to {filename}")
 
     def assign_token_numbers(self):
         """Assign unique numbers to each token in the vocabulary"""
-        # Assign numbers to base vocabulary
-        self.token_numbers = {token: i + 1 for i, token in enumerate(self.BASE_VOCAB)}
-        logging.info("Base vocabulary token numbers: %s", self.token_numbers)
+        # Assign numbers to base vocabulary, in a fixed order so ids are stable
+        self.token_numbers = {
+            token: i + 1 for i, token in enumerate(sorted(self.BASE_VOCAB))
+        }
+        logger.info("Base vocabulary token numbers: %s", self.token_numbers)
 
         # Assign incremental numbers to the rest of the vocabulary
         current_number = len(self.BASE_VOCAB) + 1
@@ -274,7 +558,34 @@ class BPETokenizer(HindiTokenizer):
             if token not in self.token_numbers:
                 self.token_numbers[token] = current_number
                 current_number += 1
-        logging.info("Complete token numbers: %s", self.token_numbers)
+        logger.info("Complete token numbers: %s", self.token_numbers)
+
+    def get_token_numbers(self):
+        """Token -> id mapping, assigned once until the vocabulary changes"""
+        if self.token_numbers is None:
+            self.assign_token_numbers()
+        return self.token_numbers
+
+    def fallback_base(self) -> int:
+        """First of the FALLBACK_IDS reserved ids, right after the largest id"""
+        token_numbers = self.get_token_numbers()
+        if self._fallback_base is None or self._fallback_base[0] is not token_numbers:
+            base = max(token_numbers.values(), default=0) + 1
+            self._fallback_base = (token_numbers, base)
+        return self._fallback_base[1]
+
+    def token_id(self, token: str, unk_id: int = -1) -> int:
+        """Id of a token, a reserved fallback id, or `unk_id`
+
+        Single characters outside the id table (English, digits, punctuation,
+        symbols, Devanagari danda and digits) get a reserved id (see
+        fallback_offset); only longer strings outside the table are unknown.
+        """
+        token_id = self.get_token_numbers().get(token)
+        if token_id is not None:
+            return token_id
+        offset = fallback_offset(token)
+        return unk_id if offset is None else self.fallback_base() + offset
 
     def tokenize_with_details(self, text: str) -> Dict:
         """Tokenize text and provide detailed analysis"""
@@ -282,7 +593,7 @@ class BPETokenizer(HindiTokenizer):
         bpe_tokens = self.tokenize_bpe(text)  # BPE tokenization
 
         # Update token usage statistics
-        self.token_usage.update(bpe_tokens)
+        self.serving_usage.update(bpe_tokens)
 
         # Calculate original character count as byte length
         original_char_count = len(list(map(int, text.encode("utf-8"))))
@@ -298,9 +609,6 @@ class BPETokenizer(HindiTokenizer):
         ]
         bpe_char_count = len(original_encoded_tokens)
 
-        # Assign token numbers
-        self.assign_token_numbers()
-
         # Calculate compression ratio correctly
         compression_ratio = (
             round(original_char_count / len(bpe_tokens), 2)
@@ -314,9 +622,7 @@ class BPETokenizer(HindiTokenizer):
             "original_encoded_tokens": original_encoded_tokens,  # Ensure this is included
             "bpe_tokens": bpe_tokens,
             "bpe_encoded_tokens": bpe_encoded_tokens,
-            "token_numbers": [
-                self.token_numbers.get(token, -1) for token in bpe_tokens
-            ],
+            "token_numbers": [self.token_id(token) for token in bpe_tokens],
             "stats": {
                 "original_chars": original_char_count,
                 "original_token_count": original_char_count,
@@ -327,7 +633,7 @@ class BPETokenizer(HindiTokenizer):
             "token_details": [
                 {
                     "token": token,
-                    "frequency": self.token_usage[token],
+                    "frequency": self.serving_usage.estimate(token),
                     "length": len(token),
                     "type": self._get_token_type(token),
                 }
@@ -335,97 +641,207 @@ class BPETokenizer(HindiTokenizer):
             ],
         }
 
-    def _get_word_frequencies(self, text: str) -> Dict[str, int]:
-        """Get word frequencies from text with proper character-level splitting"""
-        # Define a regex pattern to match only Devanagari characters
-        devanagari_pattern = re.compile(r"[\u0900-\u097F]+")
+    def tokenize_offsets(self, text: str) -> Dict:
+        """Token ids with character and UTF-8 byte offsets as flat arrays
+
+        A compact alternative to `tokenize_with_details` that fills int32
+        `array` columns instead of building objects per character and token.
+        Token `i` spans `starts[i]:ends[i]` of the NFC-normalised text and
+        `byte_starts[i]:byte_ends[i]` of its UTF-8 encoding; the normalised
+        text is `text` itself unless `normalized` is True. Tokens outside the
+        id table get -1, as in `tokenize_with_details`.
+        """
+        normalized = normalize(text)
+        body = normalized.strip()
+        if body:
+            # Words and the whitespace between them, each looked up in the cache
+            parts = list(map(self._word_offsets, _WORD_GAPS.split(body)))
+            lead = normalized[: len(normalized) - len(normalized.lstrip())]
+            # After the leading whitespace, the running sums of the steps are
+            # start, end, start, end, ... of every token
+            char_steps = chain(
+                (len(lead),), chain.from_iterable(map(itemgetter(1), parts))
+            )
+            byte_steps = chain(
+                (len(lead.encode("utf-8")),),
+                chain.from_iterable(map(itemgetter(2), parts)),
+            )
+            ids = chain.from_iterable(map(itemgetter(0), parts))
+        else:
+            ids = char_steps = byte_steps = ()
+        # Filling an array from a list is much faster than from an iterator
+        char_offsets = array("i", list(accumulate(char_steps)))
+        byte_offsets = array("i", list(accumulate(byte_steps)))
+        ids = array("i", list(ids))
+        return {
+            "ids": ids,
+            "starts": char_offsets[0::2],
+            "ends": char_offsets[1::2],
+            "byte_starts": byte_offsets[0::2],
+            "byte_ends": byte_offsets[1::2],
+            "normalized": normalized != text,
+            "chars": len(normalized),
+            "bytes": len(normalized.encode("utf-8")),
+            "token_count": len(ids),
+        }
+
+    def _word_offsets_uncached(self, word: str):
+        """(ids, char steps, byte steps) of one word or whitespace gap
+
+        A word's steps alternate token length and the gap to its next token
+        (always 0, tokens cover the word); a gap has its length as its only
+        step, which moves the running sum to the start of the next word.
+        """
+        if word.isspace():
+            return (), (len(word),), (len(word.encode("utf-8")),)
+        tokens = self._encode_word(word)
+        char_steps = []
+        byte_steps = []
+        for token in tokens:
+            char_steps += (0, len(token))
+            byte_steps += (0, len(token.encode("utf-8")))
+        ids = tuple(self.token_id(token) for token in tokens)
+        return ids, tuple(char_steps[1:]), tuple(byte_steps[1:])
+
+    def encode_ids(self, text: str, unk_id: int = 0) -> List[int]:
+        """Token ids of a text; tokens without any id (see token_id) get `unk_id`
+
+        Ids come from the per-word cache that tokenize_offsets uses.
+        """
+        ids = chain.from_iterable(
+            map(itemgetter(0), map(self._word_offsets, text.split()))
+        )
+        return [unk_id if token_id < 0 else token_id for token_id in ids]
+
+    def count_tokens(self, text: str) -> int:
+        """Number of BPE tokens in `text`, without building the token list
+
+        Words go through the same per-word encode cache as `tokenize_bpe`, so
+        counting and encoding share cached words.
+        """
+        return sum(map(len, map(self._encode_word, text.split())))
+
+    def count_tokens_batch(self, texts: List[str]) -> List[int]:
+        """`count_tokens` of every text"""
+        return [self.count_tokens(text) for text in texts]
+
+    def _get_word_frequencies(self, text: str, tiers=None) -> Dict[str, int]:
+        """Get word frequencies from text with proper character-level splitting
 
-        # Split text into words and filter out non-Devanagari words
-        words = text.split()
-        filtered_words = [word for word in words if devanagari_pattern.fullmatch(word)]
+        With `tiers` (app.word_tiers.TieredWordFreqs) rare words are pruned or
+        spilled to disk and only the frequent ones are returned.
+        """
+        # Pre-tokenize and keep only Devanagari words
+        filtered_words = devanagari_words(text)
+        if tiers is not None:
+            return tiers.count(" ".join(self._segment(word)) for word in filtered_words)
 
-        # Split each word into space-separated characters for BPE
+        # Split each word into space-separated initial symbols for BPE
         word_freqs = Counter()
         for word in filtered_words:
-            # Convert word to space-separated characters
-            char_seq = " ".join(list(word))
+            # Convert word to space-separated characters or aksharas
+            char_seq = " ".join(self._segment(word))
             word_freqs[char_seq] += 1
 
         return word_freqs
 
+    @staticmethod
+    def _bigram_pattern(pair: Tuple[str, str]):
+        """Match the pair only as two whole space-separated symbols"""
+        return re.compile(r"(?<!\S)" + re.escape(" ".join(pair)) + r"(?!\S)")
+
     def _apply_merge(
-        self, word_freqs: Dict[str, int], pair: Tuple[str, str]
+        self,
+        word_freqs: Dict[str, int],
+        pair: Tuple[str, str],
+        token_counts: Counter = None,
     ) -> Dict[str, int]:
-        """Apply a merge operation to all words"""
+        """Apply a merge operation to all words
+
+        With `token_counts` (token -> weighted count) the merged occurrences
+        are moved from the pair's symbols to the new token.
+        """
         new_word_freqs = {}
         bigram = " ".join(pair)  # Space between characters
+        pattern = self._bigram_pattern(pair)
         replacement = "".join(pair)  # No space in replacement
+        merged = 0
 
         for word, freq in word_freqs.items():
             if bigram in word:
-                new_word = word.replace(bigram, replacement)
+                new_word, count = pattern.subn(replacement, word)
                 new_word_freqs[new_word] = freq
+                merged += count * freq
             else:
                 new_word_freqs[word] = freq
 
+        if token_counts is not None:
+            token_counts[pair[0]] -= merged
+            token_counts[pair[1]] -= merged
+            token_counts[replacement] += merged
         return new_word_freqs
 
     def tokenize_bpe(self, text: str) -> List[str]:
         """Tokenize text using learned BPE merges"""
-        words = text.split()
         result = []
+        # Pre-tokens never span whitespace, so the cache is keyed by raw
+        # whitespace-separated words and repeated words skip pre-tokenization
+        for word in text.split():
+            result.extend(self._encode_word(word))
+        return result
 
-        for word in words:
-            # print(f"Processing word: {word}")  # Debug statement
-            # Check if the word is already in the vocabulary
-            if word in self.vocab:
-                # print(f"Word '{word}' is in the vocabulary.")  # Debug statement
-                result.append(word)
-                continue
-
-            # Start with character-level tokens
-            word_tokens = " ".join(list(word))  # Space-separated characters
-            # print(f"Initial tokens: {word_tokens}")  # Debug statement
-
-            # Apply merges iteratively
-            while True:
-                # Find possible pairs
-                pairs = [
-                    (pair[0], pair[1])
-                    for pair in zip(word_tokens.split()[:-1], word_tokens.split()[1:])
-                ]
-                # print(f"Possible pairs: {pairs}")  # Debug statement
-
-                # Check if any split tokens are in the vocabulary
-                split_tokens = word_tokens.split()
-                if all(token in self.vocab for token in split_tokens):
-                    # print(
-                    #     f"All split tokens are in the vocabulary: {split_tokens}"
-                    # )  # Debug statement
-                    result.extend(split_tokens)
-                    break
-
-                # Find first applicable merge
-                for pair in pairs:
-                    if pair in self.merges:
-                        new_token = self.merges[pair]
-                        bigram = " ".join(pair)
-                        word_tokens = word_tokens.replace(bigram, new_token)
-                        # print(
-                        #     f"Applied merge: {pair} -> {new_token}"
-                        # )  # Debug statement
-                        break
-                else:
-                    # No more merges possible
+    def _encode_word_uncached(self, word: str) -> Tuple[str, ...]:
+        """Pre-tokenize a whitespace-separated word and encode its pieces"""
+        tokens = []
+        for piece in pretokenize(word):
+            # Devanagari words, plus the Devanagari digits and danda
+            if "\u0900" <= piece[0] <= "\u097f" or piece[0] in "\u200c\u200d":
+                tokens.extend(self._apply_merges(piece))
+            elif piece in self.vocab:
+                tokens.append(piece)
+            else:
+                # Merges are only learned from Devanagari words, so numbers,
+                # punctuation and other scripts go straight to characters
+                tokens.extend(piece)
+        return tuple(tokens)
+
+    def _apply_merges(self, word: str) -> List[str]:
+        """Apply learned merges to a single pre-token"""
+        # Check if the word is already in the vocabulary
+        if word in self.vocab:
+            return [word]
+
+        # Start with character-level tokens, or aksharas in akshara mode
+        symbols = self._segment(word)
+        if self.segmentation == "akshara":
+            # Aksharas never seen in training fall back to their characters
+            symbols = [
+                part
+                for symbol in symbols
+                for part in ((symbol,) if symbol in self.vocab else symbol)
+            ]
+        word_tokens = " ".join(symbols)  # Space-separated symbols
+
+        # Apply merges iteratively
+        while True:
+            split_tokens = word_tokens.split()
+
+            # Stop once every split token is in the vocabulary
+            if all(token in self.vocab for token in split_tokens):
+                break
+
+            # Find first applicable merge
+            for pair in zip(split_tokens[:-1], split_tokens[1:]):
+                if pair in self.merges:
+                    new_token = self.merges[pair]
+                    bigram = " ".join(pair)
+                    word_tokens = word_tokens.replace(bigram, new_token)
                     break
+            else:
+                # No more merges possible
+                break
 
-            # Add final tokens
-            result.extend(word_tokens.split())
-            # print(
-            #     f"Final tokens for word '{word}': {word_tokens.split()}"
-            # )  # Debug statement
-
-        return result
+        return word_tokens.split()
 
     def load_model(self, model_file: str):
         """Load trained BPE model from file"""
@@ -436,20 +852,27 @@ class BPETokenizer(HindiTokenizer):
             self.vocab = set(model_data["vocab"])
             self.merges = {tuple(k.split()): v for k, v in model_data["merges"].items()}
             self.merge_history = model_data["merge_history"]
+            self.binary_model = None
+            self.segmentation = model_data.get("segmentation", "char")
+            self.initial_symbols = set(model_data.get("initial_symbols", []))
+            self.clear_encode_cache()
+            # Derived models (derive_models.py) carry rank-ordered token ids
+            self.token_numbers = model_data.get("token_numbers")
 
             # Initialize learned vocabulary
-            self.learned_vocab = set(self.vocab) - self.BASE_VOCAB
+            base_vocab = self.BASE_VOCAB | self.initial_symbols
+            self.learned_vocab = set(self.vocab) - base_vocab
 
             # Initialize training progress
             self.training_progress = {
                 "base_vocab_stats": self.base_vocab_stats,
-                "initial_vocab_size": len(self.BASE_VOCAB),
+                "segmentation": self.segmentation,
+                "initial_vocab_size": len(base_vocab),
                 "target_vocab_size": self.vocab_size,
                 "steps": self.merge_history,
                 "metrics": {
                     "vocab_sizes": [
-                        len(self.BASE_VOCAB) + i
-                        for i in range(len(self.merge_history) + 1)
+                        len(base_vocab) + i for i in range(len(self.merge_history) + 1)
                     ],
                     "learned_vocab_sizes": [
                         i for i in range(len(self.merge_history) + 1)
@@ -461,10 +884,19 @@ class BPETokenizer(HindiTokenizer):
                         m.get("frequency", 0) for m in self.merge_history
                     ],
                     "unique_tokens": [
-                        len(self.BASE_VOCAB) + i
-                        for i in range(len(self.merge_history) + 1)
+                        len(base_vocab) + i for i in range(len(self.merge_history) + 1)
                     ],
                 },
+                # Phase timings of a profiled training run (learn_bpe(profile=True))
+                "profile": model_data.get("profile"),
+            }
+            # Growth as recorded by learn_bpe, minus the merge timestamps
+            self.vocab_growth = {
+                "tokens": [m.get("new_token") for m in self.merge_history],
+                "frequencies": [m.get("frequency", 0) for m in self.merge_history],
+                "compositions": [list(m.get("pair", ())) for m in self.merge_history],
+                "merge_steps": [m.get("step") for m in self.merge_history],
+                "timestamps": [None] * len(self.merge_history),
             }
 
             print(f"Loaded model with vocabulary size: {len(self.vocab)}")
@@ -475,73 +907,112 @@ class BPETokenizer(HindiTokenizer):
             print(f"Error loading model: {str(e)}")
             return False
 
+    def load_binary_model(self, model_file: str):
+        """Serve from a binary model mapped read-only into memory
+
+        The vocabulary, merges and token numbers stay in the shared mapping
+        instead of being copied into this process, so any number of worker
+        processes share one copy. Only the last few merge history entries are
+        kept; the registry loads the JSON model for training progress
+        (ModelRegistry.progress_tokenizer).
+        """
+        from app.binary_model import BinaryModel
+
+        model = BinaryModel(model_file)
+        self.clear_encode_cache()
+        self.binary_model = model
+        self.vocab = model.vocab
+        self.merges = model.merges
+        self.token_numbers = model.token_numbers
+        self.segmentation = model.meta["segmentation"]
+        self.initial_symbols = set(model.meta["initial_symbols"])
+        self.merge_history = model.meta["merge_history_tail"]
+        self.learned_vocab = set()
+        print(f"Mapped binary model with vocabulary size: {len(self.vocab)}")
+        return True
+
+    def close(self):
+        """Unmap the binary model, if the tokenizer serves from one"""
+        if self.binary_model is not None:
+            self.binary_model.close()
+            self.binary_model = None
+
     def save_token_frequencies(self, filename: str):
         """Save token frequencies to a JSON file"""
         with open(filename, "w", encoding="utf-8") as f:
             json.dump(self.token_usage, f, ensure_ascii=False, indent=2)
         print(f"Token frequencies saved to {filename}")
 
-    def update_vocabulary_based_on_frequency(self, threshold: int):
-        """Update vocabulary based on token frequencies and a defined threshold"""
-        # Load token frequencies from JSON file
-        with open("token_frequencies.json", "r", encoding="utf-8") as f:
-            token_frequencies = json.load(f)
+    def update_vocabulary_based_on_frequency(
+        self, threshold: int, token_frequencies: Dict[str, int] = None
+    ):
+        """Update vocabulary based on token frequencies and a defined threshold
 
-        # Sort tokens by frequency
-        sorted_tokens = sorted(
-            token_frequencies.items(), key=lambda x: x[1], reverse=True
-        )
+        Uses the in-memory `token_usage` unless other frequencies are passed.
+        """
+        from app.vocab_selection import frequency_arrays, tokens_above_threshold
+
+        if token_frequencies is None:
+            token_frequencies = self.token_usage
+        tokens, freqs = frequency_arrays(token_frequencies)
 
         # Update vocabulary based on threshold
-        for token, freq in sorted_tokens:
-            if freq >= threshold:
-                if token not in self.vocab:
-                    self.vocab.add(token)
-                    print(f"Added {token} to vocabulary based on frequency {freq}.")
+        added = [
+            token
+            for token in tokens_above_threshold(tokens, freqs, threshold)
+            if token not in self.vocab
+        ]
+        if not added:
+            return
+
+        self.vocab.update(added)
+        self.clear_encode_cache()
+        print(f"Added {len(added)} tokens to vocabulary with frequency >= {threshold}.")
 
         # Save updated model
         self._save_intermediate_vocab("bpe_model_latest.json")
 
-    def update_bpe_model_from_frequencies(self, threshold: int):
+    def update_bpe_model_from_frequencies(self, threshold: int, top_k: int = 5000):
         """One-time update of BPE model using token frequencies"""
+        import numpy as np
+        from app.vocab_selection import (
+            frequency_arrays,
+            sort_indices_by_frequency,
+            top_k_tokens,
+        )
+
         # Load token frequencies from JSON file
         with open("token_frequencies.json", "r", encoding="utf-8") as f:
             token_frequencies = json.load(f)
-
-        # Sort tokens by frequency in descending order
-        sorted_tokens = sorted(
-            token_frequencies.items(), key=lambda x: x[1], reverse=True
-        )
-
-        # Clear existing vocabulary
-        updated_vocab = set()
+        tokens, freqs = frequency_arrays(token_frequencies)
 
         # Update vocabulary based on top 5000 most frequent tokens, skipping base vocabulary
-        top_tokens = [
-            token for token, freq in sorted_tokens if token not in self.BASE_VOCAB
-        ][:5000]
-        for token in top_tokens:
-            updated_vocab.add(token)
-            print(f"Added {token} to vocabulary based on frequency.")
+        top_tokens = top_k_tokens(tokens, freqs, top_k, exclude=self.BASE_VOCAB)
+        print(f"Selected {len(top_tokens)} tokens for the vocabulary based on frequency.")
 
         # Save updated model
         model_data = {
-            "vocab": list(updated_vocab),
+            "vocab": top_tokens,
             "merges": {},  # Clear merges as well
             "merge_history": [],
             "base_vocab_stats": {},
             "training_stats": {
                 "total_merges": 0,
-                "vocab_size": len(updated_vocab),
+                "vocab_size": len(top_tokens),
                 "learned_vocab_size": 0,
             },
         }
-        with open("bpe_model_latest.json", "w", encoding="utf-8") as f:
-            json.dump(model_data, f, ensure_ascii=False, indent=2)
+        _write_json_atomic("bpe_model_latest.json", model_data)
         print("Updated BPE model saved to bpe_model_latest.json")
 
-        # Save sorted token frequencies back to JSON file
-        sorted_token_frequencies = {token: freq for token, freq in sorted_tokens}
+        # Save sorted token frequencies back to JSON file, unless already sorted
+        if np.all(freqs[:-1] >= freqs[1:]):
+            print("Token frequencies already sorted")
+            return
+        order = sort_indices_by_frequency(freqs)
+        sorted_token_frequencies = dict(
+            zip(map(tokens.__getitem__, order.tolist()), freqs[order].tolist())
+        )
         with open("token_frequencies.json", "w", encoding="utf-8") as f:
             json.dump(sorted_token_frequencies, f, ensure_ascii=False, indent=2)
         print("Sorted token frequencies saved to token_frequencies.json")
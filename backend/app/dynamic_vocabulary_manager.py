@@ -7,5 +7,19 @@ class DynamicVocabularyManager:
             if freq > threshold:
                 self.vocabulary.add(token)
 
+    def promote(self, changed_frequencies, threshold):
+        """Add changed tokens that crossed the threshold and return them
+
+        Pass the output of TokenFrequencyTracker.get_delta() so the cost is
+        proportional to the batch rather than to the whole vocabulary.
+        """
+        promoted = [
+            token
+            for token, freq in changed_frequencies.items()
+            if freq > threshold and token not in self.vocabulary
+        ]
+        self.vocabulary.update(promoted)
+        return promoted
+
     def get_vocabulary(self):
         return self.vocabulary
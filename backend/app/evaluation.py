@@ -0,0 +1,255 @@
+import contextlib
+import io
+import multiprocessing
+import os
+import time
+from functools import lru_cache
+from typing import Dict, List
+
+from app.pretokenizer import pretokenize_with_kinds
+
+# Raw counts summed over batches; rates are derived from them in summarize()
+COUNT_FIELDS = (
+    "lines",
+    "words",
+    "chars",
+    "bytes",
+    "tokens",
+    "devanagari_words",
+    "devanagari_tokens",
+    "single_token_words",
+    "unk_tokens",
+    "fallback_tokens",
+)
+
+
+def load_tokenizer(model_path: str):
+    """Load a JSON or binary (.bin) model without the load messages"""
+    from app.bpe_tokenizer import BPETokenizer
+
+    tokenizer = BPETokenizer()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if model_path.endswith(".bin"):
+            tokenizer.load_binary_model(model_path)
+        else:
+            tokenizer.load_model(model_path)
+    return tokenizer
+
+
+def read_heldout(paths, max_lines: int = None) -> List[str]:
+    """Non-empty lines of the held-out files, at most `max_lines` of them"""
+    lines = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    lines.append(line)
+                    if max_lines and len(lines) >= max_lines:
+                        return lines
+    return lines
+
+
+class HeldOutCounter:
+    """Counts tokens, words and fallbacks of held-out text for one tokenizer
+
+    Words are encoded exactly like `tokenize_bpe` does, one pre-token at a
+    time; the statistics of each whitespace-separated word are cached, so the
+    many repeated words of natural text are only encoded once.
+    """
+
+    def __init__(self, tokenizer, cache_size: int = 65536):
+        self.tokenizer = tokenizer
+        self.initial_symbols = tokenizer.BASE_VOCAB | tokenizer.initial_symbols
+        self._word_stats = lru_cache(maxsize=cache_size)(self._word_stats_uncached)
+
+    def _word_stats_uncached(self, word: str):
+        """(counts, tokens in the vocabulary) of one whitespace-separated word"""
+        vocab = self.tokenizer.vocab
+        chars = num_bytes = tokens = 0
+        devanagari_words = devanagari_tokens = single_token_words = 0
+        unk_tokens = fallback_tokens = 0
+        used = set()
+        # The tokens of the real encode path; pre-tokens never span pieces, so
+        # each piece takes the tokens that add up to its length
+        word_tokens = iter(self.tokenizer._encode_word(word))
+        for piece, kind, _, _ in pretokenize_with_kinds(word):
+            piece_tokens = []
+            covered = 0
+            while covered < len(piece):
+                piece_tokens.append(next(word_tokens))
+                covered += len(piece_tokens[-1])
+            chars += len(piece)
+            num_bytes += len(piece.encode("utf-8"))
+            tokens += len(piece_tokens)
+            if kind == "devanagari":
+                devanagari_words += 1
+                devanagari_tokens += len(piece_tokens)
+                single_token_words += len(piece_tokens) == 1
+            for token in piece_tokens:
+                # Tokens with neither a vocabulary nor a reserved fallback id
+                if self.tokenizer.token_id(token) < 0:
+                    unk_tokens += 1
+                # Tokens no merge produced: initial symbols and bare characters
+                if len(token) == 1 or token in self.initial_symbols:
+                    fallback_tokens += 1
+                if token in vocab:
+                    used.add(token)
+        counts = (
+            1,
+            chars,
+            num_bytes,
+            tokens,
+            devanagari_words,
+            devanagari_tokens,
+            single_token_words,
+            unk_tokens,
+            fallback_tokens,
+        )
+        return counts, frozenset(used)
+
+    def count_lines(self, lines: List[str]):
+        """Summed counts of the lines and the set of vocabulary tokens they use"""
+        totals = [0] * len(COUNT_FIELDS)
+        totals[0] = len(lines)
+        used = set()
+        for line in lines:
+            for word in line.split():
+                counts, word_used = self._word_stats(word)
+                for i, value in enumerate(counts, start=1):
+                    totals[i] += value
+                used |= word_used
+        return dict(zip(COUNT_FIELDS, totals)), used
+
+
+def summarize(counts: Dict[str, int], used_tokens, vocab_size: int) -> Dict:
+    """Held-out metrics from raw counts"""
+
+    def ratio(numerator, denominator):
+        return round(numerator / denominator, 4) if denominator else 0.0
+
+    tokens = counts["tokens"]
+    return {
+        **counts,
+        "vocab_size": vocab_size,
+        "used_vocab": len(used_tokens),
+        "chars_per_token": ratio(counts["chars"], tokens),
+        "bytes_per_token": ratio(counts["bytes"], tokens),
+        "tokens_per_word": ratio(tokens, counts["words"]),
+        "devanagari_tokens_per_word": ratio(
+            counts["devanagari_tokens"], counts["devanagari_words"]
+        ),
+        "single_token_word_rate": ratio(
+            counts["single_token_words"], counts["devanagari_words"]
+        ),
+        "unk_rate": ratio(counts["unk_tokens"], tokens),
+        "fallback_rate": ratio(counts["fallback_tokens"], tokens),
+        "vocab_utilization": ratio(len(used_tokens), vocab_size),
+    }
+
+
+# Worker state: (model path, version, counter) of the model loaded last
+_worker_state = None
+
+
+def _worker_counter(model_path: str, version: str) -> HeldOutCounter:
+    global _worker_state
+    if _worker_state is None or _worker_state[:2] != (model_path, version):
+        counter = HeldOutCounter(load_tokenizer(model_path))
+        _worker_state = (model_path, version, counter)
+    return _worker_state[2]
+
+
+def _count_batch(task):
+    model_path, version, lines = task
+    counter = _worker_counter(model_path, version)
+    counts, used = counter.count_lines(lines)
+    return counts, used, len(counter.tokenizer.vocab)
+
+
+class HeldOutEvaluator:
+    """Evaluate model files on a fixed held-out sample in worker processes
+
+    Workers stay up between evaluations and reload a model only when its
+    version changes, so evaluating a training checkpoint costs one model load
+    per worker plus encoding the sample. With one worker everything runs in
+    the calling process.
+    """
+
+    def __init__(self, lines: List[str], workers: int = None, batch_lines: int = 500):
+        self.batches = [
+            lines[i : i + batch_lines] for i in range(0, len(lines), batch_lines)
+        ]
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = None
+
+    def _map(self, tasks):
+        if self.workers <= 1:
+            return map(_count_batch, tasks)
+        if self._pool is None:
+            context = multiprocessing.get_context("spawn")
+            self._pool = context.Pool(self.workers)
+        return self._pool.imap_unordered(_count_batch, tasks)
+
+    def evaluate(self, model_path: str) -> Dict:
+        """Held-out metrics of one model file"""
+        from app.model_registry import file_version
+
+        started = time.perf_counter()
+        version = file_version(model_path)
+        tasks = [(model_path, version, batch) for batch in self.batches]
+
+        totals = dict.fromkeys(COUNT_FIELDS, 0)
+        used = set()
+        vocab_size = 0
+        for counts, batch_used, vocab_size in self._map(tasks):
+            for field, value in counts.items():
+                totals[field] += value
+            used |= batch_used
+
+        metrics = summarize(totals, used, vocab_size)
+        metrics["model"] = model_path
+        metrics["version"] = version
+        metrics["seconds"] = round(time.perf_counter() - started, 3)
+        return metrics
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class EarlyStopping:
+    """Signal a stop once a held-out metric stops improving
+
+    `update` returns True after `patience` evaluations in a row that improved
+    on the best value so far by less than `min_gain` (relative).
+    """
+
+    def __init__(
+        self,
+        metric: str = "chars_per_token",
+        min_gain: float = 0.002,
+        patience: int = 3,
+    ):
+        self.metric = metric
+        self.min_gain = min_gain
+        self.patience = patience
+        self.best = None
+        self.stale = 0
+
+    def update(self, metrics: Dict) -> bool:
+        value = metrics[self.metric]
+        if self.best is None or value > self.best * (1 + self.min_gain):
+            self.best = value
+            self.stale = 0
+        else:
+            self.stale += 1
+        return self.stale >= self.patience
@@ -0,0 +1,245 @@
+import re
+from bisect import bisect_right
+from typing import Dict, List
+
+# Words are whitespace-separated runs, the unit tokenize_bpe caches encodings by
+_WORD = re.compile(r"\S+")
+
+
+class LiveDocument:
+    """Token state of a document that is edited in place
+
+    Words (whitespace-separated runs) are stored with their character span
+    and tokens in blocks of about `block_words` words. Word spans are relative
+    to their block and the document text itself is not kept, so an edit
+    re-encodes only the words it touches and rebuilds the block holding them.
+    The start offset and first word index of the later blocks move lazily: one
+    pending shift covers every block from `_stale_from` on and is applied to
+    the blocks between the previous edit and the next one. Typing in one place
+    therefore updates O(1) blocks per edit, and an edit elsewhere costs the
+    number of blocks between the two; list inserts and deletes of block
+    entries remain O(#blocks) memory moves. Offsets are Unicode code points,
+    which match JavaScript string indices for Devanagari and other Basic
+    Multilingual Plane text.
+    """
+
+    def __init__(self, tokenizer, block_words: int = 128):
+        self.tokenizer = tokenizer
+        self.block_words = block_words
+        self.version = 0
+        self.token_count = 0
+        self.length = 0
+        self._offsets = []  # start offset of each block
+        self._first_words = []  # index of the first word of each block
+        # Per block: [relative start, relative end, tokens, word] of each word
+        self._blocks = []
+        # Blocks from _stale_from on are behind by _stale_shift characters and
+        # _stale_words words
+        self._stale_from = 0
+        self._stale_shift = 0
+        self._stale_words = 0
+
+    def reset(self, text: str) -> Dict:
+        """Replace the whole document; returns every word"""
+        self.length = len(text)
+        words = self._encode_words(text, 0)
+        self.token_count = sum(len(word[2]) for word in words)
+        self._offsets = []
+        self._first_words = []
+        self._blocks = []
+        self._store_blocks(0, 0, words)
+        self._stale_from = len(self._blocks)
+        self._stale_shift = self._stale_words = 0
+        self.version += 1
+        return {
+            "version": self.version,
+            "token_count": self.token_count,
+            "words": [self._word_json(word) for word in words],
+        }
+
+    def set_tokenizer(self, tokenizer) -> Dict:
+        """Re-encode the document with another tokenizer, e.g. a reloaded model"""
+        self.tokenizer = tokenizer
+        parts = []
+        cursor = 0
+        for word in self.words():
+            parts.append(" " * (word["start"] - cursor))
+            parts.append(word["word"])
+            cursor = word["end"]
+        parts.append(" " * (self.length - cursor))
+        return self.reset("".join(parts))
+
+    def edit(self, start: int, end: int, text: str) -> Dict:
+        """Replace text[start:end] with `text` and return the changed words
+
+        The patch names the words to replace (`word_start`, `word_removed`),
+        the new words with their absolute spans and `shift`, the offset change
+        of every word after them.
+        """
+        if not 0 <= start <= end <= self.length:
+            raise ValueError(f"Edit range {start}:{end} is outside the document")
+        shift = len(text) - (end - start)
+
+        # Affected blocks as one absolute-offset word list
+        block, last = self._affected_blocks(start, end)
+        self._settle(last)
+        words = [
+            [rel_start + self._offsets[i], rel_end + self._offsets[i], tokens, word]
+            for i in range(block, last)
+            for rel_start, rel_end, tokens, word in self._blocks[i]
+        ]
+
+        # Words touching the edited range, including words directly adjacent to
+        # it, since typing next to a word joins it with the inserted text
+        first = 0
+        while first < len(words) and words[first][1] < start:
+            first += 1
+        stop = first
+        while stop < len(words) and words[stop][0] <= end:
+            stop += 1
+        removed = words[first:stop]
+        region_start = min([start] + [word[0] for word in removed])
+        region_end = max([end] + [word[1] for word in removed])
+
+        # Rebuild the edited region from its words; whitespace only separates
+        # words, so every gap can be filled with plain spaces
+        parts = []
+        cursor = region_start
+        for word in removed:
+            parts.append(" " * (word[0] - cursor))
+            parts.append(word[3])
+            cursor = word[1]
+        parts.append(" " * (region_end - cursor))
+        old_region = "".join(parts)
+        new_region = (
+            old_region[: start - region_start] + text + old_region[end - region_start :]
+        )
+        new_words = self._encode_words(new_region, region_start)
+        self.length += shift
+        for word in words[stop:]:
+            word[0] += shift
+            word[1] += shift
+        words[first:stop] = new_words
+
+        block_word = self._first_words[block] if block < last else 0
+        word_start = block_word + first
+        self._shift_after(last, shift, len(new_words) - len(removed))
+        del self._offsets[block:last]
+        del self._first_words[block:last]
+        del self._blocks[block:last]
+        stored = self._store_blocks(block, block_word, words)
+        self._stale_from += stored - (last - block)
+
+        self.token_count += sum(len(word[2]) for word in new_words) - sum(
+            len(word[2]) for word in removed
+        )
+        self.version += 1
+        return {
+            "version": self.version,
+            "word_start": word_start,
+            "word_removed": len(removed),
+            "words": [self._word_json(word) for word in new_words],
+            "shift": shift,
+            "token_count": self.token_count,
+        }
+
+    def _affected_blocks(self, start: int, end: int):
+        """Range of blocks holding words that may touch text[start:end]
+
+        A block shrunk below half size by earlier edits also takes in the
+        block before it, so blocks are merged back as they are rebuilt.
+        """
+        if not self._blocks:
+            return 0, 0
+        block = max(self._find_block(start) - 1, 0)
+        last = max(self._find_block(end), block + 1)
+        if block > 0 and len(self._blocks[block]) < self.block_words // 2:
+            block -= 1
+        return block, last
+
+    def _find_block(self, offset: int) -> int:
+        """bisect_right of `offset` in the block start offsets"""
+        stale = self._stale_from
+        if stale < len(self._offsets) and (
+            offset >= self._offsets[stale] + self._stale_shift
+        ):
+            return bisect_right(self._offsets, offset - self._stale_shift, stale)
+        return bisect_right(self._offsets, offset, 0, stale)
+
+    def _settle(self, stop: int):
+        """Apply the pending shift to the blocks before `stop`"""
+        offsets, first_words = self._offsets, self._first_words
+        for i in range(self._stale_from, min(stop, len(offsets))):
+            offsets[i] += self._stale_shift
+            first_words[i] += self._stale_words
+        if stop >= len(offsets):
+            self._stale_from = len(offsets)
+            self._stale_shift = self._stale_words = 0
+        else:
+            self._stale_from = max(self._stale_from, stop)
+
+    def _shift_after(self, index: int, shift: int, words: int):
+        """Move every block from `index` on; blocks before it must be settled"""
+        if not (self._stale_shift or self._stale_words):
+            # Nothing pending, so the new shift can start right at `index`
+            self._stale_from = min(self._stale_from, index)
+        offsets, first_words = self._offsets, self._first_words
+        for i in range(index, min(self._stale_from, len(offsets))):
+            offsets[i] += shift
+            first_words[i] += words
+        self._stale_shift += shift
+        self._stale_words += words
+
+    def _encode_words(self, text: str, base: int) -> List[list]:
+        """Encode every word of `text`, with spans shifted by `base`"""
+        encode = self.tokenizer._encode_word
+        return [
+            [base + match.start(), base + match.end(), encode(word), word]
+            for match in _WORD.finditer(text)
+            for word in (match.group(),)
+        ]
+
+    def _store_blocks(self, index: int, first_word: int, words: List[list]) -> int:
+        """Insert absolute-offset words as blocks starting at block `index`
+
+        `first_word` is the document index of the first word; returns the
+        number of blocks inserted.
+        """
+        stored = 0
+        i = 0
+        while i < len(words):
+            size = self.block_words
+            if len(words) - i < size + size // 2:
+                # The last block takes the short tail instead of leaving a stub
+                size = len(words) - i
+            chunk = words[i : i + size]
+            offset = chunk[0][0]
+            self._offsets.insert(index, offset)
+            self._first_words.insert(index, first_word + i)
+            self._blocks.insert(
+                index,
+                [[start - offset, end - offset, *rest] for start, end, *rest in chunk],
+            )
+            index += 1
+            stored += 1
+            i += size
+        return stored
+
+    def _word_json(self, word) -> Dict:
+        start, end, tokens, text = word
+        return {
+            "word": text,
+            "start": start,
+            "end": end,
+            "tokens": list(tokens),
+            "ids": [self.tokenizer.token_id(token) for token in tokens],
+        }
+
+    def words(self) -> List[Dict]:
+        """Every word with its absolute span, tokens and token ids"""
+        self._settle(len(self._blocks))
+        return [
+            self._word_json((start + offset, end + offset, tokens, word))
+            for offset, block in zip(self._offsets, self._blocks)
+            for start, end, tokens, word in block
+        ]
@@ -1,48 +1,101 @@
-import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from app.token_frequency_tracker import TokenFrequencyTracker
 from app.dynamic_vocabulary_manager import DynamicVocabularyManager
 from app.adaptive_bpe import AdaptiveBPE
 from app.feedback_loop import FeedbackLoop
+from app.pretokenizer import pretokenize_with_kinds
 
 
 def preprocess_text(text):
-    # Define a regex pattern to match only Devanagari characters and numbers
-    devanagari_pattern = re.compile(r"[\u0900-\u097F]+")
-    number_pattern = re.compile(r"\d{3,}")
-
-    # Find all Devanagari words and sequences of three or more numbers
-    words = devanagari_pattern.findall(text)
-    numbers = number_pattern.findall(text)
-
-    # Combine Devanagari words and number sequences
-    return words + numbers
+    # Keep Devanagari words and sequences of three or more digits
+    return [
+        piece
+        for piece, kind, _, _ in pretokenize_with_kinds(text)
+        if kind == "devanagari" or (kind == "digits" and len(piece) >= 3)
+    ]
 
 
 def calculate_compression_ratio(original_text, tokens):
     return len(original_text) / len(" ".join(tokens))
 
 
+def count_tokens_in_chunk(texts):
+    """Preprocess a chunk of texts, returning token counts and compression ratios"""
+    counts = Counter()
+    ratios = []
+    for text in texts:
+        tokens = preprocess_text(text)
+        if not tokens:
+            continue
+        counts.update(tokens)
+        ratios.append(calculate_compression_ratio(text, tokens))
+    return counts, ratios
+
+
+def _batches(texts, batch_size):
+    iterator = iter(texts)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _split(batch, parts):
+    size = -(-len(batch) // parts)  # ceiling division
+    return [batch[i : i + size] for i in range(0, len(batch), size)]
+
+
 def main_tokenization_process(
     texts,
     initial_vocabulary,
     initial_merges,
     target_compression_ratio,
     frequency_threshold,
+    batch_size=1000,
+    num_workers=1,
 ):
+    """Update vocabulary and merges from texts, one batch at a time
+
+    Each batch is preprocessed in `num_workers` processes, the per-chunk
+    frequency deltas are folded together, and the vocabulary and merges are
+    updated once per batch from the tokens that changed in it.
+    """
     frequency_tracker = TokenFrequencyTracker()
     vocabulary_manager = DynamicVocabularyManager(initial_vocabulary)
     bpe = AdaptiveBPE(initial_merges)
     feedback_loop = FeedbackLoop(target_compression_ratio)
 
-    for text in texts:
-        # Preprocess text to extract relevant tokens
-        tokens = preprocess_text(text)
-        frequency_tracker.update_frequencies(tokens)
-        token_frequencies = frequency_tracker.get_frequencies()
-        vocabulary_manager.update_vocabulary(token_frequencies, frequency_threshold)
-        bpe.perform_merges(token_frequencies)
-        current_compression_ratio = calculate_compression_ratio(text, tokens)
-        if feedback_loop.evaluate_performance(current_compression_ratio):
-            pass
+    executor = ProcessPoolExecutor(num_workers) if num_workers > 1 else None
+    try:
+        for batch in _batches(texts, batch_size):
+            # Preprocess chunks of the batch in parallel and fold their deltas
+            chunks = _split(batch, num_workers)
+            if executor is not None:
+                results = executor.map(count_tokens_in_chunk, chunks)
+            else:
+                results = map(count_tokens_in_chunk, chunks)
+
+            delta = Counter()
+            ratios = []
+            for chunk_counts, chunk_ratios in results:
+                delta.update(chunk_counts)
+                ratios.extend(chunk_ratios)
+
+            frequency_tracker.update_frequencies_from_counts(delta)
+            vocabulary_manager.promote(
+                frequency_tracker.get_delta(), frequency_threshold
+            )
+            bpe.observe(delta)
+            bpe.review()
+
+            for current_compression_ratio in ratios:
+                if feedback_loop.evaluate_performance(current_compression_ratio):
+                    pass
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
     return vocabulary_manager.get_vocabulary(), bpe.get_merges()
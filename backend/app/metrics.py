@@ -0,0 +1,165 @@
+import threading
+from bisect import bisect_left
+
+
+class _ShardedMetric:
+    """Base class for metrics that keep one shard per thread
+
+    Each thread only ever writes to its own shard, so recording a value needs
+    no lock. Scrapes sum the shards; copying the shard list is a single C call
+    under the GIL, so it never sees a half-inserted shard.
+    """
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._shards = {}
+
+    def _new_shard(self):
+        return [0.0]
+
+    def _shard(self):
+        ident = threading.get_ident()
+        shard = self._shards.get(ident)
+        if shard is None:
+            shard = self._shards.setdefault(ident, self._new_shard())
+        return shard
+
+    def _all_shards(self):
+        return list(self._shards.values())
+
+    def _header(self):
+        return [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+
+
+class Counter(_ShardedMetric):
+    """Monotonically increasing counter"""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, help_text: str, function=None):
+        super().__init__(name, help_text)
+        self.function = function
+
+    def inc(self, amount=1):
+        self._shard()[0] += amount
+
+    @property
+    def value(self):
+        if self.function is not None:
+            return self.function()
+        return sum(shard[0] for shard in self._all_shards())
+
+    def render(self):
+        return self._header() + [f"{self.name} {_format(self.value)}"]
+
+
+class Gauge(_ShardedMetric):
+    """Value that can go up and down, be set directly or be read from a callback"""
+
+    metric_type = "gauge"
+
+    def __init__(self, name: str, help_text: str, function=None):
+        super().__init__(name, help_text)
+        self.function = function
+        self._value = 0.0
+
+    def set(self, value):
+        self._value = value
+
+    def inc(self, amount=1):
+        self._shard()[0] += amount
+
+    def dec(self, amount=1):
+        self._shard()[0] -= amount
+
+    @property
+    def value(self):
+        if self.function is not None:
+            return self.function()
+        return self._value + sum(shard[0] for shard in self._all_shards())
+
+    def render(self):
+        return self._header() + [f"{self.name} {_format(self.value)}"]
+
+
+class Histogram(_ShardedMetric):
+    """Bucketed distribution of observed values"""
+
+    metric_type = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets):
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_shard(self):
+        # One slot per bucket, one for +Inf and a trailing running sum
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def observe(self, value):
+        shard = self._shard()
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def snapshot(self):
+        """Return (per-bucket counts, sum, count) summed over all shards"""
+        counts = [0] * (len(self.buckets) + 1)
+        total = 0.0
+        for shard in self._all_shards():
+            for i in range(len(counts)):
+                counts[i] += shard[i]
+            total += shard[-1]
+        return counts, total, sum(counts)
+
+    def render(self):
+        counts, total, count = self.snapshot()
+        lines = self._header()
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            lines.append(f'{self.name}_bucket{{le="{_format(bound)}"}} {cumulative}')
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {count}')
+        lines.append(f"{self.name}_sum {_format(total)}")
+        lines.append(f"{self.name}_count {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered in the Prometheus text exposition format"""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self.metrics = {}
+
+    def _register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, function=None):
+        return self._register(Counter(self.prefix + name, help_text, function))
+
+    def gauge(self, name, help_text, function=None):
+        return self._register(Gauge(self.prefix + name, help_text, function))
+
+    def histogram(self, name, help_text, buckets):
+        return self._register(Histogram(self.prefix + name, help_text, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _format(value) -> str:
+    """Format a sample value the way Prometheus expects"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
@@ -0,0 +1,307 @@
+import contextlib
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from app.binary_model import read_binary_version
+from app.bpe_tokenizer import BPETokenizer
+
+# Model file names: bpe_model.json, bpe_model_latest.json, bpe_model_v2000.json;
+# not editor backups or copies such as "bpe_model_latest copy.json"
+MODEL_FILE_NAME = re.compile(r"bpe_model(?:_[A-Za-z0-9]+)*\.json")
+
+
+class ModelEntry:
+    """A registered model file and, once loaded, its tokenizer"""
+
+    def __init__(self, name: str, path: str):
+        self.name = name
+        self.path = path
+        # Binary model written by preload_model.py, used when it is up to date
+        self.binary_path = os.path.splitext(path)[0] + ".bin"
+        self.binary = False
+        # (tokenizer, version) of the loaded model, swapped as one reference
+        self.current = None
+        self.file_stat = None  # (mtime_ns, size) of the JSON and binary files
+        self.checked_at = 0.0
+        self.loaded_at = None
+        self.load_seconds = 0.0
+        self.reloads = 0
+        self.in_flight = 0
+        self.retired = []  # replaced tokenizers, closed once no request uses them
+        # (tokenizer, version) loaded from JSON for the training data that a
+        # binary model leaves out; loaded on the first progress request
+        self.progress = None
+        self.load_lock = threading.Lock()
+
+    def info(self) -> Dict:
+        current = self.current
+        return {
+            "name": self.name,
+            "path": self.path,
+            "loaded": current is not None,
+            "version": current[1] if current else None,
+            "binary": self.binary,
+            "vocab_size": len(current[0].vocab) if current else None,
+            "loaded_at": self.loaded_at,
+            "load_seconds": round(self.load_seconds, 6),
+            "reloads": self.reloads,
+            "in_flight": self.in_flight,
+        }
+
+
+def _file_stat(path: str):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _entry_stat(entry: "ModelEntry"):
+    json_stat = _file_stat(entry.path)
+    if json_stat is None:
+        return None
+    return json_stat, _file_stat(entry.binary_path)
+
+
+def model_files(directory: str = ".") -> List[str]:
+    """Paths of the model files in a directory, sorted by name"""
+    return [
+        os.path.join(directory, name)
+        for name in sorted(os.listdir(directory))
+        if MODEL_FILE_NAME.fullmatch(name)
+    ]
+
+
+def file_version(path: str) -> str:
+    """Short content hash used as the model version"""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+class ModelRegistry:
+    """Lazily loaded BPE models keyed by name, with LRU eviction and hot reload
+
+    A model is loaded on first use, from the shared binary model next to the
+    JSON file when one built from the same JSON exists (see preload_model.py)
+    and from the JSON file otherwise. When either file changes on disk the new
+    version is loaded into a fresh tokenizer and swapped in with a single
+    assignment, so requests already holding the old tokenizer finish on it.
+    At most `max_loaded` models stay in memory; the least recently used idle
+    model is dropped first.
+    """
+
+    def __init__(
+        self,
+        default_model: str = "bpe_model_latest",
+        max_loaded: int = 4,
+        check_interval: float = 2.0,
+    ):
+        self.default_model = default_model
+        self.max_loaded = max_loaded
+        self.check_interval = check_interval
+        self._entries: Dict[str, ModelEntry] = {}
+        self._loaded = OrderedDict()  # name -> None, least recently used first
+        self._lock = threading.Lock()
+        self._reload_listeners = []
+
+    def on_reload(self, callback):
+        """Call `callback(name, version)` after a loaded model is replaced"""
+        self._reload_listeners.append(callback)
+
+    def register(self, name: str, path: str):
+        """Make a model file available under `name`"""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry.path != path:
+                self._entries[name] = ModelEntry(name, path)
+
+    def discover(self, directory: str = "."):
+        """Register every model file in a directory under its file name stem"""
+        for path in model_files(directory):
+            name = os.path.splitext(os.path.basename(path))[0]
+            self.register(name, path)
+
+    def names(self) -> List[str]:
+        return sorted(self._entries)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    def _entry(self, name: Optional[str]) -> ModelEntry:
+        entry = self._entries.get(name or self.default_model)
+        if entry is None:
+            raise KeyError(name)
+        return entry
+
+    def _current(self, entry: ModelEntry, force: bool = False):
+        current = entry.current
+        now = time.monotonic()
+        if force or current is None or now - entry.checked_at >= self.check_interval:
+            entry.checked_at = now
+            if force or current is None or _entry_stat(entry) != entry.file_stat:
+                current = self._load(entry, force)
+        self._touch(entry)
+        return current
+
+    def get(self, name: str = None) -> BPETokenizer:
+        """Tokenizer for a model, loading or reloading it if needed
+
+        Raises KeyError for unknown model names.
+        """
+        return self._current(self._entry(name))[0]
+
+    @contextlib.contextmanager
+    def use(self, name: str = None):
+        """Context manager yielding (tokenizer, version); the model counts as busy"""
+        entry = self._entry(name)
+        entry.in_flight += 1
+        try:
+            yield self._current(entry)
+        finally:
+            entry.in_flight -= 1
+            if entry.retired:
+                self._close_retired(entry)
+
+    def progress_tokenizer(self, name: str = None) -> BPETokenizer:
+        """Tokenizer holding a model's training progress and vocabulary growth
+
+        This is the served tokenizer unless it maps a binary model, which only
+        carries what encoding needs. The JSON model is then loaded once per
+        version and kept until the model is reloaded or evicted.
+        """
+        entry = self._entry(name)
+        tokenizer, version = self._current(entry)
+        if not entry.binary:
+            return tokenizer
+        with entry.load_lock:
+            progress = entry.progress
+            if progress is None or progress[1] != version:
+                progress = (BPETokenizer(), version)
+                if not progress[0].load_model(entry.path):
+                    return tokenizer  # retried on the next request
+                entry.progress = progress
+        return progress[0]
+
+    def version(self, name: str = None) -> Optional[str]:
+        current = self._entry(name).current
+        return current[1] if current else None
+
+    def reload(self, name: str = None) -> BPETokenizer:
+        """Load the model file again even if it looks unchanged"""
+        return self._current(self._entry(name), force=True)[0]
+
+    def _load(self, entry: ModelEntry, force: bool = False):
+        with entry.load_lock:
+            stat = _entry_stat(entry)
+            current = entry.current
+            if not force and current is not None and stat == entry.file_stat:
+                return current  # another request reloaded it while we waited
+
+            started = time.perf_counter()
+            tokenizer = BPETokenizer()
+            if stat is None:
+                print(f"Warning: Model file {entry.path} not found. Using empty model.")
+                version = None
+                entry.binary = False
+            else:
+                version = file_version(entry.path)
+                binary = stat[1] is not None and (
+                    read_binary_version(entry.binary_path) == version
+                )
+                if (
+                    not force
+                    and current is not None
+                    and (version, binary) == (current[1], entry.binary)
+                ):
+                    # Touched but not changed, keep serving the loaded model
+                    entry.file_stat = stat
+                    return current
+                if binary:
+                    loaded = tokenizer.load_binary_model(entry.binary_path)
+                else:
+                    loaded = tokenizer.load_model(entry.path)
+                if not loaded:
+                    # Usually a file caught mid-write; keep serving the loaded
+                    # version and leave file_stat alone so the next check retries
+                    if current is not None:
+                        print(
+                            f"Warning: Could not load {entry.path}. "
+                            f"Keeping version {current[1]}."
+                        )
+                        return current
+                    print(f"Warning: Could not load {entry.path}. Using empty model.")
+                    tokenizer = BPETokenizer()
+                    version = stat = None
+                entry.binary = binary and loaded
+
+            if current is not None:
+                entry.reloads += 1
+                entry.retired.append(current[0])
+            # Swap in the fully loaded model in one step; requests holding the
+            # previous tuple keep using it until they finish
+            entry.current = (tokenizer, version)
+            entry.progress = None
+            entry.file_stat = stat
+            entry.loaded_at = time.time()
+            entry.load_seconds = time.perf_counter() - started
+            print(f"Loaded model {entry.name} version {version}")
+            if current is not None:
+                for callback in self._reload_listeners:
+                    callback(entry.name, version)
+                self._close_retired(entry)
+            return entry.current
+
+    def _close_retired(self, entry: ModelEntry):
+        """Close replaced tokenizers (unmapping binary models) once idle"""
+        if entry.in_flight:
+            return
+        while entry.retired:
+            try:
+                tokenizer = entry.retired.pop()
+            except IndexError:
+                break  # emptied by another thread
+            tokenizer.close()
+
+    def _touch(self, entry: ModelEntry):
+        with self._lock:
+            self._loaded[entry.name] = None
+            self._loaded.move_to_end(entry.name)
+            self._evict(keep=entry.name)
+
+    def _evict(self, keep: str):
+        """Drop least recently used idle models above `max_loaded`"""
+        excess = len(self._loaded) - self.max_loaded
+        for name in list(self._loaded):
+            if excess <= 0:
+                break
+            entry = self._entries[name]
+            if entry.in_flight or name in (keep, self.default_model):
+                continue
+            if entry.current is not None:
+                entry.retired.append(entry.current[0])
+            entry.current = None
+            entry.progress = None
+            entry.file_stat = None
+            del self._loaded[name]
+            self._close_retired(entry)
+            excess -= 1
+            print(f"Evicted idle model {name}")
+
+    def loaded_models(self) -> List[str]:
+        return list(self._loaded)
+
+    def info(self, name: str = None) -> Dict:
+        """Load state of one model, the default one unless named"""
+        return self._entry(name).info()
+
+    def all_info(self) -> List[Dict]:
+        return [self._entries[name].info() for name in self.names()]
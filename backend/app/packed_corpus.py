@@ -0,0 +1,126 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# Largest number of possible pair codes counted with a dense bincount
+DENSE_PAIR_LIMIT = 1 << 22
+
+
+class PackedCorpus:
+    """All unique training words packed into flat NumPy arrays
+
+    `symbols` holds the int32 symbol ids of every word back to back and
+    `word_index` the word each position belongs to, so pair counting and merge
+    application are whole-array operations instead of a Python loop over words.
+    Words keep the order of the `word_freqs` mapping they were built from,
+    which makes pair ties resolve exactly like the dict-based loop.
+    """
+
+    def __init__(self, word_freqs: Dict[str, int]):
+        self.symbol_table: List[str] = []
+        self.symbol_ids: Dict[str, int] = {}
+
+        symbols = []
+        word_index = []
+        for i, word in enumerate(word_freqs):
+            ids = [self._symbol_id(symbol) for symbol in word.split()]
+            symbols.extend(ids)
+            word_index.extend([i] * len(ids))
+
+        self.symbols = np.array(symbols, dtype=np.int32)
+        self.word_index = np.array(word_index, dtype=np.int32)
+        self.freqs = np.fromiter(
+            word_freqs.values(), dtype=np.int64, count=len(word_freqs)
+        )
+
+    def _symbol_id(self, symbol: str) -> int:
+        symbol_id = self.symbol_ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = self.symbol_ids[symbol] = len(self.symbol_table)
+            self.symbol_table.append(symbol)
+        return symbol_id
+
+    def _pair_positions(self) -> np.ndarray:
+        """Positions i where symbols i and i + 1 belong to the same word"""
+        return np.flatnonzero(self.word_index[:-1] == self.word_index[1:])
+
+    def pair_frequencies(self) -> Dict[Tuple[str, str], int]:
+        """Weighted counts of adjacent symbol pairs, in first-occurrence order"""
+        positions = self._pair_positions()
+        if len(positions) == 0:
+            return {}
+
+        # Encode each pair as one integer: left * V + right
+        size = len(self.symbol_table)
+        codes = self.symbols[positions].astype(np.int64) * size
+        codes += self.symbols[positions + 1]
+        weights = self.freqs[self.word_index[positions]]
+
+        if size * size <= DENSE_PAIR_LIMIT:
+            # Few enough symbols to count every possible pair code directly
+            counts = np.bincount(codes, weights=weights, minlength=size * size)
+            unique_codes = np.flatnonzero(counts)
+            counts = counts[unique_codes].astype(np.int64)
+            first_seen = np.full(size * size, len(codes))
+            np.minimum.at(first_seen, codes, np.arange(len(codes)))
+            first_seen = first_seen[unique_codes]
+        else:
+            unique_codes, first_seen, inverse = np.unique(
+                codes, return_index=True, return_inverse=True
+            )
+            counts = np.bincount(inverse, weights=weights).astype(np.int64)
+
+        # Dict order decides max() ties, so emit pairs in order of first occurrence
+        order = np.argsort(first_seen, kind="stable")
+        left, right = np.divmod(unique_codes[order], size)
+        table = self.symbol_table
+        pairs = zip(left.tolist(), right.tolist(), counts[order].tolist())
+        return {(table[l], table[r]): count for l, r, count in pairs}
+
+    def _match_positions(self, pair: Tuple[str, str]) -> np.ndarray:
+        """Start positions of the pair, leftmost non-overlapping like str.replace"""
+        left = self.symbol_ids.get(pair[0])
+        right = self.symbol_ids.get(pair[1])
+        if left is None or right is None:
+            return np.empty(0, dtype=np.int64)
+
+        positions = self._pair_positions()
+        matches = positions[
+            (self.symbols[positions] == left) & (self.symbols[positions + 1] == right)
+        ]
+        if left == right and len(matches) > 1:
+            # In a run like "a a a" only every other match can be merged
+            run_start = np.ones(len(matches), dtype=bool)
+            run_start[1:] = np.diff(matches) != 1
+            starts = np.flatnonzero(run_start)
+            run_offset = np.arange(len(matches)) - np.repeat(
+                starts, np.diff(np.append(starts, len(matches)))
+            )
+            matches = matches[run_offset % 2 == 0]
+        return matches
+
+    def apply_merge(self, pair: Tuple[str, str]) -> int:
+        """Replace every occurrence of the pair with the merged symbol
+
+        Returns the number of occurrences merged, weighted by word frequency.
+        """
+        matches = self._match_positions(pair)
+        if len(matches) == 0:
+            return 0
+        merged = int(self.freqs[self.word_index[matches]].sum())
+        self.symbols[matches] = self._symbol_id("".join(pair))
+
+        keep = np.ones(len(self.symbols), dtype=bool)
+        keep[matches + 1] = False
+        self.symbols = self.symbols[keep]
+        self.word_index = self.word_index[keep]
+        return merged
+
+    def words_with_pair(self, pair: Tuple[str, str], limit: int) -> List[str]:
+        """Up to `limit` words containing the pair, joined without spaces"""
+        word_ids = np.unique(self.word_index[self._match_positions(pair)])[:limit]
+        words = []
+        for word_id in word_ids.tolist():
+            ids = self.symbols[self.word_index == word_id].tolist()
+            words.append("".join(self.symbol_table[i] for i in ids))
+        return words
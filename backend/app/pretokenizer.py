@@ -0,0 +1,80 @@
+import re
+import unicodedata
+from typing import Iterator, List, Tuple
+
+# The whole Devanagari block, as a character class range
+DEVANAGARI_RANGE = "\u0900-\u097F"
+
+# Devanagari block without the danda/double danda and the digits, plus ZWNJ/ZWJ
+# so that words written with explicit half forms stay in one piece
+DEVANAGARI_LETTERS = "\u0900-\u0963\u0970-\u097F\u200C\u200D"
+LATIN_LETTERS = "A-Za-z\u00C0-\u024F"
+
+# Anything NFC could rewrite in ASCII/Devanagari text: other scripts, the
+# precomposed nukta letters U+0958-U+095F, nukta after न/र/ळ (composes to
+# ऩ/ऱ/ऴ) and combining marks whose canonical order needs fixing
+_MAY_CHANGE_UNDER_NFC = re.compile(
+    r"[^\x00-\x7F\u0900-\u0957\u0960-\u097F]"
+    r"|[\u0928\u0930\u0933\u094D]\u093C"
+    r"|[\u0951-\u0954][\u093C\u094D\u0952]"
+)
+
+# Whole-token check for Devanagari tokens (any character of the block)
+DEVANAGARI_WORD = re.compile(rf"[{DEVANAGARI_RANGE}]+")
+
+_PRETOKEN_PATTERN = re.compile(
+    rf"(?P<devanagari>[{DEVANAGARI_LETTERS}]+)"
+    r"|(?P<digits>\d+)"
+    rf"|(?P<latin>[{LATIN_LETTERS}]+)"
+    rf"|(?P<other>[^\W\d_{LATIN_LETTERS}{DEVANAGARI_LETTERS}]+)"
+    r"|(?P<punct>[^\w\s]|_)"
+)
+
+# Same alternation without groups, so findall returns plain strings
+_PRETOKEN_WORDS = re.compile(
+    rf"[{DEVANAGARI_LETTERS}]+"
+    r"|\d+"
+    rf"|[{LATIN_LETTERS}]+"
+    rf"|[^\W\d_{LATIN_LETTERS}{DEVANAGARI_LETTERS}]+"
+    r"|[^\w\s]|_"
+)
+
+
+def normalize(text: str) -> str:
+    """Normalize text to NFC
+
+    ASCII/Devanagari text without any of the sequences NFC rewrites is already
+    normalised; checking for those with one regex search is much cheaper than
+    running the full normaliser on text containing a nukta.
+    """
+    if _MAY_CHANGE_UNDER_NFC.search(text) is None:
+        return text
+    return unicodedata.normalize("NFC", text)
+
+
+def pretokenize(text: str) -> List[str]:
+    """Split NFC-normalised text into words, numbers and punctuation in one pass
+
+    Devanagari digits and the danda (।, ॥) are not word characters, so "है।"
+    becomes "है" and "।". Whitespace is dropped.
+    """
+    return _PRETOKEN_WORDS.findall(normalize(text))
+
+
+def pretokenize_with_kinds(text: str) -> Iterator[Tuple[str, str, int, int]]:
+    """Yield (piece, kind, start, end) for every pre-token
+
+    `kind` is one of "devanagari", "digits", "latin", "other" or "punct".
+    Offsets index into the NFC-normalised text.
+    """
+    for match in _PRETOKEN_PATTERN.finditer(normalize(text)):
+        yield match.group(), match.lastgroup, match.start(), match.end()
+
+
+def devanagari_words(text: str) -> List[str]:
+    """Only the Devanagari words of a text"""
+    return [
+        piece
+        for piece, kind, _, _ in pretokenize_with_kinds(text)
+        if kind == "devanagari"
+    ]
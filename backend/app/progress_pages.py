@@ -0,0 +1,81 @@
+import hashlib
+from typing import Dict, Optional
+
+
+def etag_for(*parts) -> str:
+    """Strong ETag built from a few cheap values that change with the content"""
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def _page_bounds(total: int, since: int, limit: Optional[int]):
+    """Clamp a cursor to the available steps; returns (since, next, reset)"""
+    if since < 0:
+        raise ValueError(f"since must be >= 0, got {since}")
+    if limit is not None and limit < 1:
+        raise ValueError(f"limit must be >= 1, got {limit}")
+    reset = since > total
+    if reset:
+        # The client is ahead of us (restart or model swap): start over
+        since = 0
+    end = total if limit is None else min(total, since + limit)
+    return since, end, reset
+
+
+def _slice_per_step(values, total_steps: int, since: int, end: int):
+    """Slice a per-step list, which may carry extra leading initial values
+
+    `vocab_sizes` has one entry for the initial vocabulary followed by one
+    per merge, `compression_ratios` only one per merge. Leading entries are
+    returned with the first page so concatenating pages rebuilds the list.
+    """
+    offset = len(values) - total_steps
+    start = since + offset if since else 0
+    return values[start : end + offset]
+
+
+def progress_page(
+    progress: Dict, since: int, limit: Optional[int], include_steps: bool = True
+) -> Dict:
+    """Training progress for steps after `since`, at most `limit` of them"""
+    steps = progress.get("steps", [])
+    total = len(steps)
+    since, end, reset = _page_bounds(total, since, limit)
+
+    page = {
+        key: value
+        for key, value in progress.items()
+        if key not in ("steps", "metrics")
+    }
+    page.update(
+        {
+            "since": since,
+            "next": end,
+            "total_steps": total,
+            "has_more": end < total,
+            "reset": reset,
+            "metrics": {
+                name: _slice_per_step(values, total, since, end)
+                for name, values in progress.get("metrics", {}).items()
+            },
+        }
+    )
+    if include_steps:
+        page["steps"] = steps[since:end]
+    return page
+
+
+def growth_page(vocab_growth: Dict, since: int, limit: Optional[int]) -> Dict:
+    """Vocabulary growth entries after `since`, at most `limit` of them"""
+    total = len(vocab_growth.get("tokens", []))
+    since, end, reset = _page_bounds(total, since, limit)
+    return {
+        "since": since,
+        "next": end,
+        "total_steps": total,
+        "has_more": end < total,
+        "reset": reset,
+        "vocab_growth": {
+            name: values[since:end] for name, values in vocab_growth.items()
+        },
+    }
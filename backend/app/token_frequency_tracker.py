@@ -1,13 +1,29 @@
-from collections import defaultdict
+from collections import Counter, defaultdict
 
 
 class TokenFrequencyTracker:
     def __init__(self):
         self.token_frequencies = defaultdict(int)
+        self._changed = set()  # tokens updated since the last get_delta()
 
     def update_frequencies(self, tokens):
-        for token in tokens:
-            self.token_frequencies[token] += 1
+        self.update_frequencies_from_counts(Counter(tokens))
+
+    def update_frequencies_from_counts(self, token_counts):
+        token_frequencies = self.token_frequencies
+        for token, count in token_counts.items():
+            token_frequencies[token] += count
+        self._changed.update(token_counts)
+
+    def frequency(self, token):
+        return self.token_frequencies.get(token, 0)
 
     def get_frequencies(self):
+        """Full token -> frequency copy; prefer get_delta() in update loops"""
         return dict(self.token_frequencies)
+
+    def get_delta(self):
+        """Current totals of the tokens that changed since the previous call"""
+        changed, self._changed = self._changed, set()
+        token_frequencies = self.token_frequencies
+        return {token: token_frequencies[token] for token in changed}
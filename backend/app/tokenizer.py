@@ -1,11 +1,16 @@
 from typing import List, Dict, Set
-import regex as re
+import re
+from app.akshara import segment
+from app.pretokenizer import DEVANAGARI_RANGE, normalize
+
+_WHITESPACE = re.compile(r"\s+")
+_DISALLOWED_CHARS = re.compile(rf"[^{DEVANAGARI_RANGE}a-zA-Z0-9\s.,?!]")
 
 
 class HindiTokenizer:
     def __init__(self):
         # Devanagari Unicode ranges
-        self.DEVANAGARI_RANGE = "\u0900-\u097f"
+        self.DEVANAGARI_RANGE = DEVANAGARI_RANGE
 
         # Basic character sets
         self.CONSONANTS = set("कखगघङचछजझञटठडढणतथदधनपफबभमयरलवशषसह")
@@ -25,49 +30,21 @@ class HindiTokenizer:
         text = self._normalize_unicode(text)
 
         # Remove excessive spaces
-        text = re.sub(r"\s+", " ", text)
+        text = _WHITESPACE.sub(" ", text)
 
         # Keep only Devanagari, English letters, numbers and basic punctuation
-        pattern = f"[^{self.DEVANAGARI_RANGE}a-zA-Z0-9\s\.\,\?\!]"
-        text = re.sub(pattern, "", text)
+        text = _DISALLOWED_CHARS.sub("", text)
 
         return text.strip()
 
     def _normalize_unicode(self, text: str) -> str:
         """Normalize Unicode characters to NFC form"""
-        import unicodedata
-
-        return unicodedata.normalize("NFC", text)
+        return normalize(text)
 
     def tokenize(self, text: str) -> List[str]:
-        """Tokenize text into subwords"""
-        chars = []
-        i = 0
+        """Tokenize text into aksharas (consonant clusters with their matras)"""
         text = self.clean_text(text)
-
-        while i < len(text):
-            if text[i].isspace():
-                # Skip spaces in tokenization
-                i += 1
-                continue
-
-            if i + 1 < len(text) and text[i + 1] in self.MATRAS:
-                # Handle consonant + matra (like सु, की)
-                chars.append(text[i : i + 2])
-                i += 2
-            elif i + 1 < len(text) and text[i + 1] == "ं":
-                # Handle anusvara (like नीं)
-                if i > 0 and text[i] in self.MATRAS:
-                    # Combine with previous token if it ends with a matra
-                    chars[-1] = chars[-1] + text[i + 1]
-                else:
-                    chars.append(text[i : i + 2])
-                i += 2
-            else:
-                chars.append(text[i])
-                i += 1
-
-        return chars
+        return [akshara for akshara in segment(text) if not akshara.isspace()]
 
     def get_stats(self, text: str) -> Dict:
         """Get tokenization statistics"""
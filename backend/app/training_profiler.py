@@ -0,0 +1,172 @@
+import time
+import tracemalloc
+
+
+class _Phase:
+    """Context manager that adds its elapsed time to a profiler phase"""
+
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        self.profiler.phase_times[self.name] = (
+            self.profiler.phase_times.get(self.name, 0.0) + elapsed
+        )
+        self.profiler.phase_calls[self.name] = (
+            self.profiler.phase_calls.get(self.name, 0) + 1
+        )
+        return False
+
+
+class _NoopPhase:
+    """Shared do-nothing context manager used when profiling is disabled"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_PHASE = _NoopPhase()
+
+
+class TrainingProfiler:
+    """Opt-in per-phase timing, tracemalloc snapshots and profiler dumps for training"""
+
+    PHASES = (
+        "pair_counting",
+        "best_pair_selection",
+        "merge_application",
+        "metrics",
+        "checkpoint_io",
+        "adaptive_review",
+        "evaluation",
+        "tail_pass",
+    )
+    DUMP_MODES = ("cprofile", "pyinstrument")
+
+    def __init__(self, enabled=False, memory_every=100, dump=None, dump_path=None):
+        if dump is not None and dump not in self.DUMP_MODES:
+            raise ValueError(f"Unknown profile dump mode: {dump}")
+        self.enabled = enabled or dump is not None
+        self.memory_every = memory_every
+        self.dump = dump
+        self.dump_path = dump_path or (
+            "learn_bpe.prof" if dump == "cprofile" else "learn_bpe_profile.html"
+        )
+        self.phase_times = {}
+        self.phase_calls = {}
+        self.memory_snapshots = []
+        self.top_allocations = []
+        self._profiler = None
+        self._started_tracemalloc = False
+        self._start_time = None
+        self._total_time = 0.0
+
+    def phase(self, name):
+        """Time a block of training code under the given phase name"""
+        if not self.enabled:
+            return _NOOP_PHASE
+        return _Phase(self, name)
+
+    def start(self):
+        """Start tracemalloc and the optional sampling/deterministic profiler"""
+        if not self.enabled:
+            return
+        self._start_time = time.perf_counter()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+        if self.dump == "cprofile":
+            import cProfile
+
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        elif self.dump == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                print("pyinstrument is not installed, skipping profile dump")
+                self.dump = None
+            else:
+                self._profiler = Profiler()
+                self._profiler.start()
+
+    def snapshot_memory(self, step):
+        """Record traced memory every `memory_every` steps"""
+        if not self.enabled or step % self.memory_every != 0:
+            return
+        if not tracemalloc.is_tracing():
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        self.memory_snapshots.append(
+            {"step": step, "current_kb": current // 1024, "peak_kb": peak // 1024}
+        )
+
+    def stop(self):
+        """Stop tracing and write the profiler dump if one was requested"""
+        if not self.enabled:
+            return
+        if self._start_time is not None:
+            self._total_time = time.perf_counter() - self._start_time
+
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            self.top_allocations = [
+                {
+                    "location": str(stat.traceback),
+                    "size_kb": stat.size // 1024,
+                    "count": stat.count,
+                }
+                for stat in snapshot.statistics("lineno")[:10]
+            ]
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+
+        if self.dump == "cprofile" and self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(self.dump_path)
+            print(f"cProfile stats saved to {self.dump_path}")
+        elif self.dump == "pyinstrument" and self._profiler is not None:
+            self._profiler.stop()
+            with open(self.dump_path, "w", encoding="utf-8") as f:
+                f.write(self._profiler.output_html())
+            print(f"pyinstrument report saved to {self.dump_path}")
+        self._profiler = None
+
+    def summary(self):
+        """Cumulative phase timings and memory snapshots as a JSON-friendly dict"""
+        if not self.enabled:
+            return None
+        total = self._total_time
+        if not total and self._start_time is not None:
+            total = time.perf_counter() - self._start_time
+        return {
+            "total_seconds": round(total, 4),
+            "phases": {
+                name: {
+                    "seconds": round(self.phase_times.get(name, 0.0), 4),
+                    "calls": self.phase_calls.get(name, 0),
+                    "share": round(self.phase_times.get(name, 0.0) / total, 4)
+                    if total
+                    else 0.0,
+                }
+                for name in self.PHASES
+            },
+            "memory_snapshots": self.memory_snapshots,
+            "top_allocations": self.top_allocations,
+            "dump": {"mode": self.dump, "path": self.dump_path} if self.dump else None,
+        }
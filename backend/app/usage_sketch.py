@@ -0,0 +1,262 @@
+import bisect
+import heapq
+import queue
+import threading
+import time
+from collections import Counter
+
+
+class CountMinTopK:
+    """Count-Min sketch with a bounded heap of the top-k heaviest tokens
+
+    Memory is fixed by `width * depth` counters plus at most `k` tracked
+    tokens, no matter how many distinct tokens are added. Estimates never
+    undercount and overcount by at most about `2 * total / width` with high
+    probability.
+    """
+
+    def __init__(self, width: int = 4096, depth: int = 4, k: int = 100):
+        if k < 1:
+            raise ValueError(f"k must be at least 1, got {k}")
+        self.width = width
+        self.depth = depth
+        self.k = k
+        self.table = [[0] * width for _ in range(depth)]
+        self.total = 0
+        self.top_counts = {}  # token -> estimate, at most k entries
+        self._heap = []  # (estimate, token), lazily cleaned min-heap
+
+    def _indexes(self, token):
+        # Double hashing: derive all row positions from one hash() call
+        h = hash(token)
+        h1 = h % self.width
+        h2 = (h // self.width) % self.width | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, token, count: int = 1) -> int:
+        """Add `count` occurrences of a token and return its new estimate"""
+        estimate = None
+        for row, index in zip(self.table, self._indexes(token)):
+            row[index] += count
+            if estimate is None or row[index] < estimate:
+                estimate = row[index]
+        self.total += count
+        self._offer(token, estimate)
+        return estimate
+
+    def estimate(self, token) -> int:
+        """Estimated number of occurrences of a token"""
+        return min(row[index] for row, index in zip(self.table, self._indexes(token)))
+
+    def _offer(self, token, estimate):
+        """Keep the token in the top-k set if its estimate is large enough"""
+        if token in self.top_counts or len(self.top_counts) < self.k:
+            self.top_counts[token] = estimate
+            heapq.heappush(self._heap, (estimate, token))
+        else:
+            # Drop stale heap entries until the minimum reflects a tracked token
+            while self.top_counts.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            if estimate > self._heap[0][0]:
+                _, evicted = heapq.heappop(self._heap)
+                del self.top_counts[evicted]
+                self.top_counts[token] = estimate
+                heapq.heappush(self._heap, (estimate, token))
+
+        if len(self._heap) > 4 * self.k:
+            self._heap = [(count, tok) for tok, count in self.top_counts.items()]
+            heapq.heapify(self._heap)
+
+    def most_common(self, n: int = None):
+        """Top tokens by estimated count, like Counter.most_common"""
+        ranked = sorted(self.top_counts.items(), key=lambda x: x[1], reverse=True)
+        return ranked if n is None else ranked[:n]
+
+
+class _Shard:
+    """One thread's token counts waiting to be folded into the sketch"""
+
+    def __init__(self):
+        self.counts = Counter()
+        self.size = 0
+        self.started = time.monotonic()
+        # Only contended while a reader collects every thread's shard
+        self.lock = threading.Lock()
+
+
+class ShardedUsageCounter:
+    """Per-thread token counters folded periodically into a shared sketch
+
+    The serving hot path only touches the calling thread's shard, behind a
+    lock that nobody else takes except a reader. A shard is handed off through
+    a queue once it has seen `flush_every` tokens or is older than
+    `flush_interval` seconds. The handing-off thread folds pending shards into
+    the sketch only if nobody else is already doing so; it never waits.
+    """
+
+    def __init__(self, sketch=None, flush_every: int = 4096, flush_interval=1.0):
+        self.sketch = sketch if sketch is not None else CountMinTopK()
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._shards = {}  # thread ident -> _Shard, for readers to collect
+        self._shards_lock = threading.Lock()
+        self._pending = queue.SimpleQueue()
+        self._merge_lock = threading.Lock()
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._shards_lock:
+                # A finished thread's ident can be reused; keep its counts
+                previous = self._shards.get(threading.get_ident())
+                self._shards[threading.get_ident()] = shard
+            if previous is not None:
+                self._hand_off(previous)
+        return shard
+
+    def update(self, tokens):
+        """Count tokens in the calling thread's shard"""
+        shard = self._shard()
+        with shard.lock:
+            shard.counts.update(tokens)
+            shard.size += len(tokens)
+            due = (
+                shard.size >= self.flush_every
+                or time.monotonic() - shard.started >= self.flush_interval
+            )
+        if due:
+            self._hand_off(shard)
+            if self._merge_lock.acquire(blocking=False):
+                try:
+                    self._drain()
+                finally:
+                    self._merge_lock.release()
+
+    def _hand_off(self, shard: _Shard):
+        with shard.lock:
+            counts = shard.counts
+            shard.counts = Counter()
+            shard.size = 0
+            shard.started = time.monotonic()
+        if counts:
+            self._pending.put(counts)
+
+    def flush(self):
+        """Hand the calling thread's shard off for merging"""
+        shard = getattr(self._local, "shard", None)
+        if shard is not None:
+            self._hand_off(shard)
+
+    def _drain(self):
+        while True:
+            try:
+                counts = self._pending.get_nowait()
+            except queue.Empty:
+                break
+            for token, count in counts.items():
+                self.sketch.add(token, count)
+
+    def merge(self):
+        """Fold every thread's counts, buffered or handed off, into the sketch"""
+        with self._merge_lock:
+            with self._shards_lock:
+                shards = list(self._shards.values())
+            for shard in shards:
+                self._hand_off(shard)
+            self._drain()
+
+    def estimate(self, token) -> int:
+        """Estimated usage of a token, including the caller's unflushed shard"""
+        shard = getattr(self._local, "shard", None)
+        local = shard.counts.get(token, 0) if shard is not None else 0
+        return self.sketch.estimate(token) + local
+
+    def most_common(self, n: int = None):
+        """Top tokens by estimated usage, counting every thread's shard"""
+        self.merge()
+        return self.sketch.most_common(n)
+
+
+class SpaceSaving:
+    """Space-Saving heavy hitters over weighted updates with a fixed capacity
+
+    At most `capacity` keys are tracked. When a new key arrives and the table
+    is full, the key with the smallest count is replaced and the newcomer
+    inherits that count as its error bound, so counts never undercount.
+    Negative counts lower a tracked key, which is dropped once it reaches
+    zero; for untracked keys they are ignored.
+    Keys are grouped in buckets of equal count with the distinct counts kept
+    sorted, so the minimum is found in O(1) and a top-n query only visits the
+    n largest keys.
+    """
+
+    def __init__(self, capacity: int = 10000):
+        if capacity < 1:
+            raise ValueError(f"capacity must be at least 1, got {capacity}")
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self._buckets = {}  # count -> {key: None}, keys in arrival order
+        self._levels = []  # distinct counts, ascending
+
+    def __len__(self):
+        return len(self.counts)
+
+    def _place(self, key, count: int):
+        bucket = self._buckets.get(count)
+        if bucket is None:
+            bucket = self._buckets[count] = {}
+            bisect.insort(self._levels, count)
+        bucket[key] = None
+        self.counts[key] = count
+
+    def _unplace(self, key, count: int):
+        bucket = self._buckets[count]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[count]
+            del self._levels[bisect.bisect_left(self._levels, count)]
+
+    def add(self, key, count: int = 1):
+        """Add a weighted occurrence of a key"""
+        current = self.counts.get(key)
+        if current is not None:
+            self._unplace(key, current)
+            if current + count > 0:
+                self._place(key, current + count)
+            else:
+                del self.counts[key]
+                del self.errors[key]
+            return
+        if count <= 0:
+            return
+        if len(self.counts) < self.capacity:
+            self.errors[key] = 0
+            self._place(key, count)
+            return
+
+        # Replace the oldest key among those with the smallest count
+        min_count = self._levels[0]
+        evicted = next(iter(self._buckets[min_count]))
+        self._unplace(evicted, min_count)
+        del self.counts[evicted]
+        del self.errors[evicted]
+        self.errors[key] = min_count
+        self._place(key, min_count + count)
+
+    def update(self, counts):
+        """Add every (key, count) of a mapping"""
+        for key, count in counts.items():
+            self.add(key, count)
+
+    def most_common(self, n: int = 20):
+        """Top-n keys by (over-)estimated count"""
+        top = []
+        for count in reversed(self._levels):
+            for key in self._buckets[count]:
+                if len(top) >= n:
+                    return top
+                top.append((key, count))
+        return top
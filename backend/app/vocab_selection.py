@@ -0,0 +1,46 @@
+import numpy as np
+
+
+def frequency_arrays(token_frequencies):
+    """Split a token -> frequency mapping into a token list and an int64 array"""
+    tokens = list(token_frequencies.keys())
+    freqs = np.fromiter(token_frequencies.values(), dtype=np.int64, count=len(tokens))
+    return tokens, freqs
+
+
+def tokens_above_threshold(tokens, freqs, threshold):
+    """Tokens whose frequency is at least `threshold`"""
+    return [tokens[i] for i in np.flatnonzero(freqs >= threshold)]
+
+
+def top_k_indices(freqs, k):
+    """Indices of the k most frequent entries, highest first
+
+    Uses argpartition to find the k-th largest frequency instead of sorting
+    everything. Ties are broken by position, so the result matches
+    `sorted(..., key=freq, reverse=True)[:k]` exactly.
+    """
+    n = len(freqs)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if k >= n:
+        return sort_indices_by_frequency(freqs)
+
+    candidates = np.argpartition(-freqs, k - 1)[:k]
+    kth = freqs[candidates].min()
+    above = np.flatnonzero(freqs > kth)
+    ties = np.flatnonzero(freqs == kth)[: k - len(above)]
+    selected = np.concatenate((above, ties))
+    return selected[np.lexsort((selected, -freqs[selected]))]
+
+
+def sort_indices_by_frequency(freqs):
+    """All indices ordered by descending frequency, stable for ties"""
+    return np.argsort(-freqs, kind="stable")
+
+
+def top_k_tokens(tokens, freqs, k, exclude=frozenset()):
+    """The k most frequent tokens that are not in `exclude`, highest first"""
+    # Excluded tokens can displace at most len(exclude) entries from the top
+    candidates = top_k_indices(freqs, k + len(exclude))
+    return [tokens[i] for i in candidates if tokens[i] not in exclude][:k]
@@ -0,0 +1,211 @@
+import heapq
+import os
+import re
+import shutil
+import tempfile
+import weakref
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+# Unique words counted in memory before they are written out as a sorted run
+COUNT_BUFFER_WORDS = 500000
+
+
+def _write_run(path: str, items: Iterable[Tuple[str, int]], mode: str = "w"):
+    with open(path, mode, encoding="utf-8") as f:
+        for word, count in items:
+            f.write(f"{word}\t{count}\n")
+
+
+def _read_run(path: str) -> Iterator[Tuple[str, int]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            word, count = line.rstrip("\n").split("\t")
+            yield word, int(count)
+
+
+def _merge_runs(paths: List[str]) -> Iterator[Tuple[str, int]]:
+    """Total count of every word over sorted runs, in word order"""
+    current, total = None, 0
+    for word, count in heapq.merge(*(_read_run(path) for path in paths)):
+        if word != current:
+            if current is not None:
+                yield current, total
+            current, total = word, 0
+        total += count
+    if current is not None:
+        yield current, total
+
+
+class TieredWordFreqs:
+    """Training word frequencies with the rare tail kept on disk
+
+    Words (space-separated initial symbols) seen fewer than `min_count` times
+    are pruned. Words seen fewer than `spill_below` times go to the tail, a
+    file of "word<TAB>count" lines written in word order; the rest stay in
+    memory and are returned by `count`. Counting itself writes sorted runs
+    whenever more than `buffer_words` unique words are held, so the full table
+    never has to fit in memory. The tail takes part in training through
+    `tail_pass`.
+    """
+
+    def __init__(
+        self,
+        min_count: int = 1,
+        spill_below: int = 0,
+        directory: str = None,
+        buffer_words: int = COUNT_BUFFER_WORDS,
+    ):
+        self.min_count = min_count
+        self.spill_below = spill_below
+        self.buffer_words = buffer_words
+        self.directory = tempfile.mkdtemp(prefix="bpe_words_", dir=directory)
+        self._finalizer = weakref.finalize(
+            self, shutil.rmtree, self.directory, ignore_errors=True
+        )
+        self.tail_path = os.path.join(self.directory, "tail.tsv")
+        self.tail_symbols = set()
+        # Weighted symbol counts of the tail as of the last tail_pass
+        self.tail_tokens = Counter()
+        self.passes = 0
+        self.stats = dict.fromkeys(
+            (
+                "unique_words",
+                "occurrences",
+                "chars",
+                "hot_words",
+                "hot_occurrences",
+                "tail_words",
+                "tail_occurrences",
+                "pruned_words",
+                "pruned_occurrences",
+                "runs",
+            ),
+            0,
+        )
+
+    def count(self, words: Iterable[str]) -> Dict[str, int]:
+        """Count segmented words; returns the in-memory (frequent) words"""
+        counts = Counter()
+        runs = []
+        for word in words:
+            counts[word] += 1
+            if len(counts) >= self.buffer_words:
+                runs.append(self._spill_run(counts, len(runs)))
+                counts = Counter()
+        if runs:
+            if counts:
+                runs.append(self._spill_run(counts, len(runs)))
+            totals = _merge_runs(runs)
+        else:
+            # Everything fit in memory: keep first-seen order for the hot words,
+            # which keeps pair ties resolving as without tiers
+            totals = counts.items()
+
+        stats = self.stats
+        stats["runs"] = len(runs)
+        hot = {}
+        tail = []
+        for word, count in totals:
+            stats["unique_words"] += 1
+            stats["occurrences"] += count
+            stats["chars"] += (len(word) - word.count(" ")) * count
+            if count < self.min_count:
+                stats["pruned_words"] += 1
+                stats["pruned_occurrences"] += count
+            elif count < self.spill_below:
+                stats["tail_words"] += 1
+                stats["tail_occurrences"] += count
+                self.tail_symbols.update(word.split())
+                tail.append((word, count))
+                if runs and len(tail) >= self.buffer_words:
+                    _write_run(self.tail_path, tail, "a")
+                    tail = []
+            else:
+                stats["hot_words"] += 1
+                stats["hot_occurrences"] += count
+                hot[word] = count
+        if not runs:
+            tail.sort()
+        _write_run(self.tail_path, tail, "a")
+        for path in runs:
+            os.remove(path)
+        return hot
+
+    def _spill_run(self, counts: Counter, index: int) -> str:
+        path = os.path.join(self.directory, f"run_{index}.tsv")
+        _write_run(path, sorted(counts.items()))
+        return path
+
+    def tail_pass(self, merges: List[Tuple[str, str]]) -> Counter:
+        """Apply `merges` (in order) to the tail and count its pairs
+
+        Rewrites the tail file with the merged words in one streaming pass and
+        returns the adjacent pair frequencies of the tail afterwards. Its
+        symbol counts are kept in `tail_tokens`.
+        """
+        pairs = Counter()
+        if not self.stats["tail_words"]:
+            return pairs
+        tokens = Counter()
+        # Same whole-symbol matching as BPETokenizer._apply_merge
+        patterns = [
+            (
+                " ".join(pair),
+                re.compile(r"(?<!\S)" + re.escape(" ".join(pair)) + r"(?!\S)"),
+                "".join(pair),
+            )
+            for pair in merges
+        ]
+        tmp_path = f"{self.tail_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for word, count in _read_run(self.tail_path):
+                for bigram, pattern, replacement in patterns:
+                    if bigram in word:
+                        word = pattern.sub(replacement, word)
+                f.write(f"{word}\t{count}\n")
+                symbols = word.split()
+                for symbol in symbols:
+                    tokens[symbol] += count
+                for pair in zip(symbols, symbols[1:]):
+                    pairs[pair] += count
+        os.replace(tmp_path, self.tail_path)
+        self.tail_tokens = tokens
+        self.passes += 1
+        return pairs
+
+    def close(self):
+        """Delete the tail and any leftover run files"""
+        self._finalizer()
+
+    def report(self, merge_history: List[Dict]) -> Dict:
+        """Pruning statistics and how much the tail contributed to the merges
+
+        A merge counts as driven by the tail when more than half of its pair
+        frequency came from tail words (as of the last full pass).
+        """
+
+        def ratio(numerator, denominator):
+            return round(numerator / denominator, 4) if denominator else 0.0
+
+        steps = [step for step in merge_history if "tail_frequency" in step]
+        tail_driven = [
+            step for step in steps if step["tail_frequency"] * 2 > step["frequency"]
+        ]
+        occurrences = self.stats["occurrences"]
+        return {
+            "min_count": self.min_count,
+            "spill_below": self.spill_below,
+            **self.stats,
+            "tail_passes": self.passes,
+            "pruned_occurrence_rate": ratio(
+                self.stats["pruned_occurrences"], occurrences
+            ),
+            "tail_occurrence_rate": ratio(self.stats["tail_occurrences"], occurrences),
+            "tail_frequency_share": ratio(
+                sum(step["tail_frequency"] for step in steps),
+                sum(step["frequency"] for step in steps),
+            ),
+            "tail_merges": len(tail_driven),
+            "tail_merge_tokens": [step["new_token"] for step in tail_driven[:50]],
+        }
@@ -0,0 +1,715 @@
+import argparse
+import asyncio
+import concurrent.futures
+import contextlib
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCHMARK_DIR = os.path.join(BACKEND_DIR, "benchmarks")
+DEFAULT_CORPUS = os.path.join(BENCHMARK_DIR, "hindi_sample.txt")
+MIXED_CORPUS = os.path.join(BENCHMARK_DIR, "hindi_mixed_sample.txt")
+DEFAULT_VOCAB_SIZES = [150, 300, 500]
+
+# Direction of each metric: +1 means higher is better, -1 means lower is better
+METRIC_DIRECTIONS = {
+    "merges_per_sec": 1,
+    "encode_words_per_sec": 1,
+    "encode_tokens_per_sec": 1,
+    "details_words_per_sec": 1,
+    "details_tokens_per_sec": 1,
+    "count_words_per_sec": 1,
+    "count_tokens_per_sec": 1,
+    "model_load_seconds": -1,
+    "peak_rss_kb": -1,
+}
+# Modules only training needs; importing the API must not pull them in
+TRAINING_ONLY_MODULES = (
+    "tqdm",
+    "numpy",
+    "train_bpe",
+    "app.adaptive_bpe",
+    "app.packed_corpus",
+    "app.training_profiler",
+)
+PRETOKENIZE_METRIC_DIRECTIONS = {
+    "pretokenize_mb_per_sec": 1,
+    "pretokenize_words_per_sec": 1,
+}
+
+
+def load_corpus(file_path: str) -> list:
+    """Load non-empty lines of the benchmark corpus"""
+    with open(file_path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def _peak_rss_kb() -> int:
+    """Peak resident set size of this process in KB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports kilobytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _time_encode(encode, lines: list, repeats: int):
+    """Run an encode function over all lines and return (seconds, words, tokens)"""
+    words = 0
+    tokens = 0
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for line in lines:
+            words += len(line.split())
+            tokens += len(encode(line))
+    return time.perf_counter() - start, words, tokens
+
+
+def _time_count(count, lines: list, repeats: int):
+    """Like _time_encode for a function that returns a token count"""
+    words = 0
+    tokens = 0
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for line in lines:
+            words += len(line.split())
+            tokens += count(line)
+    return time.perf_counter() - start, words, tokens
+
+
+def _bench_vocab_size(args) -> dict:
+    """Train, save, reload and encode with one vocab size (runs in a fresh process)"""
+    corpus_path, vocab_size, repeats, segmentation, backend = args
+    from app.bpe_tokenizer import BPETokenizer
+
+    lines = load_corpus(corpus_path)
+    text = "\n".join(lines)
+
+    # learn_bpe writes checkpoints to the working directory, keep them out of the repo
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        tokenizer = BPETokenizer(
+            vocab_size=vocab_size, segmentation=segmentation, backend=backend
+        )
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+            io.StringIO()
+        ):
+            start = time.perf_counter()
+            asyncio.run(tokenizer.learn_bpe(text))
+            train_seconds = time.perf_counter() - start
+            tokenizer._save_intermediate_vocab("model.json")
+
+            loaded = BPETokenizer(vocab_size=vocab_size)
+            start = time.perf_counter()
+            loaded.load_model("model.json")
+            load_seconds = time.perf_counter() - start
+
+    num_merges = len(tokenizer.merge_history)
+    encode_seconds, encode_words, encode_tokens = _time_encode(
+        loaded.tokenize_bpe, lines, repeats
+    )
+    details_seconds, details_words, details_tokens = _time_encode(
+        lambda line: loaded.tokenize_with_details(line)["bpe_tokens"], lines, repeats
+    )
+    count_seconds, count_words, count_tokens = _time_count(
+        loaded.count_tokens, lines, repeats
+    )
+
+    return {
+        "vocab_size": vocab_size,
+        "final_vocab_size": len(tokenizer.vocab),
+        "num_merges": num_merges,
+        "train_seconds": round(train_seconds, 4),
+        "merges_per_sec": round(num_merges / train_seconds, 2) if train_seconds else 0,
+        "model_load_seconds": round(load_seconds, 6),
+        "encode_words_per_sec": round(encode_words / encode_seconds, 2),
+        "encode_tokens_per_sec": round(encode_tokens / encode_seconds, 2),
+        "details_words_per_sec": round(details_words / details_seconds, 2),
+        "details_tokens_per_sec": round(details_tokens / details_seconds, 2),
+        "count_words_per_sec": round(count_words / count_seconds, 2),
+        "count_tokens_per_sec": round(count_tokens / count_seconds, 2),
+        "peak_rss_kb": _peak_rss_kb(),
+    }
+
+
+def bench_pretokenize(lines: list, repeats: int = 20) -> dict:
+    """Throughput of the shared pre-tokenizer against a plain whitespace split"""
+    from app.pretokenizer import pretokenize
+
+    text = "\n".join(lines)
+    megabytes = len(text.encode("utf-8")) * repeats / 1e6
+
+    results = {}
+    for name, split in (("split", str.split), ("pretokenize", pretokenize)):
+        words = 0
+        start = time.perf_counter()
+        for _ in range(repeats):
+            words += len(split(text))
+        seconds = time.perf_counter() - start
+        results[f"{name}_mb_per_sec"] = round(megabytes / seconds, 2)
+        results[f"{name}_words_per_sec"] = round(words / seconds, 2)
+    return results
+
+
+def run_benchmarks(
+    corpus_path: str,
+    vocab_sizes: list,
+    repeats: int = 3,
+    segmentation: str = "char",
+    backend: str = "python",
+) -> dict:
+    """Benchmark training and tokenization for several vocab sizes"""
+    with open(corpus_path, "rb") as f:
+        corpus_sha1 = hashlib.sha1(f.read()).hexdigest()
+
+    results = []
+    # A fresh process per vocab size keeps peak RSS and caches independent
+    context = multiprocessing.get_context("spawn")
+    for vocab_size in vocab_sizes:
+        print(f"Benchmarking vocab size {vocab_size}...")
+        with concurrent.futures.ProcessPoolExecutor(1, mp_context=context) as pool:
+            result = pool.submit(
+                _bench_vocab_size,
+                (corpus_path, vocab_size, repeats, segmentation, backend),
+            ).result()
+        print(
+            f"  {result['num_merges']} merges at {result['merges_per_sec']} merges/sec, "
+            f"{result['encode_words_per_sec']} words/sec, "
+            f"{result['count_words_per_sec']} words/sec counting only, "
+            f"peak RSS {result['peak_rss_kb']} KB"
+        )
+        results.append(result)
+
+    pretokenize_results = bench_pretokenize(load_corpus(corpus_path))
+    print(
+        f"Pre-tokenizer: {pretokenize_results['pretokenize_mb_per_sec']} MB/s "
+        f"(whitespace split: {pretokenize_results['split_mb_per_sec']} MB/s)"
+    )
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "corpus": os.path.relpath(corpus_path),
+            "corpus_sha1": corpus_sha1,
+            "repeats": repeats,
+            "segmentation": segmentation,
+            "backend": backend,
+        },
+        "results": results,
+        "pretokenize": pretokenize_results,
+    }
+
+
+def _memory_kb() -> dict:
+    """Rss, Pss and private memory of this process in KB (Linux only)"""
+    usage = {}
+    with open("/proc/self/smaps_rollup", "r") as f:
+        for line in f:
+            field, _, value = line.partition(":")
+            if field in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+                usage[field] = int(value.split()[0])
+    return {
+        "rss_kb": usage["Rss"],
+        "pss_kb": usage["Pss"],
+        "private_kb": usage["Private_Clean"] + usage["Private_Dirty"],
+    }
+
+
+def _serving_worker(mode, model_path, corpus_path, barrier, results):
+    """Load a model like one uvicorn worker would and report its memory"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app.bpe_tokenizer import BPETokenizer
+
+        lines = load_corpus(corpus_path)
+        before = _memory_kb()
+        tokenizer = BPETokenizer()
+        if mode == "binary":
+            tokenizer.load_binary_model(model_path)
+        else:
+            tokenizer.load_model(model_path)
+        for line in lines:
+            tokenizer.tokenize_with_details(line)
+    # Measure while every worker is alive, so Pss splits shared pages fairly
+    barrier.wait()
+    after = _memory_kb()
+    results.put({key: after[key] - before[key] for key in after})
+    barrier.wait()
+
+
+def bench_workers(model_path: str, corpus_path: str, worker_counts: list) -> dict:
+    """Memory taken by the serving model across N worker processes
+
+    Compares loading the JSON model in every worker with mapping the shared
+    binary model built by preload_model.py. Reported numbers are the increase
+    caused by loading the model and encoding the corpus, summed over workers.
+    """
+    from preload_model import preload_model
+
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as workdir:
+        json_path = os.path.join(workdir, "model.json")
+        with open(model_path, "rb") as src, open(json_path, "wb") as dst:
+            dst.write(src.read())
+        with contextlib.redirect_stdout(io.StringIO()):
+            binary_path = preload_model(json_path)
+
+        for mode, path in (("json", json_path), ("binary", binary_path)):
+            for count in worker_counts:
+                barrier = context.Barrier(count)
+                queue = context.Queue()
+                workers = [
+                    context.Process(
+                        target=_serving_worker,
+                        args=(mode, path, corpus_path, barrier, queue),
+                    )
+                    for _ in range(count)
+                ]
+                for worker in workers:
+                    worker.start()
+                usage = [queue.get() for _ in workers]
+                for worker in workers:
+                    worker.join()
+
+                totals = {
+                    f"total_{key}": sum(u[key] for u in usage) for key in usage[0]
+                }
+                results[f"{mode}_{count}"] = {
+                    "mode": mode,
+                    "workers": count,
+                    **totals,
+                }
+                print(
+                    f"{mode:>6} x{count:<3} model memory: "
+                    f"Pss {totals['total_pss_kb']:>8} KB, "
+                    f"private {totals['total_private_kb']:>8} KB, "
+                    f"Rss {totals['total_rss_kb']:>8} KB"
+                )
+    return results
+
+
+def bench_mixed(model_path: str, corpus_path: str, repeats: int = 20) -> dict:
+    """Cold-cache encode speed and id coverage on code-mixed text
+
+    Compares the script-aware encoder with running every pre-token through the
+    merge loop (how non-Devanagari text used to be encoded) and counts how many
+    tokens get a vocabulary id, a reserved fallback id or no id at all.
+    """
+    from app.bpe_tokenizer import BPETokenizer
+    from app.pretokenizer import pretokenize
+
+    tokenizer = BPETokenizer()
+    with contextlib.redirect_stdout(io.StringIO()):
+        tokenizer.load_model(model_path)
+    lines = load_corpus(corpus_path)
+    words = [word for line in lines for word in line.split()]
+
+    def merge_loop_only(word):
+        tokens = []
+        for piece in pretokenize(word):
+            tokens.extend(tokenizer._apply_merges(piece))
+        return tuple(tokens)
+
+    # Uncached, as for the mostly unique URLs, numbers and names of real
+    # traffic; the two encoders alternate and the best pass of each counts
+    encoders = {
+        "script_aware": tokenizer._encode_word_uncached,
+        "merge_loop_only": merge_loop_only,
+    }
+    best = dict.fromkeys(encoders, float("inf"))
+    for _ in range(repeats):
+        for name, encode in encoders.items():
+            start = time.perf_counter()
+            for word in words:
+                encode(word)
+            best[name] = min(best[name], time.perf_counter() - start)
+    results = {
+        f"{name}_words_per_sec": round(len(words) / seconds, 2)
+        for name, seconds in best.items()
+    }
+
+    token_numbers = tokenizer.get_token_numbers()
+    tokens = tokenizer.tokenize_bpe("\n".join(lines))
+    ids = [tokenizer.token_id(token) for token in tokens]
+    total = max(len(tokens), 1)
+    results["tokens"] = len(tokens)
+    results["vocab_id_rate"] = round(
+        sum(token in token_numbers for token in tokens) / total, 4
+    )
+    fallback = sum(
+        token not in token_numbers and token_id >= 0
+        for token, token_id in zip(tokens, ids)
+    )
+    results["fallback_id_rate"] = round(fallback / total, 4)
+    results["unknown_rate"] = round(ids.count(-1) / total, 4)
+    results["unknown_rate_without_fallback"] = round(
+        sum(token not in token_numbers for token in tokens) / total, 4
+    )
+    print(
+        f"Script-aware: {results['script_aware_words_per_sec']} words/sec, "
+        f"merge loop only: {results['merge_loop_only_words_per_sec']} words/sec"
+    )
+    print(
+        f"Ids: {results['vocab_id_rate']} vocabulary, "
+        f"{results['fallback_id_rate']} reserved fallback, "
+        f"{results['unknown_rate']} unknown "
+        f"(would be {results['unknown_rate_without_fallback']} without fallback ids)"
+    )
+    return results
+
+
+def bench_live(
+    model_path: str, corpus_path: str, multipliers: list, edits: int = 2000
+) -> dict:
+    """Per-edit latency of live re-tokenization against document length
+
+    The corpus is repeated `multipliers` times to build documents of growing
+    size; random single-character inserts are applied with LiveDocument and
+    compared with re-tokenizing the whole document once.
+    """
+    import random
+
+    from app.bpe_tokenizer import BPETokenizer
+    from app.live_document import LiveDocument
+
+    tokenizer = BPETokenizer()
+    with contextlib.redirect_stdout(io.StringIO()):
+        tokenizer.load_model(model_path)
+    base = "\n".join(load_corpus(corpus_path))
+
+    results = {}
+    for multiplier in multipliers:
+        text = "\n".join([base] * multiplier)
+        document = LiveDocument(tokenizer)
+        document.reset(text)
+        rng = random.Random(0)
+        latencies = []
+        for _ in range(edits):
+            position = rng.randrange(document.length + 1)
+            started = time.perf_counter()
+            document.edit(position, position, "क")
+            latencies.append(time.perf_counter() - started)
+        latencies.sort()
+
+        started = time.perf_counter()
+        tokenizer.tokenize_bpe(text)
+        full_seconds = time.perf_counter() - started
+
+        result = results[str(len(text))] = {
+            "chars": len(text),
+            "edit_p50_us": round(latencies[len(latencies) // 2] * 1e6, 1),
+            "edit_p99_us": round(latencies[int(len(latencies) * 0.99)] * 1e6, 1),
+            "full_tokenize_us": round(full_seconds * 1e6, 1),
+        }
+        print(
+            f"{len(text):>9} chars: edit p50 {result['edit_p50_us']} us, "
+            f"p99 {result['edit_p99_us']} us, "
+            f"full re-tokenize {result['full_tokenize_us']} us"
+        )
+    return results
+
+
+def _import_times(module: str) -> dict:
+    """(self, cumulative) microseconds per module from one `-X importtime` run"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+_STARTUP_SCRIPT = """
+import asyncio, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def startup():
+    async with main.app.router.lifespan_context(main.app):
+        pass
+
+asyncio.run(startup())
+print(imported - started, time.perf_counter() - imported)
+"""
+
+
+def bench_startup(module: str = "main", repeats: int = 5) -> dict:
+    """Cold import time of the API module and the time its startup preload takes
+
+    Every run is a fresh interpreter. Import times are the median of `repeats`
+    `python -X importtime` runs; `own_import_ms` only counts this project's
+    modules, which is the part changes here can move.
+    """
+    runs = [_import_times(module) for _ in range(repeats)]
+    import_ms = statistics.median(times[module][1] for times in runs) / 1000
+    own_import_ms = (
+        statistics.median(
+            sum(
+                self_us
+                for name, (self_us, _) in times.items()
+                if name == module or name == "app" or name.startswith("app.")
+            )
+            for times in runs
+        )
+        / 1000
+    )
+    slowest = sorted(runs[-1].items(), key=lambda item: -item[1][0])[:10]
+    training_imports = [name for name in TRAINING_ONLY_MODULES if name in runs[-1]]
+
+    startup = []
+    for _ in range(repeats):
+        proc = subprocess.run(
+            [sys.executable, "-c", _STARTUP_SCRIPT],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        startup.append([float(value) for value in proc.stdout.split()[-2:]])
+
+    results = {
+        "module": module,
+        "repeats": repeats,
+        "import_ms": round(import_ms, 1),
+        "own_import_ms": round(own_import_ms, 1),
+        "wall_import_ms": round(statistics.median(r[0] for r in startup) * 1000, 1),
+        "preload_ms": round(statistics.median(r[1] for r in startup) * 1000, 1),
+        "training_only_imports": training_imports,
+        "slowest_modules_self_ms": {
+            name: round(self_us / 1000, 1) for name, (self_us, _) in slowest
+        },
+    }
+    print(
+        f"import {module}: {results['import_ms']} ms "
+        f"({results['own_import_ms']} ms in this project's modules), "
+        f"startup preload: {results['preload_ms']} ms"
+    )
+    if training_imports:
+        print(f"Training-only modules imported: {', '.join(training_imports)}")
+    return results
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = 0.1) -> list:
+    """Compare two benchmark runs and return the metrics that regressed"""
+    regressions = []
+    baseline_by_size = {r["vocab_size"]: r for r in baseline["results"]}
+
+    for result in current["results"]:
+        base = baseline_by_size.get(result["vocab_size"])
+        if base is None:
+            continue
+        for metric, direction in METRIC_DIRECTIONS.items():
+            if metric not in base or metric not in result or not base[metric]:
+                continue
+            change = (result[metric] - base[metric]) / base[metric]
+            status = "ok"
+            if change * direction < -threshold:
+                status = "REGRESSION"
+                regressions.append(
+                    {
+                        "vocab_size": result["vocab_size"],
+                        "metric": metric,
+                        "baseline": base[metric],
+                        "current": result[metric],
+                        "change": round(change, 4),
+                    }
+                )
+            print(
+                f"vocab {result['vocab_size']:>6} {metric:<24} "
+                f"{base[metric]:>14} -> {result[metric]:>14} ({change:+.1%}) {status}"
+            )
+
+    base = baseline.get("pretokenize", {})
+    result = current.get("pretokenize", {})
+    for metric, direction in PRETOKENIZE_METRIC_DIRECTIONS.items():
+        if not base.get(metric) or metric not in result:
+            continue
+        change = (result[metric] - base[metric]) / base[metric]
+        status = "ok"
+        if change * direction < -threshold:
+            status = "REGRESSION"
+            regressions.append(
+                {
+                    "metric": metric,
+                    "baseline": base[metric],
+                    "current": result[metric],
+                    "change": round(change, 4),
+                }
+            )
+        print(
+            f"{'':>12} {metric:<24} "
+            f"{base[metric]:>14} -> {result[metric]:>14} ({change:+.1%}) {status}"
+        )
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hindi BPE benchmark suite")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    run_parser.add_argument(
+        "--vocab-sizes",
+        default=",".join(str(size) for size in DEFAULT_VOCAB_SIZES),
+        help="Comma-separated vocab sizes to train",
+    )
+    run_parser.add_argument("--repeats", type=int, default=3)
+    run_parser.add_argument("--output", default="benchmark_results.json")
+    run_parser.add_argument(
+        "--segmentation",
+        choices=("char", "akshara"),
+        default="char",
+        help="Initial symbols BPE starts from",
+    )
+    run_parser.add_argument(
+        "--backend",
+        choices=("python", "numpy"),
+        default="python",
+        help="Pair counting backend used for training",
+    )
+
+    pretokenize_parser = subparsers.add_parser(
+        "pretokenize", help="Measure pre-tokenizer throughput only"
+    )
+    pretokenize_parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    pretokenize_parser.add_argument("--repeats", type=int, default=20)
+
+    workers_parser = subparsers.add_parser(
+        "workers", help="Compare model memory across worker processes"
+    )
+    workers_parser.add_argument("--model", default="bpe_model_latest.json")
+    workers_parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    workers_parser.add_argument("--counts", default="1,4,16")
+    workers_parser.add_argument("--output")
+
+    mixed_parser = subparsers.add_parser(
+        "mixed", help="Measure encoding of code-mixed Hindi/English text"
+    )
+    mixed_parser.add_argument("--model", default="bpe_model_latest.json")
+    mixed_parser.add_argument("--corpus", default=MIXED_CORPUS)
+    mixed_parser.add_argument("--repeats", type=int, default=20)
+    mixed_parser.add_argument("--output")
+
+    live_parser = subparsers.add_parser(
+        "live", help="Measure incremental re-tokenization latency per edit"
+    )
+    live_parser.add_argument("--model", default="bpe_model_latest.json")
+    live_parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    live_parser.add_argument(
+        "--multipliers",
+        default="1,10,100",
+        help="Comma-separated number of corpus copies per document",
+    )
+    live_parser.add_argument("--edits", type=int, default=2000)
+    live_parser.add_argument("--output")
+
+    startup_parser = subparsers.add_parser(
+        "startup", help="Measure API import and startup time against a budget"
+    )
+    startup_parser.add_argument("--module", default="main")
+    startup_parser.add_argument("--repeats", type=int, default=5)
+    startup_parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=None,
+        help="Fail when the median import time is above this",
+    )
+    startup_parser.add_argument(
+        "--own-budget-ms",
+        type=float,
+        default=50.0,
+        help="Fail when this project's modules take longer than this to import",
+    )
+    startup_parser.add_argument("--output")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Relative change that counts as a regression",
+    )
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        vocab_sizes = [int(size) for size in args.vocab_sizes.split(",")]
+        results = run_benchmarks(
+            args.corpus, vocab_sizes, args.repeats, args.segmentation, args.backend
+        )
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Results saved to {args.output}")
+    elif args.command == "pretokenize":
+        results = bench_pretokenize(load_corpus(args.corpus), args.repeats)
+        print(json.dumps(results, indent=2))
+    elif args.command == "workers":
+        worker_counts = [int(count) for count in args.counts.split(",")]
+        results = bench_workers(args.model, args.corpus, worker_counts)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+    elif args.command == "mixed":
+        results = bench_mixed(args.model, args.corpus, args.repeats)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+    elif args.command == "live":
+        multipliers = [int(m) for m in args.multipliers.split(",")]
+        results = bench_live(args.model, args.corpus, multipliers, args.edits)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+    elif args.command == "startup":
+        results = bench_startup(args.module, args.repeats)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+        failures = []
+        if args.budget_ms is not None and results["import_ms"] > args.budget_ms:
+            failures.append(f"import time above {args.budget_ms} ms")
+        if results["own_import_ms"] > args.own_budget_ms:
+            failures.append(f"project import time above {args.own_budget_ms} ms")
+        if results["training_only_imports"]:
+            failures.append("training-only modules imported")
+        if failures:
+            print("Startup budget exceeded: " + "; ".join(failures))
+            sys.exit(1)
+        print("Startup within budget")
+    else:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        with open(args.current, "r", encoding="utf-8") as f:
+            current = json.load(f)
+        regressions = compare_results(baseline, current, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}")
+            sys.exit(1)
+        print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+
+from app.bpe_tokenizer import _write_json_atomic
+from app.hindi_tokenizer import HindiTokenizer
+
+
+def ranked_token_numbers(base_symbols, merges, vocab) -> dict:
+    """Token ids in merge rank order: base symbols first, then merge results
+
+    Every model truncated from the same training run numbers its tokens as a
+    prefix of the largest model's table, so an id means the same token in all
+    of them.
+    """
+    token_numbers = {}
+    for token in list(base_symbols) + list(merges.values()):
+        if token in vocab and token not in token_numbers:
+            token_numbers[token] = len(token_numbers) + 1
+    return token_numbers
+
+
+def truncate_model(model_data: dict, vocab_size: int) -> dict:
+    """Model with the longest prefix of ranked merges that fits `vocab_size`
+
+    Works on the JSON form of a model, where merges are keyed "left right" in
+    the order training learned them. The vocabulary is the base vocabulary,
+    the initial symbols and the results of the kept merges; tokens no kept
+    merge produces (e.g. whole words promoted by frequency) are left out.
+    Raises ValueError when the base vocabulary and initial symbols alone are
+    larger than `vocab_size`.
+    """
+    base_vocab = HindiTokenizer().BASE_VOCAB
+    initial_symbols = sorted(set(model_data.get("initial_symbols", [])) - base_vocab)
+    base_symbols = sorted(base_vocab) + initial_symbols
+    if len(base_symbols) > vocab_size:
+        raise ValueError(
+            f"Cannot derive a {vocab_size} token model: the base vocabulary and "
+            f"initial symbols alone have {len(base_symbols)} tokens"
+        )
+
+    # Adaptive review adds merges whose result never joined the vocabulary;
+    # they are kept in rank order but only vocabulary tokens count to the size
+    source_vocab = set(model_data["vocab"])
+    vocab = set(base_symbols)
+    merges = {}
+    for pair, merged in model_data["merges"].items():
+        if merged in source_vocab and merged not in vocab:
+            if len(vocab) >= vocab_size:
+                break
+            vocab.add(merged)
+        merges[pair] = merged
+
+    merge_history = [
+        step
+        for step in model_data["merge_history"]
+        if " ".join(step["pair"]) in merges
+    ]
+    learned = vocab - set(base_symbols)
+    return {
+        "vocab": sorted(vocab),
+        "learned_vocab": sorted(learned),
+        "merges": merges,
+        "merge_history": merge_history,
+        "base_vocab_stats": model_data.get("base_vocab_stats", {}),
+        "segmentation": model_data.get("segmentation", "char"),
+        "initial_symbols": initial_symbols,
+        "token_numbers": ranked_token_numbers(base_symbols, merges, vocab),
+        "training_stats": {
+            "total_merges": len(merges),
+            "vocab_size": len(vocab),
+            "learned_vocab_size": len(learned),
+        },
+    }
+
+
+def train_source_model(corpus_path, vocab_size, segmentation, max_sentences, output):
+    """Train one model at the largest size for the other sizes to be cut from"""
+    from app.bpe_tokenizer import BPETokenizer
+    from train_bpe import load_sample_data
+
+    text = load_sample_data(corpus_path, max_sentences=max_sentences)
+    tokenizer = BPETokenizer(vocab_size=vocab_size, segmentation=segmentation)
+    output = os.path.abspath(output)
+    cwd = os.getcwd()
+    # learn_bpe writes checkpoints to the working directory, which would replace
+    # the served bpe_model_latest.json; keep them out of it
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            asyncio.run(tokenizer.learn_bpe(text))
+        finally:
+            os.chdir(cwd)
+    tokenizer._save_intermediate_vocab(output)
+    return output
+
+
+def derive_models(
+    model_path: str,
+    vocab_sizes,
+    output_dir: str = ".",
+    prefix: str = "bpe_model_v",
+    heldout_paths=None,
+    heldout_lines: int = 5000,
+    workers: int = None,
+) -> list:
+    """Write one truncated model per vocab size, with held-out metrics if given"""
+    from app.model_registry import file_version
+
+    with open(model_path, "r", encoding="utf-8") as f:
+        source = json.load(f)
+    source_version = file_version(model_path)
+    os.makedirs(output_dir, exist_ok=True)
+
+    evaluator = None
+    if heldout_paths:
+        from app.evaluation import HeldOutEvaluator, read_heldout
+
+        lines = read_heldout(heldout_paths, heldout_lines)
+        evaluator = HeldOutEvaluator(lines, workers)
+
+    derived = []
+    try:
+        for vocab_size in sorted(vocab_sizes):
+            try:
+                model_data = truncate_model(source, vocab_size)
+            except ValueError as e:
+                print(f"Warning: Skipping vocab size {vocab_size}. {e}")
+                continue
+            model_data["derived_from"] = {
+                "model": os.path.basename(model_path),
+                "version": source_version,
+                "vocab_size": vocab_size,
+            }
+            path = os.path.join(output_dir, f"{prefix}{vocab_size}.json")
+            _write_json_atomic(path, model_data)
+
+            summary = {
+                "path": path,
+                "vocab_size": len(model_data["vocab"]),
+                "merges": len(model_data["merges"]),
+            }
+            if len(model_data["vocab"]) < vocab_size:
+                print(
+                    f"Warning: {model_path} only has enough merges for "
+                    f"{len(model_data['vocab'])} tokens, not {vocab_size}"
+                )
+            if evaluator is not None:
+                metrics = evaluator.evaluate(path)
+                for key in ("model", "version"):
+                    metrics.pop(key)
+                model_data["heldout_metrics"] = [metrics]
+                _write_json_atomic(path, model_data)
+                summary["heldout_metrics"] = metrics
+            derived.append(summary)
+            print(
+                f"{path}: {summary['vocab_size']} tokens, {summary['merges']} merges"
+                + (
+                    f", {metrics['chars_per_token']} chars/token, "
+                    f"{metrics['tokens_per_word']} tokens/word"
+                    if evaluator is not None
+                    else ""
+                )
+            )
+    finally:
+        if evaluator is not None:
+            evaluator.close()
+    return derived
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Derive smaller BPE models from one trained model by "
+        "truncating its ranked merge list"
+    )
+    parser.add_argument("--model", default="bpe_model_latest.json")
+    parser.add_argument("--vocab-sizes", default="2000,5000,8000,10000")
+    parser.add_argument("--output-dir", default=".")
+    parser.add_argument("--prefix", default="bpe_model_v")
+    parser.add_argument(
+        "--corpus",
+        help="Train --model at the largest vocab size from this corpus first",
+    )
+    parser.add_argument("--max-sentences", type=int, default=None)
+    parser.add_argument("--segmentation", choices=("char", "akshara"), default="char")
+    parser.add_argument("--heldout", nargs="*", help="Held-out text files")
+    parser.add_argument("--heldout-lines", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", help="Write a summary of the derived models")
+    args = parser.parse_args()
+
+    vocab_sizes = [int(size) for size in args.vocab_sizes.split(",")]
+    if args.corpus:
+        train_source_model(
+            args.corpus,
+            max(vocab_sizes),
+            args.segmentation,
+            args.max_sentences,
+            args.model,
+        )
+
+    derived = derive_models(
+        args.model,
+        vocab_sizes,
+        output_dir=args.output_dir,
+        prefix=args.prefix,
+        heldout_paths=args.heldout,
+        heldout_lines=args.heldout_lines,
+        workers=args.workers,
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(derived, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
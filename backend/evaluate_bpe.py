@@ -0,0 +1,66 @@
+import argparse
+import json
+
+from app.evaluation import EarlyStopping, HeldOutEvaluator, read_heldout
+
+COLUMNS = (
+    ("chars_per_token", "chars/tok"),
+    ("tokens_per_word", "tok/word"),
+    ("devanagari_tokens_per_word", "dev tok/word"),
+    ("unk_rate", "unk"),
+    ("fallback_rate", "fallback"),
+    ("vocab_utilization", "vocab used"),
+    ("seconds", "seconds"),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Evaluate BPE models (e.g. training checkpoints) on held-out text"
+    )
+    parser.add_argument("heldout", nargs="+", help="Held-out text files")
+    parser.add_argument(
+        "--model",
+        action="append",
+        help="Model file (.json or .bin); repeat in training order for checkpoints",
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-lines", type=int, default=None)
+    parser.add_argument("--batch-lines", type=int, default=500)
+    parser.add_argument("--output", help="Write the metrics of every model as JSON")
+    parser.add_argument(
+        "--min-gain",
+        type=float,
+        default=0.002,
+        help="Relative chars/token gain below which a checkpoint counts as stale",
+    )
+    parser.add_argument("--patience", type=int, default=3)
+    args = parser.parse_args()
+
+    lines = read_heldout(args.heldout, args.max_lines)
+    print(f"Held-out sample: {len(lines)} lines")
+    early_stopping = EarlyStopping(min_gain=args.min_gain, patience=args.patience)
+
+    results = []
+    stop_at = None
+    print("model".ljust(32) + "".join(label.rjust(14) for _, label in COLUMNS))
+    with HeldOutEvaluator(lines, args.workers, args.batch_lines) as evaluator:
+        for model_path in args.model or ["bpe_model_latest.json"]:
+            metrics = evaluator.evaluate(model_path)
+            results.append(metrics)
+            print(
+                model_path[-32:].ljust(32)
+                + "".join(f"{metrics[key]:>14}" for key, _ in COLUMNS)
+            )
+            if early_stopping.update(metrics) and stop_at is None:
+                stop_at = model_path
+                print(f"  -> chars/token stopped improving, could stop at {stop_at}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
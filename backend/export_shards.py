@@ -0,0 +1,258 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from app.bpe_tokenizer import FALLBACK_IDS, _write_json_atomic
+from app.evaluation import load_tokenizer
+
+UNK_ID = 0  # Token numbers start at 1, so 0 is free for unknown tokens
+
+_worker_tokenizer = None
+_worker_eos_id = None
+
+
+def _init_worker(model_path: str, eos_id):
+    """Load the model once per worker process"""
+    global _worker_tokenizer, _worker_eos_id
+    _worker_tokenizer = load_tokenizer(model_path)
+    _worker_eos_id = eos_id
+
+
+def _encode_batch(batch):
+    """Encode a batch of lines into (first line, flat ids, per-line lengths, bytes)"""
+    first_line, lines = batch
+    ids = []
+    lengths = []
+    num_bytes = 0
+    for line in lines:
+        num_bytes += len(line.encode("utf-8"))
+        line_ids = _worker_tokenizer.encode_ids(line, unk_id=UNK_ID)
+        if line_ids and _worker_eos_id is not None:
+            line_ids.append(_worker_eos_id)
+        ids.extend(line_ids)
+        lengths.append(len(line_ids))
+    return (
+        first_line,
+        np.array(ids, dtype=np.uint32),
+        np.array(lengths, dtype=np.int64),
+        num_bytes,
+    )
+
+
+def read_batches(paths, start_line: int, batch_lines: int):
+    """Yield (first line number, lines) from all corpus files, from `start_line`"""
+    line_number = 0
+    batch = []
+    batch_start = start_line
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line_number >= start_line:
+                    batch.append(line.strip())
+                    if len(batch) == batch_lines:
+                        yield batch_start, batch
+                        batch_start += len(batch)
+                        batch = []
+                line_number += 1
+    if batch:
+        yield batch_start, batch
+
+
+class ShardWriter:
+    """Cut a stream of token ids into fixed-size shards and keep the index current
+
+    After every shard the index records the cursor (line, token offset within
+    that line) of the first token not yet written, so an interrupted export
+    resumes exactly there.
+    """
+
+    def __init__(self, output_dir: str, index: dict):
+        self.output_dir = output_dir
+        self.index = index
+        self.dtype = np.dtype(index["dtype"])
+        self.shard_tokens = index["shard_tokens"]
+        self._buffer = []
+        self._buffered = 0
+
+    @property
+    def index_path(self):
+        return os.path.join(self.output_dir, "index.json")
+
+    def add(self, first_line: int, ids, lengths, skip: int = 0):
+        """Add a batch, skipping its first `skip` tokens (already written)"""
+        ends = np.cumsum(lengths)
+        position = skip
+        while self._buffered + len(ids) - position >= self.shard_tokens:
+            cut = position + self.shard_tokens - self._buffered
+            self._buffer.append(ids[position:cut])
+            # Line holding the first token that is not yet written
+            line = int(np.searchsorted(ends, cut, side="right"))
+            offset = cut - (int(ends[line - 1]) if line else 0)
+            self._write_shard((first_line + line, offset))
+            position = cut
+        if position < len(ids):
+            self._buffer.append(ids[position:])
+            self._buffered += len(ids) - position
+
+    def finish(self, end_line: int):
+        if self._buffered:
+            self._write_shard((end_line, 0))
+        self.index["cursor"] = [end_line, 0]
+        self.index["complete"] = True
+        _write_json_atomic(self.index_path, self.index)
+
+    def _write_shard(self, cursor):
+        shards = self.index["shards"]
+        name = f"shard_{len(shards):05d}.bin"
+        data = np.concatenate(self._buffer).astype(self.dtype)
+        tmp_path = os.path.join(self.output_dir, f"{name}.tmp")
+        data.tofile(tmp_path)
+        os.replace(tmp_path, os.path.join(self.output_dir, name))
+
+        shards.append({"file": name, "tokens": len(data)})
+        self.index["cursor"] = list(cursor)
+        self.index["total_tokens"] += len(data)
+        _write_json_atomic(self.index_path, self.index)
+        self._buffer = []
+        self._buffered = 0
+
+
+def _corpus_info(paths):
+    return [{"path": path, "bytes": os.path.getsize(path)} for path in paths]
+
+
+def export_shards(
+    corpus_paths,
+    model_path: str,
+    output_dir: str,
+    shard_tokens: int = 1 << 24,
+    workers: int = None,
+    batch_lines: int = 2000,
+    append_eos: bool = False,
+) -> dict:
+    """Encode corpus files into token id shards that np.memmap can open"""
+    from app.model_registry import file_version
+
+    os.makedirs(output_dir, exist_ok=True)
+    index_path = os.path.join(output_dir, "index.json")
+
+    tokenizer = load_tokenizer(model_path)
+    # Vocabulary ids are followed by the ids reserved for single characters
+    max_id = tokenizer.fallback_base() + FALLBACK_IDS - 1
+    eos_id = max_id + 1 if append_eos else None
+    top_id = max(max_id, eos_id or 0)
+    dtype = "uint16" if top_id <= np.iinfo(np.uint16).max else "uint32"
+
+    settings = {
+        "model": os.path.basename(model_path),
+        "model_version": file_version(model_path),
+        "corpus": _corpus_info(corpus_paths),
+        "dtype": dtype,
+        "shard_tokens": shard_tokens,
+        "unk_id": UNK_ID,
+        "eos_id": eos_id,
+        "max_id": top_id,
+    }
+
+    index = None
+    if os.path.exists(index_path):
+        with open(index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if any(index.get(key) != value for key, value in settings.items()):
+            raise SystemExit(
+                f"{index_path} was written with different settings; "
+                "use a new --output-dir to start over"
+            )
+        if index["complete"]:
+            print(f"Export already complete: {index['total_tokens']} tokens")
+            return index
+        print(
+            f"Resuming after {len(index['shards'])} shards "
+            f"at line {index['cursor'][0]}, token {index['cursor'][1]}"
+        )
+    else:
+        index = {
+            **settings,
+            "shards": [],
+            "cursor": [0, 0],
+            "total_tokens": 0,
+            "complete": False,
+        }
+
+    writer = ShardWriter(output_dir, index)
+    start_line, skip = index["cursor"]
+    started = time.perf_counter()
+    last_report = started
+    lines = tokens = num_bytes = 0
+    end_line = start_line
+
+    batches = read_batches(corpus_paths, start_line, batch_lines)
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(
+        workers or os.cpu_count(),
+        initializer=_init_worker,
+        initargs=(model_path, eos_id),
+    ) as pool:
+        for first_line, ids, lengths, batch_bytes in pool.imap(_encode_batch, batches):
+            writer.add(first_line, ids, lengths, skip)
+            skip = 0
+            end_line = first_line + len(lengths)
+            lines += len(lengths)
+            tokens += len(ids)
+            num_bytes += batch_bytes
+
+            now = time.perf_counter()
+            if now - last_report >= 5:
+                last_report = now
+                _report(lines, tokens, num_bytes, now - started, len(index["shards"]))
+
+    writer.finish(end_line)
+    elapsed = time.perf_counter() - started
+    _report(lines, tokens, num_bytes, elapsed, len(index["shards"]))
+    print(f"Wrote {index['total_tokens']} tokens ({dtype}) to {output_dir}")
+    return index
+
+
+def _report(lines, tokens, num_bytes, elapsed, shards):
+    elapsed = max(elapsed, 1e-9)
+    print(
+        f"{lines} lines, {tokens} tokens, {shards} shards | "
+        f"{tokens / elapsed:,.0f} tokens/s, {lines / elapsed:,.0f} lines/s, "
+        f"{num_bytes / elapsed / 1e6:.2f} MB/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export a corpus as token id shards for LM training"
+    )
+    parser.add_argument("corpus", nargs="+", help="Text files, one document per line")
+    parser.add_argument("--model", default="bpe_model_latest.json")
+    parser.add_argument("--output-dir", default="shards")
+    parser.add_argument("--shard-tokens", type=int, default=1 << 24)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-lines", type=int, default=2000)
+    parser.add_argument(
+        "--append-eos",
+        action="store_true",
+        help="Append an end-of-line id (max token id + 1) after every line",
+    )
+    args = parser.parse_args()
+
+    export_shards(
+        args.corpus,
+        args.model,
+        args.output_dir,
+        shard_tokens=args.shard_tokens,
+        workers=args.workers,
+        batch_lines=args.batch_lines,
+        append_eos=args.append_eos,
+    )
+
+
+if __name__ == "__main__":
+    main()
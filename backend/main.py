@@ -1,35 +1,156 @@
-from fastapi import FastAPI, HTTPException, WebSocket
+from contextlib import asynccontextmanager
+from fastapi import (
+    APIRouter,
+    FastAPI,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+)
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel
-from typing import List, Dict
-from app.bpe_tokenizer import BPETokenizer
+from typing import List, Dict, Optional
+from app.live_document import LiveDocument
+from app.metrics import MetricsRegistry
+from app.model_registry import ModelRegistry
+from app.progress_pages import etag_for, growth_page, progress_page
+from app.response_cache import ResponseCache
 import os
+import time
 import asyncio
-import logging
+import json
+
+router = APIRouter()
 
-logging.basicConfig(level=logging.ERROR, format="%(asctime)s - %(levelname)s - %(message)s")
-app = FastAPI(title="Hindi BPE Tokenizer API")
+# Serving models by name; loaded on first use and reloaded when the file changes.
+# Nothing is loaded at import time, see create_app() for the startup preload
+model_registry = ModelRegistry(
+    default_model="bpe_model_latest",
+    max_loaded=int(os.environ.get("MAX_LOADED_MODELS", "4")),
+)
+model_registry.discover(os.environ.get("MODEL_DIR", "."))
+if model_registry.default_model not in model_registry:
+    # Not trained yet: serve an empty model until learn_bpe writes its checkpoint
+    model_registry.register(model_registry.default_model, "bpe_model_latest.json")
 
-# Configure CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+# Opt-in /tokenize result cache, enabled by setting TOKENIZE_CACHE_SIZE > 0
+response_cache = ResponseCache(
+    max_entries=int(os.environ.get("TOKENIZE_CACHE_SIZE", "0")),
+    ttl=float(os.environ.get("TOKENIZE_CACHE_TTL", "300")),
 )
+model_registry.on_reload(lambda name, version: response_cache.invalidate(name))
 
-# Initialize tokenizer and load model
-tokenizer = BPETokenizer()
-model_path = "bpe_model_latest.json"
-if os.path.exists(model_path):
-    tokenizer.load_model(model_path)
-else:
-    print(f"Warning: Model file {model_path} not found. Starting with empty model.")
+# Service metrics, exposed in Prometheus text format on /metrics
+metrics = MetricsRegistry(prefix="hindibpe_")
+tokenize_latency = metrics.histogram(
+    "tokenize_latency_seconds",
+    "Time spent handling /tokenize requests",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+tokenize_input_chars = metrics.histogram(
+    "tokenize_input_chars",
+    "Length of /tokenize input text in characters",
+    buckets=(16, 64, 256, 1024, 4096, 16384, 65536, 262144),
+)
+tokenize_requests = metrics.counter(
+    "tokenize_requests_total", "Number of /tokenize requests handled"
+)
+tokens_produced = metrics.counter(
+    "tokens_produced_total", "Number of BPE tokens returned by /tokenize"
+)
+tokenize_in_flight = metrics.gauge(
+    "tokenize_in_flight", "Number of /tokenize requests currently being processed"
+)
+count_tokens_latency = metrics.histogram(
+    "count_tokens_latency_seconds",
+    "Time spent handling /count-tokens requests",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+count_tokens_input_chars = metrics.histogram(
+    "count_tokens_input_chars",
+    "Length of /count-tokens input text in characters, summed over a batch",
+    buckets=(16, 64, 256, 1024, 4096, 16384, 65536, 262144),
+)
+count_tokens_requests = metrics.counter(
+    "count_tokens_requests_total", "Number of /count-tokens requests handled"
+)
+tokens_counted = metrics.counter(
+    "tokens_counted_total", "Number of BPE tokens counted by /count-tokens"
+)
+live_sessions = metrics.gauge(
+    "live_sessions", "Open /ws/tokenize live tokenization sessions"
+)
+live_edit_latency = metrics.histogram(
+    "live_edit_latency_seconds",
+    "Time spent applying one /ws/tokenize edit",
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05),
+)
+metrics.gauge(
+    "vocab_size",
+    "Size of the default model's vocabulary",
+    function=lambda: len(model_registry.get().vocab),
+)
+metrics.gauge(
+    "model_load_seconds",
+    "Time taken to load the default model",
+    function=lambda: model_registry.info()["load_seconds"],
+)
+metrics.gauge(
+    "models_loaded",
+    "Number of models currently held in memory",
+    function=lambda: len(model_registry.loaded_models()),
+)
+metrics.counter(
+    "model_reloads_total",
+    "Number of times a changed model file was reloaded",
+    function=lambda: sum(info["reloads"] for info in model_registry.all_info()),
+)
+metrics.counter(
+    "response_cache_hits_total",
+    "/tokenize responses served from the result cache",
+    function=lambda: response_cache.hits,
+)
+metrics.counter(
+    "response_cache_misses_total",
+    "/tokenize lookups that missed the result cache",
+    function=lambda: response_cache.misses,
+)
+metrics.gauge(
+    "response_cache_entries",
+    "Responses held in the /tokenize result cache",
+    function=lambda: len(response_cache),
+)
+metrics.counter(
+    "word_cache_hits_total",
+    "Hits in the default model's per-word encode cache",
+    function=lambda: model_registry.get().encode_cache_info().hits,
+)
+metrics.counter(
+    "word_cache_misses_total",
+    "Misses in the default model's per-word encode cache",
+    function=lambda: model_registry.get().encode_cache_info().misses,
+)
+metrics.gauge(
+    "word_cache_size",
+    "Entries in the default model's per-word encode cache",
+    function=lambda: model_registry.get().encode_cache_info().currsize,
+)
 
 
 class TokenizeRequest(BaseModel):
     text: str
+    model: Optional[str] = None  # Registered model name, default model if unset
+    # "full" (tokens, byte lists, token details) or "offsets" (id/offset columns)
+    detail: str = "full"
+
+
+class CountTokensRequest(BaseModel):
+    text: Optional[str] = None
+    texts: Optional[List[str]] = None  # Batch of texts, counted one by one
+    model: Optional[str] = None
 
 
 class TokenStats(BaseModel):
@@ -69,7 +190,7 @@ manager = ConnectionManager()
 
 
 # Add WebSocket endpoint
-@app.websocket("/ws")
+@router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await manager.connect(websocket)
     try:
@@ -79,64 +200,369 @@ async def websocket_endpoint(websocket: WebSocket):
         manager.disconnect(websocket)
 
 
-@app.post("/tokenize")
+def _valid_edit(message: Dict) -> bool:
+    """Whether a live edit message has the fields LiveDocument.edit needs"""
+    integers = [message.get(key) for key in ("start", "end", "version")]
+    return isinstance(message.get("text"), str) and all(
+        isinstance(value, int) and not isinstance(value, bool) for value in integers
+    )
+
+
+@router.websocket("/ws/tokenize")
+async def live_tokenize(websocket: WebSocket):
+    """Incremental tokenization for live editing
+
+    Send {"type": "open", "text": ..., "model": ...} first; the reply is a
+    "reset" with every word. Then send {"type": "edit", "version": v,
+    "start": s, "end": e, "text": t} for each change, with `version` the last
+    version received plus the edits sent since. Each edit is answered with a
+    "patch" holding only the words it changed (see LiveDocument.edit), or a
+    "reset" when the model was reloaded. An "error" with the server's version
+    means the client is out of sync and should send "open" again.
+    """
+    await websocket.accept()
+    live_sessions.inc()
+    document = None
+    model_name = model_version = None
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+                kind = message.get("type")
+            except (ValueError, AttributeError):
+                await websocket.send_json({"type": "error", "error": "Invalid message"})
+                continue
+
+            if kind == "open":
+                model_name = message.get("model") or model_registry.default_model
+                if not isinstance(message.get("text", ""), str) or not isinstance(
+                    model_name, str
+                ):
+                    await websocket.send_json(
+                        {"type": "error", "error": "Open needs string text and model"}
+                    )
+                    continue
+                if model_name not in model_registry:
+                    await websocket.send_json(
+                        {"type": "error", "error": f"Unknown model: {model_name}"}
+                    )
+                    continue
+                with model_registry.use(model_name) as (tokenizer, model_version):
+                    document = LiveDocument(tokenizer)
+                    reply = document.reset(message.get("text", ""))
+                reply["type"] = "reset"
+            elif kind == "edit" and document is not None:
+                if not _valid_edit(message):
+                    await websocket.send_json(
+                        {
+                            "type": "error",
+                            "error": "Edit needs integer start, end and version "
+                            "and string text",
+                            "version": document.version,
+                        }
+                    )
+                    continue
+                if message["version"] != document.version:
+                    await websocket.send_json(
+                        {
+                            "type": "error",
+                            "error": "Version mismatch",
+                            "version": document.version,
+                        }
+                    )
+                    continue
+                started = time.perf_counter()
+                try:
+                    with model_registry.use(model_name) as (tokenizer, version):
+                        reload = version != model_version
+                        if reload:
+                            document.set_tokenizer(tokenizer)
+                            model_version = version
+                        elif tokenizer is not document.tokenizer:
+                            # Same version loaded again after an eviction; the
+                            # evicted tokenizer's binary model is closed
+                            document.tokenizer = tokenizer
+                        reply = document.edit(
+                            message["start"], message["end"], message["text"]
+                        )
+                except ValueError as e:
+                    await websocket.send_json(
+                        {"type": "error", "error": str(e), "version": document.version}
+                    )
+                    continue
+                live_edit_latency.observe(time.perf_counter() - started)
+                if reload:
+                    reply = {
+                        "version": document.version,
+                        "token_count": document.token_count,
+                        "words": document.words(),
+                        "type": "reset",
+                    }
+                else:
+                    reply["type"] = "patch"
+            else:
+                error = (
+                    "Send an open message first"
+                    if kind == "edit"
+                    else f"Unknown message type: {kind}"
+                )
+                await websocket.send_json({"type": "error", "error": error})
+                continue
+
+            reply["model"] = model_name
+            reply["model_version"] = model_version
+            await websocket.send_json(reply)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        live_sessions.dec()
+
+
+def build_tokenize_response(tokenizer, model_name, version, text):
+    """Tokenize text and shape the /tokenize response"""
+    result = tokenizer.tokenize_with_details(text)
+    # Ensure all required fields are present
+    return {
+        "model": model_name,
+        "model_version": version,
+        "original_text": result["original_text"],
+        "original_tokens": result["original_tokens"],
+        "bpe_tokens": result["bpe_tokens"],
+        "original_encoded_tokens": result["original_encoded_tokens"],
+        "token_numbers": result["token_numbers"],
+        "stats": {
+            "original_chars": result["stats"]["original_chars"],
+            "token_count": len(result["bpe_tokens"]),
+            "compression_ratio": result["stats"]["compression_ratio"],
+            "unique_tokens": result["stats"]["unique_tokens"],
+        },
+        "token_details": [
+            {
+                "token": token,
+                "type": tokenizer._get_token_type(token),
+                "length": len(token),
+            }
+            for token in result["bpe_tokens"]
+        ],
+        "merge_history": tokenizer.merge_history[-10:]
+        if tokenizer.merge_history
+        else [],
+    }
+
+
+def build_offsets_response(tokenizer, model_name, version, text):
+    """The detail="offsets" /tokenize response: flat id and offset columns"""
+    result = tokenizer.tokenize_offsets(text)
+    return {
+        "model": model_name,
+        "model_version": version,
+        "detail": "offsets",
+        **{
+            name: result[name].tolist()
+            for name in ("ids", "starts", "ends", "byte_starts", "byte_ends")
+        },
+        "normalized": result["normalized"],
+        "stats": {
+            "original_chars": result["chars"],
+            "original_bytes": result["bytes"],
+            "token_count": result["token_count"],
+        },
+    }
+
+
+@router.post("/tokenize")
 async def tokenize_text(request: TokenizeRequest):
     # try:
-        result = tokenizer.tokenize_with_details(request.text)
-        # Ensure all required fields are present
-        return {
-            "original_text": result["original_text"],
-            "original_tokens": result["original_tokens"],
-            "bpe_tokens": result["bpe_tokens"],
-            "original_encoded_tokens": result["original_encoded_tokens"],
-            "token_numbers": result["token_numbers"],
-            "stats": {
-                "original_chars": result["stats"]["original_chars"],
-                "token_count": len(result["bpe_tokens"]),
-                "compression_ratio": result["stats"]["compression_ratio"],
-                "unique_tokens": result["stats"]["unique_tokens"],
-            },
-            "token_details": [
-                {
-                    "token": token,
-                    "type": tokenizer._get_token_type(token),
-                    "length": len(token),
-                }
-                for token in result["bpe_tokens"]
-            ],
-            "merge_history": tokenizer.merge_history[-10:]
-            if tokenizer.merge_history
-            else [],
-        }
+        if request.model is not None and request.model not in model_registry:
+            raise HTTPException(
+                status_code=404, detail=f"Unknown model: {request.model}"
+            )
+        if request.detail not in ("full", "offsets"):
+            raise HTTPException(
+                status_code=400, detail=f"Unknown detail mode: {request.detail}"
+            )
+        model_name = request.model or model_registry.default_model
+        tokenize_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            # Holding the model keeps it from being evicted mid-request; a
+            # reload swaps in a new tokenizer without touching this one
+            with model_registry.use(model_name) as (tokenizer, version):
+                if request.detail == "offsets":
+                    # Cheap to build, so it bypasses the result cache
+                    response = build_offsets_response(
+                        tokenizer, model_name, version, request.text
+                    )
+                else:
+                    cache_key = ResponseCache.key(model_name, version, request.text)
+                    response = response_cache.get(cache_key)
+                    if response is None:
+                        response = build_tokenize_response(
+                            tokenizer, model_name, version, request.text
+                        )
+                        response_cache.put(cache_key, response)
+                    else:
+                        # Cached responses still count towards token usage
+                        tokenizer.serving_usage.update(response["bpe_tokens"])
+        finally:
+            tokenize_in_flight.dec()
+        tokenize_latency.observe(time.perf_counter() - started)
+        tokenize_input_chars.observe(len(request.text))
+        tokenize_requests.inc()
+        tokens_produced.inc(response["stats"]["token_count"])
+        if request.detail == "offsets":
+            # Plain json.dumps of the int lists skips FastAPI's per-item encoding
+            return Response(
+                content=json.dumps(response, separators=(",", ":")),
+                media_type="application/json",
+            )
+        return response
     # except Exception as e:
     #     raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/vocabulary-stats")
+@router.post("/count-tokens")
+async def count_tokens(request: CountTokensRequest):
+    """Token counts only, e.g. for budgeting a context window
+
+    Send `text` for one count or `texts` for one count per text; no token
+    lists or details are built.
+    """
+    if (request.text is None) == (request.texts is None):
+        raise HTTPException(status_code=400, detail="Send either text or texts")
+    if request.model is not None and request.model not in model_registry:
+        raise HTTPException(status_code=404, detail=f"Unknown model: {request.model}")
+    model_name = request.model or model_registry.default_model
+    texts = [request.text] if request.texts is None else request.texts
+
+    started = time.perf_counter()
+    with model_registry.use(model_name) as (tokenizer, version):
+        counts = tokenizer.count_tokens_batch(texts)
+    count_tokens_latency.observe(time.perf_counter() - started)
+    count_tokens_input_chars.observe(sum(map(len, texts)))
+    count_tokens_requests.inc()
+    tokens_counted.inc(sum(counts))
+
+    response = {
+        "model": model_name,
+        "model_version": version,
+        "token_count": sum(counts),
+    }
+    if request.texts is not None:
+        response["token_counts"] = counts
+    return response
+
+
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """Hit rate and size of the /tokenize result cache"""
+    return response_cache.stats()
+
+
+@router.get("/models")
+async def list_models():
+    """Registered models and whether they are loaded"""
+    return {
+        "default_model": model_registry.default_model,
+        "models": model_registry.all_info(),
+    }
+
+
+@router.post("/models/{name}/reload")
+async def reload_model(name: str):
+    """Reload a model from disk; requests in flight finish on the old version"""
+    if name not in model_registry:
+        raise HTTPException(status_code=404, detail=f"Unknown model: {name}")
+    model_registry.reload(name)
+    return model_registry.info(name)
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """Service metrics in Prometheus text format"""
+    return Response(content=metrics.render(), media_type=MetricsRegistry.CONTENT_TYPE)
+
+
+@router.get("/vocabulary-stats")
 async def get_vocab_stats():
+    tokenizer = model_registry.get()
     return {
         "vocab_size": len(tokenizer.vocab),
-        "most_frequent_tokens": tokenizer.token_usage.most_common(20),
-        "most_frequent_pairs": dict(
-            sorted(
-                tokenizer.pair_frequencies.items(), key=lambda x: x[1], reverse=True
-            )[:20]
-        ),
+        "most_frequent_tokens": tokenizer.serving_usage.most_common(20),
+        "most_frequent_pairs": {
+            " ".join(pair): freq
+            for pair, freq in tokenizer.pair_frequencies.most_common(20)
+        },
     }
 
 
-@app.get("/training-progress")
-async def get_training_progress():
-    if hasattr(tokenizer, "training_progress"):
-        return tokenizer.training_progress
-    return {"message": "No training progress available"}
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """304 response if the client already has this ETag"""
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+
+@router.get("/training-progress")
+async def get_training_progress(
+    request: Request,
+    response: Response,
+    since: Optional[int] = Query(None, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    include_steps: bool = True,
+):
+    """Training progress; with `since`, only the steps after that cursor
 
+    Pass the returned `next` as `since` on the following poll. Responses carry
+    an ETag and come back as 304 when nothing changed.
+    """
+    tokenizer = model_registry.progress_tokenizer()
+    if not hasattr(tokenizer, "training_progress"):
+        return {"message": "No training progress available"}
 
-@app.get("/training-stats")
-async def get_training_stats():
-    """Get detailed training statistics"""
+    progress = tokenizer.training_progress
+    etag = etag_for(
+        id(progress),
+        model_registry.version(),
+        len(progress["steps"]),
+        len(progress["metrics"]["vocab_sizes"]),
+        since,
+        limit,
+        include_steps,
+    )
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    response.headers["ETag"] = etag
+
+    if since is None:
+        return progress
+    return progress_page(progress, since, limit, include_steps)
+
+
+@router.get("/training-stats")
+async def get_training_stats(
+    request: Request,
+    response: Response,
+    since: Optional[int] = Query(None, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+):
+    """Get detailed training statistics; `since`/`limit` page `vocab_growth`"""
+    tokenizer = model_registry.progress_tokenizer()
     if hasattr(tokenizer, "vocab_growth"):
-        return {
+        etag = etag_for(
+            id(tokenizer.vocab_growth),
+            len(tokenizer.vocab_growth["tokens"]),
+            len(tokenizer.vocab),
+            since,
+            limit,
+        )
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+        response.headers["ETag"] = etag
+
+        stats = {
             "vocab_growth": tokenizer.vocab_growth,
             "base_vocab_stats": tokenizer.base_vocab_stats,
             "current_stats": {
@@ -144,30 +570,99 @@ async def get_training_stats():
                 "learned_vocab": len(tokenizer.learned_vocab),
                 "base_vocab": len(tokenizer.BASE_VOCAB),
             },
+            "profile": getattr(tokenizer, "training_progress", {}).get("profile"),
         }
+        if since is not None:
+            stats.update(growth_page(tokenizer.vocab_growth, since, limit))
+        return stats
     return {"message": "No training statistics available"}
 
 
-@app.post("/resume-training")
-async def resume_training(checkpoint_file: str):
-    """Resume training from checkpoint"""
+@router.post("/resume-training")
+async def resume_training(
+    checkpoint_file: str, vocab_size: int = 10000, max_sentences: int = 10000
+):
+    """Resume training from checkpoint
+
+    Trains a separate tokenizer; its checkpoints replace bpe_model_latest.json,
+    which the registry then reloads.
+    """
     try:
-        tokenizer.learn_bpe(text, resume_from=checkpoint_file)
+        from app.bpe_tokenizer import BPETokenizer
+        from train_bpe import load_sample_data
+
+        text = load_sample_data(
+            "data/hindi_wiki_corpus.txt", max_sentences=max_sentences
+        )
+        await BPETokenizer(vocab_size=vocab_size).learn_bpe(
+            text, resume_from=checkpoint_file
+        )
         return {"message": "Training resumed successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/start-training")
+@router.post("/start-training")
 async def start_training(request: dict):
+    """Train a model; `"profile": true` records per-phase timings in it"""
     try:
+        from train_bpe import load_sample_data, train_and_save_bpe
+
         text = load_sample_data(
             "data/hindi_wiki_corpus.txt",
             max_sentences=request.get("max_sentences", 10000),
         )
-        tokenizer = await train_and_save_bpe(
-            text, vocab_size=request.get("vocab_size", 10000), manager=manager
+        await train_and_save_bpe(
+            text,
+            vocab_size=request.get("vocab_size", 10000),
+            profile=bool(request.get("profile", False)),
         )
         return {"message": "Training completed successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def _preload_names(preload: Optional[List[str]]) -> List[str]:
+    """Models to load at startup: `preload`, else PRELOAD_MODELS, else the default"""
+    if preload is None:
+        setting = os.environ.get("PRELOAD_MODELS", model_registry.default_model)
+        preload = [name.strip() for name in setting.split(",") if name.strip()]
+    return preload
+
+
+def create_app(preload: Optional[List[str]] = None) -> FastAPI:
+    """Build the API application
+
+    Importing this module only registers model files; the models named in
+    `preload` (or the comma-separated PRELOAD_MODELS variable, default model if
+    unset) are loaded by the lifespan hook when a worker starts, so the first
+    request does not pay for it. Set PRELOAD_MODELS to an empty string to load
+    every model lazily on first use.
+    """
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        for name in _preload_names(preload):
+            started = time.perf_counter()
+            model_registry.get(name)
+            print(f"Preloaded {name} in {time.perf_counter() - started:.3f}s")
+        yield
+
+    app = FastAPI(title="Hindi BPE Tokenizer API", lifespan=lifespan)
+
+    # Configure CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["ETag"],
+    )
+    # Compress large JSON responses such as training progress
+    app.add_middleware(GZipMiddleware, minimum_size=1000)
+    app.include_router(router)
+    return app
+
+
+app = create_app()
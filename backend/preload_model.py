@@ -0,0 +1,46 @@
+import argparse
+import os
+import time
+
+from app.binary_model import write_binary_model
+from app.bpe_tokenizer import BPETokenizer
+from app.model_registry import file_version, model_files
+
+
+def preload_model(model_path: str) -> str:
+    """Build the shared binary model for one JSON model file"""
+    binary_path = os.path.splitext(model_path)[0] + ".bin"
+    started = time.perf_counter()
+
+    tokenizer = BPETokenizer()
+    if not tokenizer.load_model(model_path):
+        raise SystemExit(f"Could not load {model_path}")
+    write_binary_model(tokenizer, file_version(model_path), binary_path)
+
+    print(
+        f"Wrote {binary_path} ({os.path.getsize(binary_path) / 1024:.1f} KB) "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+    return binary_path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build mmap-able binary models that all workers share"
+    )
+    parser.add_argument(
+        "models",
+        nargs="*",
+        help="JSON model files (default: the model files in --model-dir, "
+        "bpe_model.json and bpe_model_<name>.json)",
+    )
+    parser.add_argument("--model-dir", default=os.environ.get("MODEL_DIR", "."))
+    args = parser.parse_args()
+
+    models = args.models or model_files(args.model_dir)
+    for model_path in models:
+        preload_model(model_path)
+
+
+if __name__ == "__main__":
+    main()
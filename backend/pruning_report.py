@@ -0,0 +1,187 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+
+from app.bpe_tokenizer import BPETokenizer
+from train_bpe import load_sample_data
+
+REPORT_FIELDS = (
+    "hot_words",
+    "tail_words",
+    "pruned_words",
+    "pruned_occurrence_rate",
+    "tail_occurrence_rate",
+    "tail_passes",
+    "tail_frequency_share",
+    "tail_merges",
+)
+
+
+def parse_config(config: str):
+    """Parse a min_count:spill_below setting such as 2:0 or 1:5"""
+    min_count, _, spill_below = config.partition(":")
+    return int(min_count), int(spill_below or 0)
+
+
+def train(text, vocab_size, segmentation, min_count, spill_below, tail_pass_interval):
+    """Train one model in a scratch directory; returns (tokenizer, seconds)"""
+    tokenizer = BPETokenizer(
+        vocab_size=vocab_size,
+        segmentation=segmentation,
+        min_count=min_count,
+        spill_below=spill_below,
+        tail_pass_interval=tail_pass_interval,
+    )
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+        io.StringIO()
+    ):
+        started = time.perf_counter()
+        asyncio.run(tokenizer.learn_bpe(text))
+    return tokenizer, time.perf_counter() - started
+
+
+def compare_merges(baseline, pruned) -> dict:
+    """How the merge list of a pruned run differs from the unpruned one"""
+    baseline_merges = list(baseline.merges)
+    pruned_merges = list(pruned.merges)
+    first_divergence = next(
+        (
+            i
+            for i, (a, b) in enumerate(zip(baseline_merges, pruned_merges))
+            if a != b
+        ),
+        min(len(baseline_merges), len(pruned_merges)),
+    )
+    baseline_tokens = set(baseline.learned_vocab)
+    pruned_tokens = set(pruned.learned_vocab)
+    return {
+        "merges": len(pruned_merges),
+        "first_divergence": first_divergence,
+        "common_merges": len(set(baseline_merges) & set(pruned_merges)),
+        "learned_vocab_overlap": round(
+            len(baseline_tokens & pruned_tokens) / max(len(baseline_tokens), 1), 4
+        ),
+        "only_unpruned": sorted(baseline_tokens - pruned_tokens)[:20],
+        "only_pruned": sorted(pruned_tokens - baseline_tokens)[:20],
+    }
+
+
+def pruning_report(
+    corpus_path: str,
+    configs,
+    vocab_size: int = 1000,
+    max_sentences: int = None,
+    segmentation: str = "char",
+    tail_pass_interval: int = 100,
+    heldout_paths=None,
+    heldout_lines: int = 2000,
+) -> dict:
+    """Train without pruning and with each (min_count, spill_below) config"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        text = load_sample_data(corpus_path, max_sentences=max_sentences)
+    evaluator = None
+    if heldout_paths:
+        from app.evaluation import HeldOutEvaluator, read_heldout
+
+        evaluator = HeldOutEvaluator(read_heldout(heldout_paths, heldout_lines), 1)
+
+    cwd = os.getcwd()
+    results = {"vocab_size": vocab_size, "runs": []}
+    # learn_bpe writes checkpoints to the working directory, keep them out of it
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            baseline = None
+            for min_count, spill_below in [(1, 0)] + list(configs):
+                tokenizer, seconds = train(
+                    text,
+                    vocab_size,
+                    segmentation,
+                    min_count,
+                    spill_below,
+                    tail_pass_interval,
+                )
+                run = {
+                    "min_count": min_count,
+                    "spill_below": spill_below,
+                    "train_seconds": round(seconds, 3),
+                }
+                pruning = tokenizer.training_progress.get("pruning")
+                if pruning is not None:
+                    run.update({key: pruning[key] for key in REPORT_FIELDS})
+                if baseline is None:
+                    baseline = tokenizer
+                    run["merges"] = len(tokenizer.merges)
+                else:
+                    run.update(compare_merges(baseline, tokenizer))
+                if evaluator is not None:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        tokenizer._save_intermediate_vocab("model.json")
+                    metrics = evaluator.evaluate("model.json")
+                    run["chars_per_token"] = metrics["chars_per_token"]
+                    run["tokens_per_word"] = metrics["tokens_per_word"]
+                results["runs"].append(run)
+        finally:
+            os.chdir(cwd)
+            if evaluator is not None:
+                evaluator.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report how min-count pruning and spilling rare words to "
+        "disk change the learned merges"
+    )
+    parser.add_argument("--corpus", default="data/hindi_wiki_corpus.txt")
+    parser.add_argument(
+        "--configs",
+        default="2:0,1:3,2:5",
+        help="Comma-separated min_count:spill_below settings to compare",
+    )
+    parser.add_argument("--vocab-size", type=int, default=1000)
+    parser.add_argument("--max-sentences", type=int, default=None)
+    parser.add_argument("--segmentation", choices=("char", "akshara"), default="char")
+    parser.add_argument("--tail-pass-interval", type=int, default=100)
+    parser.add_argument("--heldout", nargs="*", help="Held-out text files")
+    parser.add_argument("--heldout-lines", type=int, default=2000)
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    results = pruning_report(
+        args.corpus,
+        [parse_config(config) for config in args.configs.split(",")],
+        vocab_size=args.vocab_size,
+        max_sentences=args.max_sentences,
+        segmentation=args.segmentation,
+        tail_pass_interval=args.tail_pass_interval,
+        heldout_paths=args.heldout,
+        heldout_lines=args.heldout_lines,
+    )
+    for run in results["runs"]:
+        line = (
+            f"min_count={run['min_count']} spill_below={run['spill_below']}: "
+            f"{run['merges']} merges in {run['train_seconds']}s"
+        )
+        if "hot_words" in run:
+            line += (
+                f", {run['hot_words']} words in memory, {run['tail_words']} on disk, "
+                f"{run['pruned_words']} pruned; first differs at merge "
+                f"{run['first_divergence']}, {run['common_merges']} merges shared"
+            )
+        if "chars_per_token" in run:
+            line += f", {run['chars_per_token']} chars/token held-out"
+        print(line)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
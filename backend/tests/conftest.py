@@ -0,0 +1,47 @@
+import asyncio
+import contextlib
+import io
+import os
+
+import pytest
+
+from app.bpe_tokenizer import BPETokenizer
+from app.evaluation import load_tokenizer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_PATH = os.path.join(BACKEND_DIR, "bpe_model_latest.json")
+SAMPLE_PATH = os.path.join(BACKEND_DIR, "benchmarks", "hindi_mixed_sample.txt")
+
+
+@pytest.fixture(scope="session")
+def sample():
+    """The checked-in code-mixed Hindi/English sample"""
+    with open(SAMPLE_PATH, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.fixture(scope="session")
+def tokenizer():
+    """The checked-in model, loaded from JSON"""
+    return load_tokenizer(MODEL_PATH)
+
+
+@pytest.fixture(scope="session")
+def trained_model(sample, tmp_path_factory):
+    """Path of a small model trained on the sample, with its merge history"""
+    directory = tmp_path_factory.mktemp("trained")
+    cwd = os.getcwd()
+    # learn_bpe writes its checkpoints to the working directory
+    os.chdir(directory)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(BPETokenizer(vocab_size=400).learn_bpe(sample))
+    finally:
+        os.chdir(cwd)
+    return str(directory / "bpe_model_latest.json")
+
+
+@pytest.fixture(scope="session")
+def trained_tokenizer(trained_model):
+    """The small trained model, loaded from JSON"""
+    return load_tokenizer(trained_model)
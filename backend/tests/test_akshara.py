@@ -0,0 +1,35 @@
+import pytest
+
+from app.akshara import AKSHARA, segment
+from app.bpe_tokenizer import BPETokenizer
+
+
+@pytest.mark.parametrize(
+    "word, aksharas",
+    [
+        ("स्त्रीलिंग", ["स्त्री", "लिं", "ग"]),
+        ("नमस्ते", ["न", "म", "स्ते"]),
+        ("हिंदी", ["हिं", "दी"]),
+        ("आँख", ["आँ", "ख"]),
+        ("क़लम", ["क़", "ल", "म"]),
+        ("क्‍ष", ["क्‍ष"]),
+        ("विद्", ["वि", "द्"]),
+        ("दुःख", ["दुः", "ख"]),
+    ],
+)
+def test_segment_known_words(word, aksharas):
+    assert segment(word) == aksharas
+
+
+def test_segments_cover_the_word():
+    for word in ["ािकि", "्क", "अंग्रेज़ी", "ॐ", "ऋषि", "abc"]:
+        aksharas = segment(word)
+        assert "".join(aksharas) == word
+        assert all(AKSHARA.fullmatch(akshara) for akshara in aksharas)
+
+
+def test_akshara_segmentation_keeps_aksharas_whole():
+    tokenizer = BPETokenizer(segmentation="akshara")
+    tokenizer.initialize_vocab()
+    assert tokenizer._segment("स्त्रीलिंग") == ["स्त्री", "लिं", "ग"]
+    assert BPETokenizer()._segment("हिं") == ["ह", "ि", "ं"]
@@ -0,0 +1,79 @@
+import os
+import shutil
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from app.binary_model import write_binary_model
+from app.evaluation import load_tokenizer
+from app.model_registry import ModelRegistry, file_version
+
+
+@pytest.fixture(scope="module")
+def json_tokenizer(trained_model):
+    return load_tokenizer(trained_model)
+
+
+@pytest.fixture(scope="module")
+def binary_tokenizer(json_tokenizer, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("binary") / "model.bin")
+    write_binary_model(json_tokenizer, "test", path)
+    binary = load_tokenizer(path)
+    yield binary
+    binary.close()
+
+
+@pytest.fixture
+def binary_registry(trained_model, json_tokenizer, tmp_path):
+    """Registry serving the trained model from an up-to-date binary model"""
+    path = str(tmp_path / "bpe_model_latest.json")
+    shutil.copyfile(trained_model, path)
+    binary_path = str(tmp_path / "bpe_model_latest.bin")
+    write_binary_model(json_tokenizer, file_version(path), binary_path)
+    registry = ModelRegistry(check_interval=0)
+    registry.register("bpe_model_latest", path)
+    registry.get()
+    assert registry.info()["binary"] is True
+    return registry
+
+
+def test_binary_model_gives_the_same_ids(sample, json_tokenizer, binary_tokenizer):
+    assert json_tokenizer.merges
+    assert binary_tokenizer.tokenize_bpe(sample) == json_tokenizer.tokenize_bpe(sample)
+    assert binary_tokenizer.encode_ids(sample) == json_tokenizer.encode_ids(sample)
+    assert (
+        binary_tokenizer.tokenize_with_details(sample)["token_numbers"]
+        == json_tokenizer.tokenize_with_details(sample)["token_numbers"]
+    )
+    assert list(binary_tokenizer.tokenize_offsets(sample)["ids"]) == list(
+        json_tokenizer.tokenize_offsets(sample)["ids"]
+    )
+
+
+def test_progress_tokenizer_loads_the_json_model_once(
+    binary_registry, json_tokenizer, tmp_path
+):
+    served = binary_registry.get()
+    progress = binary_registry.progress_tokenizer()
+    assert progress is not served
+    assert progress.binary_model is None
+    assert progress.training_progress["steps"] == json_tokenizer.merge_history
+    assert progress.vocab_growth["tokens"] == json_tokenizer.vocab_growth["tokens"]
+    assert binary_registry.progress_tokenizer() is progress
+
+    # A reload drops it with the binary model it belonged to
+    os.remove(tmp_path / "bpe_model_latest.bin")
+    assert binary_registry.progress_tokenizer() is binary_registry.get()
+
+
+def test_progress_endpoints_serve_binary_models(binary_registry, monkeypatch):
+    monkeypatch.setattr(main, "model_registry", binary_registry)
+    steps = len(binary_registry.progress_tokenizer().merge_history)
+    client = TestClient(main.create_app(preload=[]))
+
+    progress = client.get("/training-progress", params={"since": 0}).json()
+    assert progress["total_steps"] == steps > 10
+    stats = client.get("/training-stats").json()
+    assert len(stats["vocab_growth"]["tokens"]) == steps
+    assert stats["current_stats"]["learned_vocab"] > 0
@@ -0,0 +1,122 @@
+import pytest
+
+TEXTS = [
+    "",
+    "   ",
+    "नमस्ते दुनिया",
+    "hello, दुनिया! 42 ४२ https://example.com/path?q=भारत",
+    "क्षत्रिय‍ज्ञान  मेरा\tनाम\n।",
+    "ﬁ ℌ 😀 é",
+]
+
+
+@pytest.mark.parametrize("model", ["tokenizer", "trained_tokenizer"])
+def test_count_tokens_matches_tokenize(request, sample, model):
+    tokenizer = request.getfixturevalue(model)
+    for text in TEXTS + [sample]:
+        assert tokenizer.count_tokens(text) == len(tokenizer.tokenize_bpe(text))
+    assert tokenizer.count_tokens_batch(TEXTS) == [
+        len(tokenizer.tokenize_bpe(text)) for text in TEXTS
+    ]
+
+
+def test_count_tokens_endpoint_matches_tokenize(monkeypatch, trained_model):
+    from fastapi.testclient import TestClient
+
+    import main
+    from app.model_registry import ModelRegistry
+
+    registry = ModelRegistry()
+    registry.register("bpe_model_latest", trained_model)
+    monkeypatch.setattr(main, "model_registry", registry)
+    client = TestClient(main.create_app(preload=[]))
+    tokenizer = registry.get()
+
+    reply = client.post("/count-tokens", json={"texts": TEXTS}).json()
+    assert reply["token_counts"] == [len(tokenizer.tokenize_bpe(t)) for t in TEXTS]
+    assert reply["token_count"] == sum(reply["token_counts"])
+    assert client.post("/count-tokens", json={}).status_code == 400
+    reply = client.post("/count-tokens", json={"text": "x", "model": "missing"})
+    assert reply.status_code == 404
+
+
+def assert_offsets_slice_back(tokenizer, text):
+    from app.pretokenizer import normalize
+
+    details = tokenizer.tokenize_with_details(text)
+    offsets = tokenizer.tokenize_offsets(text)
+    normalized = normalize(text)
+    assert offsets["normalized"] == (normalized != text)
+    assert offsets["token_count"] == len(details["bpe_tokens"])
+    assert list(offsets["ids"]) == details["token_numbers"]
+    assert offsets["chars"] == len(normalized)
+
+    encoded = normalized.encode("utf-8")
+    assert offsets["bytes"] == len(encoded)
+    for i, token in enumerate(details["bpe_tokens"]):
+        assert normalized[offsets["starts"][i] : offsets["ends"][i]] == token
+        byte_span = encoded[offsets["byte_starts"][i] : offsets["byte_ends"][i]]
+        assert byte_span.decode("utf-8") == token
+
+
+@pytest.mark.parametrize("model", ["tokenizer", "trained_tokenizer"])
+def test_offsets_slice_back_to_tokens(request, sample, model):
+    tokenizer = request.getfixturevalue(model)
+    for text in TEXTS + [sample, "  " + sample[:200] + " \n"]:
+        assert_offsets_slice_back(tokenizer, text)
+
+
+def test_offsets_refer_to_the_normalized_text(tokenizer):
+    # Precomposed क़ (U+0958) is a composition exclusion: NFC splits it into
+    # क and a nukta; the decomposed é is composed into one code point
+    text = "\u0958िला cafe\u0301"
+    offsets = tokenizer.tokenize_offsets(text)
+    assert offsets["normalized"] is True
+    assert offsets["chars"] == len(text)  # one code point more, one fewer
+    assert_offsets_slice_back(tokenizer, text)
+
+
+@pytest.mark.parametrize("model", ["tokenizer", "trained_tokenizer"])
+def test_every_token_gets_an_id(request, sample, model):
+    tokenizer = request.getfixturevalue(model)
+    for text in TEXTS + [sample]:
+        assert -1 not in tokenizer.tokenize_with_details(text)["token_numbers"]
+        assert -1 not in tokenizer.tokenize_offsets(text)["ids"]
+        # Table ids start at 1, so 0 is free for unknown tokens
+        assert 0 not in tokenizer.encode_ids(text, unk_id=0)
+
+
+def test_single_characters_get_distinct_reserved_ids(trained_tokenizer):
+    from app.bpe_tokenizer import FALLBACK_IDS
+
+    tokenizer = trained_tokenizer
+    table = tokenizer.get_token_numbers()
+    base = tokenizer.fallback_base()
+    assert base == max(table.values()) + 1
+
+    characters = [chr(i) for i in range(128)] + [chr(i) for i in range(0x900, 0x980)]
+    reserved = [ch for ch in characters if ch not in table]
+    ids = [tokenizer.token_id(ch) for ch in reserved]
+    assert len(set(ids)) == len(ids)
+    assert all(base <= i < base + FALLBACK_IDS for i in ids)
+    # Other scripts share one id per character class
+    assert tokenizer.token_id("é") == tokenizer.token_id("ß")
+    assert tokenizer.token_id("😀") != tokenizer.token_id("é")
+    # Only strings longer than one character can be unknown
+    assert tokenizer.token_id("😀😀") == -1
+    assert tokenizer.token_id("😀😀", unk_id=0) == 0
+
+
+def test_binary_model_gives_the_same_fallback_ids(trained_tokenizer, tmp_path):
+    from app.binary_model import write_binary_model
+    from app.evaluation import load_tokenizer
+
+    path = str(tmp_path / "model.bin")
+    write_binary_model(trained_tokenizer, "test", path)
+    binary = load_tokenizer(path)
+    try:
+        assert binary.fallback_base() == trained_tokenizer.fallback_base()
+        for text in TEXTS:
+            assert binary.encode_ids(text) == trained_tokenizer.encode_ids(text)
+    finally:
+        binary.close()
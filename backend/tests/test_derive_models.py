@@ -0,0 +1,77 @@
+import json
+import os
+
+import pytest
+
+from app.evaluation import load_tokenizer
+from app.hindi_tokenizer import HindiTokenizer
+from derive_models import derive_models, train_source_model, truncate_model
+
+
+@pytest.fixture(scope="module")
+def source(trained_model):
+    with open(trained_model, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+BASE_SIZE = len(HindiTokenizer().BASE_VOCAB)
+
+
+@pytest.mark.parametrize("extra", [0, 1, 50, 10**6])
+def test_truncated_vocab_fits_its_size(source, extra):
+    model = truncate_model(source, BASE_SIZE + extra)
+    assert len(model["vocab"]) <= BASE_SIZE + extra
+    kept = list(model["merges"])
+    # A prefix of the ranked merges
+    assert kept == list(source["merges"])[: len(kept)]
+    assert set(model["vocab"]) <= set(source["vocab"]) | HindiTokenizer().BASE_VOCAB
+    assert [step["new_token"] for step in model["merge_history"]] == [
+        source["merges"][pair] for pair in kept
+    ]
+    assert sorted(model["token_numbers"].values()) == list(
+        range(1, len(model["vocab"]) + 1)
+    )
+
+
+def test_tokens_no_kept_merge_produces_are_dropped(source):
+    model = dict(source, vocab=source["vocab"] + ["नमस्तेभारत"])
+    truncated = truncate_model(model, BASE_SIZE + 10)
+    assert "नमस्तेभारत" not in truncated["vocab"]
+    assert len(truncated["vocab"]) == BASE_SIZE + 10
+
+
+def test_smaller_model_ids_are_a_prefix(source):
+    small = truncate_model(source, BASE_SIZE + 20)["token_numbers"]
+    large = truncate_model(source, BASE_SIZE + 80)["token_numbers"]
+    assert all(large[token] == number for token, number in small.items())
+
+
+def test_size_below_the_base_vocabulary_is_rejected(source, tmp_path, trained_model):
+    with pytest.raises(ValueError):
+        truncate_model(source, BASE_SIZE - 1)
+    derived = derive_models(
+        trained_model, [BASE_SIZE - 1, BASE_SIZE + 5], output_dir=str(tmp_path)
+    )
+    assert [summary["vocab_size"] for summary in derived] == [BASE_SIZE + 5]
+
+
+def test_derived_model_loads_and_encodes(source, tmp_path, trained_model, sample):
+    derive_models(trained_model, [BASE_SIZE + 100], output_dir=str(tmp_path))
+    path = str(tmp_path / f"bpe_model_v{BASE_SIZE + 100}.json")
+    tokenizer = load_tokenizer(path)
+    assert len(tokenizer.vocab) == BASE_SIZE + 100
+    assert "".join(tokenizer.tokenize_bpe(sample)) == "".join(sample.split())
+
+
+def test_source_model_trains_outside_the_working_directory(
+    sample, tmp_path, monkeypatch
+):
+    corpus = tmp_path / "corpus.txt"
+    corpus.write_text(sample, encoding="utf-8")
+    workdir = tmp_path / "work"
+    workdir.mkdir()
+    monkeypatch.chdir(workdir)
+    train_source_model(str(corpus), 150, "char", None, "source.json")
+    assert os.listdir(workdir) == ["source.json"]
+    with open(workdir / "source.json", "r", encoding="utf-8") as f:
+        assert json.load(f)["merges"]
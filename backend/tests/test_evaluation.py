@@ -0,0 +1,52 @@
+import pytest
+
+from app.evaluation import EarlyStopping, HeldOutCounter, HeldOutEvaluator, summarize
+
+
+@pytest.mark.parametrize("model", ["tokenizer", "trained_tokenizer"])
+def test_counts_match_the_encode_path(request, sample, model):
+    tokenizer = request.getfixturevalue(model)
+    counts, used = HeldOutCounter(tokenizer).count_lines(sample.splitlines())
+    tokens = tokenizer.tokenize_bpe(sample)
+    assert counts["tokens"] == len(tokens) == tokenizer.count_tokens(sample)
+    assert counts["words"] == len(sample.split())
+    assert used == {token for token in tokens if token in tokenizer.vocab}
+    assert counts["unk_tokens"] == sum(
+        tokenizer.token_id(token) < 0 for token in tokens
+    )
+
+
+def test_evaluator_summarizes_a_model_file(sample, trained_model):
+    lines = sample.splitlines()
+    with HeldOutEvaluator(lines, workers=1, batch_lines=7) as evaluator:
+        metrics = evaluator.evaluate(trained_model)
+    assert metrics["lines"] == len(lines)
+    assert metrics["chars_per_token"] == round(metrics["chars"] / metrics["tokens"], 4)
+    assert 0 < metrics["vocab_utilization"] <= 1
+
+
+def test_summarize_handles_empty_counts():
+    counts = dict.fromkeys(
+        ["lines", "words", "chars", "bytes", "tokens", "devanagari_words"], 0
+    )
+    counts.update(
+        devanagari_tokens=0, single_token_words=0, unk_tokens=0, fallback_tokens=0
+    )
+    metrics = summarize(counts, set(), 0)
+    assert metrics["chars_per_token"] == metrics["vocab_utilization"] == 0.0
+
+
+def test_early_stopping_waits_for_patience_stale_evaluations():
+    stopper = EarlyStopping(min_gain=0.01, patience=2)
+    assert not stopper.update({"chars_per_token": 2.0})
+    assert not stopper.update({"chars_per_token": 2.1})
+    assert not stopper.update({"chars_per_token": 2.11})  # below the 1% gain
+    assert stopper.update({"chars_per_token": 2.0})
+    assert stopper.best == 2.1
+
+
+def test_early_stopping_resets_on_improvement():
+    stopper = EarlyStopping(metric="tokens_per_word", min_gain=0.0, patience=2)
+    for value, stop in [(1.0, False), (1.0, False), (1.5, False), (1.5, False)]:
+        assert stopper.update({"tokens_per_word": value}) is stop
+    assert stopper.update({"tokens_per_word": 1.4}) is True
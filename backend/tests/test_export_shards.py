@@ -0,0 +1,116 @@
+import contextlib
+import io
+import json
+
+import numpy as np
+import pytest
+
+from export_shards import ShardWriter, export_shards, read_batches
+
+
+def new_index(shard_tokens):
+    return {
+        "dtype": "uint16",
+        "shard_tokens": shard_tokens,
+        "shards": [],
+        "cursor": [0, 0],
+        "total_tokens": 0,
+        "complete": False,
+    }
+
+
+def read_shards(directory, index):
+    return np.concatenate(
+        [
+            np.fromfile(directory / shard["file"], dtype=index["dtype"])
+            for shard in index["shards"]
+        ]
+    )
+
+
+def line_ids(rng, lines):
+    return [
+        list(rng.integers(1, 1000, size=rng.integers(0, 12))) for _ in range(lines)
+    ]
+
+
+def write_lines(writer, lines, first_line, skip=0, batch_lines=3):
+    """Feed `lines` (token id lists) to the writer in batches"""
+    for start in range(first_line, len(lines), batch_lines):
+        batch = lines[start : start + batch_lines]
+        ids = np.array([i for line in batch for i in line], dtype=np.uint32)
+        writer.add(start, ids, np.array([len(line) for line in batch]), skip)
+        skip = 0
+    writer.finish(len(lines))
+
+
+@pytest.mark.parametrize("stop_after", [1, 2, 5])
+def test_shard_writer_resumes_at_the_cursor(tmp_path, stop_after):
+    lines = line_ids(np.random.default_rng(stop_after), 40)
+    expected = [i for line in lines for i in line]
+
+    class Interrupted(Exception):
+        pass
+
+    writer = ShardWriter(str(tmp_path), new_index(shard_tokens=7))
+    write_shard = writer._write_shard
+
+    def write_then_stop(cursor):
+        write_shard(cursor)
+        if len(writer.index["shards"]) == stop_after:
+            raise Interrupted
+
+    writer._write_shard = write_then_stop
+    with pytest.raises(Interrupted):
+        write_lines(writer, lines, 0)
+
+    # Start again from the index on disk, as export_shards does
+    with open(tmp_path / "index.json", "r", encoding="utf-8") as f:
+        index = json.load(f)
+    start_line, skip = index["cursor"]
+    writer = ShardWriter(str(tmp_path), index)
+    write_lines(writer, lines, start_line, skip)
+
+    assert index["complete"]
+    assert list(read_shards(tmp_path, index)) == expected
+    assert index["total_tokens"] == len(expected)
+    assert all(shard["tokens"] == 7 for shard in index["shards"][:-1])
+
+
+def test_read_batches_continues_across_files(tmp_path):
+    (tmp_path / "a.txt").write_text("1\n2\n3\n", encoding="utf-8")
+    (tmp_path / "b.txt").write_text("4\n5\n", encoding="utf-8")
+    paths = [str(tmp_path / "a.txt"), str(tmp_path / "b.txt")]
+    assert list(read_batches(paths, 2, 2)) == [(2, ["3", "4"]), (4, ["5"])]
+
+
+def test_interrupted_export_resumes_to_the_same_shards(
+    sample, trained_model, tmp_path, monkeypatch
+):
+    corpus = [str(tmp_path / "corpus.txt")]
+    (tmp_path / "corpus.txt").write_text(sample, encoding="utf-8")
+    kwargs = dict(shard_tokens=300, workers=1, batch_lines=4, append_eos=True)
+
+    class Interrupted(Exception):
+        pass
+
+    write_shard = ShardWriter._write_shard
+
+    def write_then_stop(writer, cursor):
+        write_shard(writer, cursor)
+        if len(writer.index["shards"]) == 2:
+            raise Interrupted
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        full = export_shards(corpus, trained_model, str(tmp_path / "a"), **kwargs)
+        monkeypatch.setattr(ShardWriter, "_write_shard", write_then_stop)
+        with pytest.raises(Interrupted):
+            export_shards(corpus, trained_model, str(tmp_path / "b"), **kwargs)
+        monkeypatch.undo()
+        resumed = export_shards(corpus, trained_model, str(tmp_path / "b"), **kwargs)
+
+    assert len(full["shards"]) > 2
+    assert resumed == full
+    assert list(read_shards(tmp_path / "b", resumed)) == list(
+        read_shards(tmp_path / "a", full)
+    )
@@ -0,0 +1,138 @@
+import random
+import re
+
+import pytest
+
+from app.live_document import LiveDocument
+
+
+def expected_words(tokenizer, text):
+    return [
+        (match.start(), match.end(), list(tokenizer._encode_word(match.group())))
+        for match in re.finditer(r"\S+", text)
+    ]
+
+
+def spans(words):
+    return [(word["start"], word["end"], word["tokens"]) for word in words]
+
+
+@pytest.mark.parametrize("block_words", [2, 16, 128])
+def test_live_edits_match_full_tokenization(sample, tokenizer, block_words):
+    rng = random.Random(block_words)
+    text = sample[:3000]
+    document = LiveDocument(tokenizer, block_words=block_words)
+    client = document.reset(text)["words"]
+    insertions = ["", " ", "क", "ा", "नमस्ते ", " भारत", "\n", "hello।", "42"]
+
+    for step in range(300):
+        # Mostly typing near the previous edit, sometimes jumping elsewhere
+        if step == 0 or rng.random() < 0.3:
+            start = rng.randrange(len(text) + 1)
+        else:
+            start = min(len(text), max(0, start + rng.randint(-3, 6)))
+        end = min(len(text), start + rng.choice([0, 1, 2, 5, 40]))
+        if rng.random() < 0.2:
+            at = rng.randrange(len(sample) - 60)
+            inserted = sample[at : at + rng.randrange(60)]
+        else:
+            inserted = rng.choice(insertions)
+        patch = document.edit(start, end, inserted)
+        text = text[:start] + inserted + text[end:]
+
+        # Apply the patch the way a client does
+        first, removed = patch["word_start"], patch["word_removed"]
+        for word in client[first + removed :]:
+            word["start"] += patch["shift"]
+            word["end"] += patch["shift"]
+        client[first : first + removed] = patch["words"]
+
+        expected = expected_words(tokenizer, text)
+        assert spans(client) == expected
+        assert document.length == len(text)
+        assert document.token_count == len(tokenizer.tokenize_bpe(text))
+        if step % 25 == 0:
+            # words() settles the pending block shifts, so only look now and then
+            assert spans(document.words()) == expected
+    assert spans(document.words()) == expected_words(tokenizer, text)
+
+
+def test_edit_patch_names_the_changed_words(tokenizer):
+    document = LiveDocument(tokenizer, block_words=2)
+    document.reset("एक दो तीन चार पांच")
+    patch = document.edit(6, 9, "छह")  # तीन -> छह
+    assert (patch["word_start"], patch["word_removed"], patch["shift"]) == (2, 1, -1)
+    assert [word["word"] for word in patch["words"]] == ["छह"]
+    assert patch["words"][0]["start"] == 6
+
+    # Typing right after a word joins it
+    patch = document.edit(8, 8, "ा")
+    assert [word["word"] for word in patch["words"]] == ["छहा"]
+    assert patch["version"] == 3
+
+
+def test_edit_outside_the_document_is_rejected(tokenizer):
+    document = LiveDocument(tokenizer)
+    document.reset("नमस्ते")
+    for start, end in [(-1, 0), (3, 2), (0, 7)]:
+        with pytest.raises(ValueError):
+            document.edit(start, end, "")
+    assert document.version == 1
+
+
+def test_set_tokenizer_keeps_spans(sample, tokenizer, trained_tokenizer):
+    text = sample[:500]
+    document = LiveDocument(tokenizer, block_words=4)
+    document.reset(text)
+    document.edit(10, 12, " नया ")
+    text = text[:10] + " नया " + text[12:]
+    reply = document.set_tokenizer(trained_tokenizer)
+    assert spans(reply["words"]) == expected_words(trained_tokenizer, text)
+    assert reply["token_count"] == trained_tokenizer.count_tokens(text)
+
+
+@pytest.fixture
+def live_client(monkeypatch, tmp_path):
+    from fastapi.testclient import TestClient
+
+    import main
+    from app.model_registry import ModelRegistry
+
+    path = tmp_path / "bpe_model_latest.json"
+    path.write_text(
+        '{"vocab": ["न"], "merges": {}, "merge_history": []}', encoding="utf-8"
+    )
+    registry = ModelRegistry()
+    registry.register("bpe_model_latest", str(path))
+    monkeypatch.setattr(main, "model_registry", registry)
+    return TestClient(main.create_app(preload=[]))
+
+
+@pytest.mark.parametrize(
+    "edit",
+    [
+        {"start": "0", "end": 0, "text": "क"},
+        {"start": 0, "end": 0.5, "text": "क"},
+        {"start": 0, "end": 0, "text": 5},
+        {"start": 0, "end": True, "text": "क"},
+        {"start": 0, "text": "क"},
+        {"start": 0, "end": 0, "text": "क", "version": None},
+    ],
+)
+def test_malformed_edits_get_a_protocol_error(live_client, edit):
+    with live_client.websocket_connect("/ws/tokenize") as websocket:
+        websocket.send_json({"type": "open", "text": "नमन"})
+        assert websocket.receive_json()["version"] == 1
+        websocket.send_json({"type": "edit", "version": 1, **edit})
+        reply = websocket.receive_json()
+        assert reply["type"] == "error"
+        assert reply["error"].startswith("Edit needs integer start, end and version")
+        assert reply["version"] == 1
+
+        # The session is still usable
+        websocket.send_json(
+            {"type": "edit", "version": 1, "start": 3, "end": 3, "text": " न"}
+        )
+        patch = websocket.receive_json()
+        assert patch["type"] == "patch"
+        assert [word["word"] for word in patch["words"]] == ["नमन", "न"]
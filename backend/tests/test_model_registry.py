@@ -0,0 +1,157 @@
+import json
+import os
+
+from app.binary_model import write_binary_model
+from app.bpe_tokenizer import BPETokenizer
+from app.model_registry import ModelRegistry, file_version, model_files
+
+
+def write_model(path, merges, mtime=None):
+    """Write a small JSON model learning `merges` (space-separated pairs)"""
+    merge_history = []
+    vocab = set("नमस्ते")
+    for step, pair in enumerate(merges, 1):
+        left, right = pair.split()
+        vocab.add(left + right)
+        merge_history.append(
+            {"step": step, "pair": [left, right], "new_token": left + right}
+        )
+    model = {
+        "vocab": sorted(vocab),
+        "merges": {pair: pair.replace(" ", "") for pair in merges},
+        "merge_history": merge_history,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(model, f, ensure_ascii=False)
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+
+
+def registry_for(tmp_path, *names, **kwargs):
+    kwargs.setdefault("check_interval", 0)
+    registry = ModelRegistry(default_model=names[0], **kwargs)
+    for name in names:
+        path = str(tmp_path / f"{name}.json")
+        write_model(path, ["न म"])
+        registry.register(name, path)
+    return registry
+
+
+def close_log(tokenizer, closed):
+    """Record `tokenizer` in `closed` when the registry closes it"""
+    close = tokenizer.close
+
+    def logged_close():
+        closed.append(tokenizer)
+        close()
+
+    tokenizer.close = logged_close
+    return tokenizer
+
+
+def test_model_files_skips_backups_and_copies(tmp_path):
+    for name in [
+        "bpe_model.json",
+        "bpe_model_latest.json",
+        "bpe_model_v2000.json",
+        "bpe_model_latest copy.json",
+        "bpe_model.json~",
+        "other.json",
+    ]:
+        (tmp_path / name).write_text("{}")
+    assert [os.path.basename(path) for path in model_files(str(tmp_path))] == [
+        "bpe_model.json",
+        "bpe_model_latest.json",
+        "bpe_model_v2000.json",
+    ]
+
+
+def test_reload_swaps_in_the_changed_model(tmp_path):
+    registry = registry_for(tmp_path, "bpe_model")
+    path = str(tmp_path / "bpe_model.json")
+    first = registry.get()
+    closed = []
+    close_log(first, closed)
+    assert registry.version() == file_version(path)
+
+    with registry.use() as (held, version):
+        write_model(path, ["न म", "स ्"], mtime=10**18)
+        second = registry.get()
+        # The request still holding the old model keeps it open
+        assert held is first and version != registry.version()
+        assert closed == []
+    assert second is not first
+    assert ("स", "्") in second.merges
+    assert closed == [first]
+    assert registry.info()["reloads"] == 1
+
+
+def test_touched_but_unchanged_model_is_kept(tmp_path):
+    registry = registry_for(tmp_path, "bpe_model")
+    first = registry.get()
+    os.utime(tmp_path / "bpe_model.json", ns=(10**18, 10**18))
+    assert registry.get() is first
+    assert registry.info()["reloads"] == 0
+
+
+def test_failed_load_keeps_the_loaded_version(tmp_path):
+    registry = registry_for(tmp_path, "bpe_model")
+    path = tmp_path / "bpe_model.json"
+    first = registry.get()
+    version = registry.version()
+
+    path.write_text('{"vocab": [', encoding="utf-8")  # caught mid-write
+    assert registry.get() is first
+    assert registry.version() == version
+
+    # The next check retries and picks up the finished file
+    write_model(str(path), ["न म", "स ्"], mtime=10**18)
+    assert registry.get() is not first
+    assert registry.version() == file_version(str(path))
+
+
+def test_missing_model_loads_empty(tmp_path):
+    registry = ModelRegistry(default_model="bpe_model")
+    registry.register("bpe_model", str(tmp_path / "bpe_model.json"))
+    assert registry.get().merges == {}
+    assert registry.version() is None
+
+
+def test_eviction_closes_idle_models_only(tmp_path):
+    registry = registry_for(tmp_path, "bpe_model", "a", "b", max_loaded=2)
+    registry.get()
+    closed = []
+    a = close_log(registry.get("a"), closed)
+
+    with registry.use("a"):
+        registry.get("b")  # a is busy, so nothing can go yet
+        assert set(registry.loaded_models()) == {"bpe_model", "a", "b"}
+        assert closed == []
+
+    close_log(registry.get("b"), closed)
+    registry.get("bpe_model")
+    # The least recently used idle model goes; the default model always stays
+    assert registry.loaded_models() == ["b", "bpe_model"]
+    assert closed == [a]
+    assert registry.info("a")["loaded"] is False
+    assert registry.get("a") is not a
+
+
+def test_up_to_date_binary_model_is_preferred(tmp_path):
+    registry = registry_for(tmp_path, "bpe_model")
+    path = str(tmp_path / "bpe_model.json")
+    json_tokenizer = registry.get()
+    assert registry.info()["binary"] is False
+
+    binary_path = str(tmp_path / "bpe_model.bin")
+    write_binary_model(json_tokenizer, file_version(path), binary_path)
+    binary = registry.get()
+    assert registry.info()["binary"] is True
+    assert binary.tokenize_bpe("नमस्ते") == json_tokenizer.tokenize_bpe("नमस्ते")
+
+    # A binary model built from an older JSON file is ignored
+    write_model(path, ["न म", "स ्"], mtime=10**18)
+    assert registry.info()["binary"] is True  # not checked yet
+    assert isinstance(registry.get(), BPETokenizer)
+    assert registry.info()["binary"] is False
+    assert binary.binary_model is None  # unmapped once replaced
@@ -0,0 +1,64 @@
+import asyncio
+import contextlib
+import io
+from collections import Counter
+
+from app.bpe_tokenizer import BPETokenizer
+from app.packed_corpus import PackedCorpus
+
+
+def test_pair_counts_and_merges_match_the_dict_loop(sample):
+    tokenizer = BPETokenizer()
+    word_freqs = tokenizer._get_word_frequencies(sample)
+    packed = PackedCorpus(word_freqs)
+    for _ in range(30):
+        pairs = tokenizer._get_pair_frequencies(word_freqs)
+        # Same counts in the same order, so max() breaks ties the same way
+        assert list(packed.pair_frequencies().items()) == list(pairs.items())
+        best = max(pairs.items(), key=lambda x: x[1])[0]
+        word_freqs = tokenizer._apply_merge(word_freqs, best)
+        packed.apply_merge(best)
+
+
+def test_overlapping_runs_merge_like_str_replace():
+    packed = PackedCorpus({"a a a": 1, "a a a a": 2})
+    assert packed.apply_merge(("a", "a")) == 5
+    assert packed.pair_frequencies() == {("aa", "a"): 1, ("aa", "aa"): 2}
+    assert packed.apply_merge(("x", "y")) == 0
+
+
+def test_merges_keep_token_counts_current(sample):
+    tokenizer = BPETokenizer()
+    word_freqs = tokenizer._get_word_frequencies(sample)
+    packed = PackedCorpus(word_freqs)
+    token_counts = Counter()
+    for word, freq in word_freqs.items():
+        for symbol in word.split():
+            token_counts[symbol] += freq
+    for _ in range(30):
+        pairs = tokenizer._get_pair_frequencies(word_freqs)
+        best = max(pairs.items(), key=lambda x: x[1])[0]
+        before = sum(token_counts.values())
+        word_freqs = tokenizer._apply_merge(word_freqs, best, token_counts)
+        assert packed.apply_merge(best) == before - sum(token_counts.values())
+    recounted = Counter()
+    for word, freq in word_freqs.items():
+        for symbol in word.split():
+            recounted[symbol] += freq
+    assert +token_counts == recounted
+
+
+def test_numpy_backend_learns_the_same_merges(sample, tmp_path, monkeypatch):
+    # learn_bpe writes its checkpoints to the working directory
+    monkeypatch.chdir(tmp_path)
+    merges = {}
+    metrics = {}
+    for backend in BPETokenizer.BACKENDS:
+        tokenizer = BPETokenizer(vocab_size=250, backend=backend)
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(tokenizer.learn_bpe(sample))
+        merges[backend] = list(tokenizer.merges.items())
+        metrics[backend] = tokenizer.training_progress["metrics"]
+    assert merges["python"]
+    assert merges["numpy"] == merges["python"]
+    assert metrics["numpy"] == metrics["python"]
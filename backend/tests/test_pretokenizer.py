@@ -0,0 +1,54 @@
+import random
+import unicodedata
+
+from app.pretokenizer import (
+    DEVANAGARI_RANGE,
+    devanagari_words,
+    normalize,
+    pretokenize,
+    pretokenize_with_kinds,
+)
+from app.tokenizer import _DISALLOWED_CHARS
+
+# Characters around the NFC fast-path boundaries: nukta letters, nukta after
+# न/र/ळ, stress marks, Latin with combining accents, other scripts
+ALPHABET = (
+    "कखगनरळड़ढ़क़ज़फ़़्॒॑॓ािीुे्ंँ।॥०१"
+    "abcAZ09 .,!?-́̈éñÅÅΩ中😀‌‍"
+)
+
+
+def test_normalize_matches_nfc():
+    rng = random.Random(0)
+    for _ in range(5000):
+        text = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 12)))
+        assert normalize(text) == unicodedata.normalize("NFC", text)
+
+
+def test_pretokenize_splits_scripts_digits_and_danda():
+    assert pretokenize("नमस्ते, world! है। १२३ abc123") == [
+        "नमस्ते",
+        ",",
+        "world",
+        "!",
+        "है",
+        "।",
+        "१२३",
+        "abc",
+        "123",
+    ]
+
+
+def test_pretokenize_with_kinds_offsets_slice_the_normalized_text():
+    text = "क़लम hello 42 है।"
+    normalized = normalize(text)
+    pieces = list(pretokenize_with_kinds(text))
+    assert [piece for piece, _, _, _ in pieces] == pretokenize(text)
+    for piece, _, start, end in pieces:
+        assert normalized[start:end] == piece
+    assert devanagari_words(text) == ["क़लम", "है"]
+
+
+def test_devanagari_range_is_shared():
+    assert DEVANAGARI_RANGE == "ऀ-ॿ"
+    assert _DISALLOWED_CHARS.sub("", "नमस्ते™ abc") == "नमस्ते abc"
@@ -0,0 +1,83 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from app.progress_pages import etag_for, growth_page, progress_page
+
+
+def make_progress(steps):
+    return {
+        "segmentation": "char",
+        "steps": [{"step": i + 1, "new_token": f"t{i}"} for i in range(steps)],
+        "metrics": {
+            # One leading entry for the initial vocabulary, then one per merge
+            "vocab_sizes": list(range(100, 101 + steps)),
+            "compression_ratios": [1.0 + i / 10 for i in range(steps)],
+        },
+    }
+
+
+def make_growth(steps):
+    return {
+        "tokens": [f"t{i}" for i in range(steps)],
+        "frequencies": list(range(steps, 0, -1)),
+    }
+
+
+@pytest.mark.parametrize("limit", [1, 3, 7, None])
+def test_progress_pages_rebuild_the_full_progress(limit):
+    progress = make_progress(7)
+    steps, metrics = [], {name: [] for name in progress["metrics"]}
+    since = 0
+    while True:
+        page = progress_page(progress, since, limit)
+        steps += page["steps"]
+        for name, values in page["metrics"].items():
+            metrics[name] += values
+        assert page["next"] > since or not page["has_more"]
+        since = page["next"]
+        if not page["has_more"]:
+            break
+    assert steps == progress["steps"]
+    assert metrics == progress["metrics"]
+    assert page["segmentation"] == "char"
+
+
+def test_progress_page_can_leave_out_steps():
+    page = progress_page(make_progress(5), 2, 2, include_steps=False)
+    assert "steps" not in page
+    assert page["metrics"]["compression_ratios"] == [1.2, 1.3]
+    assert (page["next"], page["has_more"]) == (4, True)
+
+
+def test_cursor_past_the_end_starts_over():
+    page = growth_page(make_growth(3), 10, 2)
+    assert page["reset"] is True
+    assert page["since"] == 0
+    assert page["vocab_growth"]["tokens"] == ["t0", "t1"]
+
+
+def test_caught_up_cursor_returns_an_empty_page():
+    page = growth_page(make_growth(3), 3, None)
+    assert page["vocab_growth"] == {"tokens": [], "frequencies": []}
+    assert (page["next"], page["has_more"], page["reset"]) == (3, False, False)
+
+
+@pytest.mark.parametrize("since, limit", [(-1, None), (0, 0), (0, -2)])
+def test_invalid_cursors_are_rejected(since, limit):
+    with pytest.raises(ValueError):
+        progress_page(make_progress(3), since, limit)
+    with pytest.raises(ValueError):
+        growth_page(make_growth(3), since, limit)
+
+
+@pytest.mark.parametrize("path", ["/training-progress", "/training-stats"])
+@pytest.mark.parametrize("params", [{"since": -1}, {"since": 0, "limit": 0}])
+def test_endpoints_reject_invalid_cursors(path, params):
+    client = TestClient(main.create_app(preload=[]))
+    assert client.get(path, params=params).status_code == 422
+
+
+def test_etag_changes_with_its_parts():
+    assert etag_for(1, "v1", 10) == etag_for(1, "v1", 10)
+    assert etag_for(1, "v1", 10) != etag_for(1, "v1", 11)
@@ -0,0 +1,90 @@
+import json
+import os
+
+import pytest
+
+from app.model_registry import ModelRegistry
+from app.response_cache import ResponseCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.monotonic; advance it by adding to clock[0]"""
+    now = [1000.0]
+    monkeypatch.setattr("app.response_cache.time.monotonic", lambda: now[0])
+    return now
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = ResponseCache(max_entries=10, ttl=5)
+    key = cache.key("bpe_model", "v1", "नमस्ते")
+    cache.put(key, {"tokens": ["नमस्ते"]})
+    clock[0] += 5
+    assert cache.get(key) == {"tokens": ["नमस्ते"]}
+    clock[0] += 0.1
+    assert cache.get(key) is None
+    assert len(cache) == 0
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"]) == (1, 1, 1)
+
+
+def test_oldest_entries_are_evicted(clock):
+    cache = ResponseCache(max_entries=2)
+    keys = [cache.key("bpe_model", "v1", text) for text in ["a", "b", "c"]]
+    cache.put(keys[0], 0)
+    cache.put(keys[1], 1)
+    cache.get(keys[0])  # now the most recently used
+    cache.put(keys[2], 2)
+    assert [cache.get(key) for key in keys] == [0, None, 2]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_keys_separate_models_versions_and_texts():
+    keys = {
+        ResponseCache.key("bpe_model", "v1", "text"),
+        ResponseCache.key("bpe_model", "v2", "text"),
+        ResponseCache.key("bpe_model_latest", "v1", "text"),
+        ResponseCache.key("bpe_model", "v1", "text "),
+    }
+    assert len(keys) == 4
+
+
+def test_invalidate_drops_one_model_or_everything():
+    cache = ResponseCache(max_entries=10)
+    cache.put(cache.key("a", "v1", "x"), 1)
+    cache.put(cache.key("a", "v1", "y"), 2)
+    cache.put(cache.key("b", "v1", "x"), 3)
+    cache.invalidate("a")
+    assert len(cache) == 1
+    assert cache.get(cache.key("b", "v1", "x")) == 3
+    cache.invalidate()
+    assert len(cache) == 0
+    assert cache.stats()["invalidations"] == 3
+
+
+def test_disabled_cache_stores_nothing():
+    cache = ResponseCache(max_entries=0)
+    key = cache.key("a", "v1", "x")
+    cache.put(key, 1)
+    assert cache.get(key) is None
+    assert cache.stats()["misses"] == 0
+
+
+def test_model_reload_invalidates_its_entries(tmp_path):
+    path = tmp_path / "bpe_model.json"
+    model = {"vocab": ["न"], "merges": {}, "merge_history": []}
+    path.write_text(json.dumps(model), encoding="utf-8")
+    registry = ModelRegistry(default_model="bpe_model", check_interval=0)
+    registry.register("bpe_model", str(path))
+    cache = ResponseCache(max_entries=10)
+    registry.on_reload(lambda name, version: cache.invalidate(name))
+
+    registry.get()
+    cache.put(cache.key("bpe_model", registry.version(), "न"), ["न"])
+    cache.put(cache.key("other", "v1", "न"), ["न"])
+    model["vocab"].append("म")
+    path.write_text(json.dumps(model), encoding="utf-8")
+    os.utime(path, ns=(10**18, 10**18))
+    registry.get()
+    assert len(cache) == 1
+    assert cache.get(cache.key("other", "v1", "न")) == ["न"]
@@ -0,0 +1,37 @@
+from app.dynamic_vocabulary_manager import DynamicVocabularyManager
+from app.token_frequency_tracker import TokenFrequencyTracker
+
+
+def test_get_delta_returns_changed_totals_once():
+    tracker = TokenFrequencyTracker()
+    tracker.update_frequencies(["क", "ख", "क"])
+    assert tracker.get_delta() == {"क": 2, "ख": 1}
+    assert tracker.get_delta() == {}
+
+    tracker.update_frequencies_from_counts({"क": 3, "ग": 1})
+    # Totals, not increments, of only the tokens that changed
+    assert tracker.get_delta() == {"क": 5, "ग": 1}
+    assert tracker.frequency("ख") == 1
+    assert tracker.frequency("missing") == 0
+    assert tracker.get_frequencies() == {"क": 5, "ख": 1, "ग": 1}
+    assert tracker.token_frequencies["क"] == 5
+
+
+def test_promote_adds_only_new_tokens_over_the_threshold():
+    manager = DynamicVocabularyManager(initial_vocabulary={"क"})
+    promoted = manager.promote({"क": 10, "ख": 3, "ग": 2}, threshold=2)
+    assert promoted == ["ख"]
+    assert manager.get_vocabulary() == {"क", "ख"}
+    assert manager.promote({"ख": 9}, threshold=2) == []
+
+
+def test_delta_promotion_matches_a_full_scan():
+    batches = [["क", "ख"] * 3, ["ग"] * 5 + ["ख"], ["घ", "क"] * 2]
+    tracker = TokenFrequencyTracker()
+    incremental = DynamicVocabularyManager(initial_vocabulary=set())
+    full = DynamicVocabularyManager(initial_vocabulary=set())
+    for batch in batches:
+        tracker.update_frequencies(batch)
+        incremental.promote(tracker.get_delta(), threshold=4)
+        full.update_vocabulary(tracker.get_frequencies(), threshold=4)
+        assert incremental.get_vocabulary() == full.get_vocabulary()
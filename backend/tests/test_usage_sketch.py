@@ -0,0 +1,121 @@
+import random
+import threading
+from collections import Counter
+
+import pytest
+
+from app.bpe_tokenizer import BPETokenizer
+from app.usage_sketch import CountMinTopK, ShardedUsageCounter, SpaceSaving
+
+
+def test_count_min_never_undercounts():
+    sketch = CountMinTopK(width=64, depth=3, k=5)
+    counts = Counter({f"token{i}": i % 7 + 1 for i in range(200)})
+    for token, count in counts.items():
+        sketch.add(token, count)
+    assert sketch.total == sum(counts.values())
+    for token, count in counts.items():
+        assert sketch.estimate(token) >= count
+
+
+def test_count_min_keeps_the_heaviest_tokens():
+    sketch = CountMinTopK(width=4096, depth=4, k=3)
+    for i in range(50):
+        sketch.add(f"rare{i}")
+    sketch.add("heavy", 100)
+    sketch.add("medium", 40)
+    sketch.add("light", 20)
+    top = sketch.most_common()
+    assert [token for token, _ in top] == ["heavy", "medium", "light"]
+    assert len(sketch.top_counts) == 3
+    assert sketch.most_common(1) == [("heavy", 100)]
+
+
+def test_count_min_rejects_empty_top_k():
+    with pytest.raises(ValueError):
+        CountMinTopK(k=0)
+
+
+def test_sharded_counter_includes_other_threads_buffered_counts():
+    counter = ShardedUsageCounter(flush_every=10**9, flush_interval=10**9)
+    counted = threading.Barrier(5)
+    release = threading.Event()
+
+    def worker(token):
+        counter.update([token] * 5)
+        counted.wait()
+        release.wait()
+
+    threads = [threading.Thread(target=worker, args=(f"t{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    counted.wait()
+    try:
+        # Nothing has been flushed yet; the reader must collect every shard
+        assert sorted(counter.most_common()) == [(f"t{i}", 5) for i in range(4)]
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join()
+
+
+def test_sharded_counter_estimate_includes_own_shard():
+    counter = ShardedUsageCounter(flush_every=10**9, flush_interval=10**9)
+    counter.update(["a", "a", "b"])
+    assert counter.estimate("a") == 2
+    counter.merge()
+    assert counter.estimate("a") == 2
+    assert counter.most_common(1) == [("a", 2)]
+
+
+def test_space_saving_is_exact_below_capacity():
+    sketch = SpaceSaving(capacity=100)
+    counts = Counter()
+    rng = random.Random(0)
+    for _ in range(2000):
+        key, count = rng.randrange(50), rng.randint(1, 5)
+        sketch.add(key, count)
+        counts[key] += count
+    assert sketch.counts == dict(counts)
+    assert [count for _, count in sketch.most_common(10)] == [
+        count for _, count in counts.most_common(10)
+    ]
+
+
+def test_space_saving_evicts_the_minimum_and_overestimates():
+    sketch = SpaceSaving(capacity=2)
+    sketch.update({"a": 5, "b": 1})
+    sketch.add("c", 2)
+    assert sketch.counts == {"a": 5, "c": 3}
+    assert sketch.errors["c"] == 1
+    assert sketch.most_common(1) == [("a", 5)]
+    assert len(sketch) == 2
+
+
+def test_space_saving_negative_counts_lower_and_drop_keys():
+    sketch = SpaceSaving(capacity=3)
+    sketch.update({"a": 5, "b": 2})
+    sketch.add("a", -3)
+    sketch.add("b", -2)
+    sketch.add("missing", -4)
+    assert sketch.counts == {"a": 2}
+    assert sketch.most_common() == [("a", 2)]
+
+
+def test_space_saving_fed_deltas_tracks_the_latest_counts():
+    sketch = SpaceSaving(capacity=1000)
+    rng = random.Random(1)
+    previous = {}
+    for _ in range(50):
+        current = {
+            (rng.choice("abcd"), rng.choice("abcd")): rng.randint(1, 30)
+            for _ in range(8)
+        }
+        sketch.update(BPETokenizer._pair_deltas(previous, current))
+        previous = current
+    assert sketch.counts == previous
+
+
+def test_space_saving_rejects_empty_capacity():
+    with pytest.raises(ValueError):
+        SpaceSaving(capacity=0)
@@ -0,0 +1,42 @@
+import random
+
+import numpy as np
+
+from app.vocab_selection import (
+    frequency_arrays,
+    sort_indices_by_frequency,
+    tokens_above_threshold,
+    top_k_indices,
+    top_k_tokens,
+)
+
+
+def sorted_reference(tokens, freqs, k, exclude=frozenset()):
+    ranked = sorted(range(len(tokens)), key=lambda i: freqs[i], reverse=True)
+    return [tokens[i] for i in ranked if tokens[i] not in exclude][:k]
+
+
+def test_top_k_matches_a_stable_sort_with_ties():
+    rng = random.Random(0)
+    for _ in range(50):
+        n = rng.randint(1, 60)
+        frequencies = {f"t{i}": rng.randint(0, 5) for i in range(n)}
+        tokens, freqs = frequency_arrays(frequencies)
+        exclude = frozenset(rng.sample(tokens, rng.randint(0, min(5, n))))
+        for k in (1, 3, n // 2, n, n + 5):
+            expected = sorted_reference(tokens, list(frequencies.values()), k, exclude)
+            assert top_k_tokens(tokens, freqs, k, exclude=exclude) == expected
+
+
+def test_top_k_indices_edge_cases():
+    freqs = np.array([3, 1, 3, 2], dtype=np.int64)
+    assert top_k_indices(freqs, 0).tolist() == []
+    assert top_k_indices(np.array([], dtype=np.int64), 3).tolist() == []
+    assert top_k_indices(freqs, 2).tolist() == [0, 2]
+    assert top_k_indices(freqs, 10).tolist() == [0, 2, 3, 1]
+    assert sort_indices_by_frequency(freqs).tolist() == [0, 2, 3, 1]
+
+
+def test_tokens_above_threshold_is_inclusive():
+    tokens, freqs = frequency_arrays({"a": 5, "b": 4, "c": 6})
+    assert tokens_above_threshold(tokens, freqs, 5) == ["a", "c"]
@@ -0,0 +1,86 @@
+import asyncio
+import contextlib
+import io
+import os
+from collections import Counter
+
+import pytest
+
+from app.bpe_tokenizer import BPETokenizer
+from app.word_tiers import TieredWordFreqs
+
+WORDS = ["क म"] * 5 + ["क ल"] * 2 + ["न म"] * 2 + ["ज ल"] + ["क म ल"]
+
+
+@pytest.mark.parametrize("buffer_words", [1, 2, 1000])
+def test_count_splits_words_into_tiers(buffer_words):
+    tiers = TieredWordFreqs(min_count=2, spill_below=3, buffer_words=buffer_words)
+    try:
+        hot = tiers.count(WORDS)
+        assert hot == {"क म": 5}
+        assert dict(tiers.tail_pass([]).items()) == {("क", "ल"): 2, ("न", "म"): 2}
+        stats = tiers.stats
+        assert (stats["hot_words"], stats["tail_words"], stats["pruned_words"]) == (
+            1,
+            2,
+            2,
+        )
+        assert stats["occurrences"] == len(WORDS)
+        assert stats["chars"] == sum(len(word.replace(" ", "")) for word in WORDS)
+        assert tiers.tail_symbols == {"क", "ल", "न", "म"}
+    finally:
+        tiers.close()
+
+
+def test_hot_words_keep_first_seen_order():
+    tiers = TieredWordFreqs(min_count=1, spill_below=0)
+    try:
+        assert list(tiers.count(["ब", "अ", "ब", "अ", "क"])) == ["ब", "अ", "क"]
+    finally:
+        tiers.close()
+
+
+def test_tail_pass_applies_pending_merges_and_counts_tokens():
+    tiers = TieredWordFreqs(min_count=1, spill_below=3)
+    try:
+        tiers.count(["क म ल", "क म ल", "क म", "न म"] + ["ज"] * 3)
+        assert tiers.tail_tokens == Counter()
+        pairs = tiers.tail_pass([("क", "म")])
+        assert pairs == {("कम", "ल"): 2, ("न", "म"): 1}
+        assert tiers.tail_tokens == {"कम": 3, "ल": 2, "न": 1, "म": 1}
+        # Merges are applied to the stored tail, not only to the counts
+        assert tiers.tail_pass([]) == pairs
+        assert tiers.passes == 2
+    finally:
+        tiers.close()
+
+
+def test_close_removes_the_spill_directory():
+    tiers = TieredWordFreqs(min_count=1, spill_below=2, buffer_words=1)
+    tiers.count(WORDS)
+    directory = tiers.directory
+    tiers.close()
+    assert not os.path.exists(directory)
+
+
+def test_training_metrics_include_the_tail(sample, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    tokenizer = BPETokenizer(
+        vocab_size=200, min_count=1, spill_below=3, tail_pass_interval=1
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(tokenizer.learn_bpe(sample))
+    metrics = tokenizer.training_progress["metrics"]
+
+    # With a tail pass after every merge the tail is never behind, so the
+    # metrics match counting the Devanagari words of the sample directly
+    words = tokenizer._get_word_frequencies(sample)
+    chars = sum(len(word.replace(" ", "")) * freq for word, freq in words.items())
+    assert metrics["compression_ratios"][0] == 1.0
+    assert metrics["compression_ratios"] == sorted(metrics["compression_ratios"])
+    merges = [tuple(step["pair"]) for step in tokenizer.merge_history]
+    step = len(merges) - 1  # ratio before the last merge
+    for pair in merges[:step]:
+        words = tokenizer._apply_merge(words, pair)
+    tokens = sum(len(word.split()) * freq for word, freq in words.items())
+    assert metrics["compression_ratios"][step] == chars / tokens
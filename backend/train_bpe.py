@@ -34,8 +34,26 @@ def load_sample_data(file_path: str, max_sentences: int = None) -> str:
     return "\n".join(sentences)
 
 
-async def train_and_save_bpe(text: str, vocab_size: int = 5000):
-    tokenizer = BPETokenizer(vocab_size=vocab_size)
+async def train_and_save_bpe(
+    text: str,
+    vocab_size: int = 5000,
+    profile: bool = False,
+    profile_dump: str = None,
+    segmentation: str = "char",
+    backend: str = "python",
+    heldout_path: str = None,
+    heldout_lines: int = 2000,
+    patience: int = 3,
+    min_count: int = 1,
+    spill_below: int = 0,
+):
+    tokenizer = BPETokenizer(
+        vocab_size=vocab_size,
+        segmentation=segmentation,
+        backend=backend,
+        min_count=min_count,
+        spill_below=spill_below,
+    )
     frequency_tracker = TokenFrequencyTracker()
     vocab_manager = DynamicVocabularyManager(initial_vocabulary=tokenizer.vocab)
     feedback_loop = FeedbackLoop(target_compression_ratio=1.5)
@@ -43,11 +61,51 @@ async def train_and_save_bpe(text: str, vocab_size: int = 5000):
     print("\nInitializing vocabulary...")
     tokenizer.initialize_vocab()
 
-    print("\nStarting BPE training...")
-    await tokenizer.learn_bpe(text, manager=vocab_manager)
+    # Optionally evaluate every checkpoint on held-out text and stop early
+    heldout_metrics = []
+    evaluator = on_checkpoint = None
+    if heldout_path:
+        from app.evaluation import EarlyStopping, HeldOutEvaluator, read_heldout
+
+        evaluator = HeldOutEvaluator(read_heldout([heldout_path], heldout_lines))
+        early_stopping = EarlyStopping(patience=patience)
+
+        def on_checkpoint(path, num_merges):
+            metrics = evaluator.evaluate(path)
+            metrics["merges"] = num_merges
+            heldout_metrics.append(metrics)
+            print(
+                f"Held-out after {num_merges} merges: "
+                f"{metrics['chars_per_token']} chars/token, "
+                f"{metrics['tokens_per_word']} tokens/word "
+                f"({metrics['seconds']}s)"
+            )
+            return early_stopping.update(metrics)
 
-    # Integrate feedback loop
-    feedback_loop.evaluate_and_adjust(tokenizer)
+    print("\nStarting BPE training...")
+    try:
+        await tokenizer.learn_bpe(
+            text,
+            manager=vocab_manager,
+            profile=profile,
+            profile_dump=profile_dump,
+            on_checkpoint=on_checkpoint,
+        )
+    finally:
+        if evaluator is not None:
+            evaluator.close()
+
+    # Integrate feedback loop: report when compression falls short of the target
+    compression_ratio = (
+        tokenizer.merge_history[-1].get("compression_ratio", 1.0)
+        if tokenizer.merge_history
+        else 1.0
+    )
+    if feedback_loop.evaluate_performance(compression_ratio):
+        print(
+            f"Compression ratio {compression_ratio} is below the target of "
+            f"{feedback_loop.target_compression_ratio}"
+        )
 
     # Save final model
     model_data = {
@@ -55,12 +113,20 @@ async def train_and_save_bpe(text: str, vocab_size: int = 5000):
         "merges": {" ".join(k): v for k, v in tokenizer.merges.items()},
         "merge_history": tokenizer.merge_history,
         "base_vocab_stats": tokenizer.base_vocab_stats,
+        "segmentation": tokenizer.segmentation,
+        "initial_symbols": sorted(tokenizer.initial_symbols),
         "training_stats": {
             "total_merges": len(tokenizer.merge_history),
             "final_vocab_size": len(tokenizer.vocab),
             "learned_vocab_size": len(tokenizer.learned_vocab),
         },
     }
+    if heldout_metrics:
+        model_data["heldout_metrics"] = heldout_metrics
+    if tokenizer.training_progress.get("profile") is not None:
+        model_data["profile"] = tokenizer.training_progress["profile"]
+    if "pruning" in tokenizer.training_progress:
+        model_data["pruning"] = tokenizer.training_progress["pruning"]
 
     with open("bpe_model.json", "w", encoding="utf-8") as f:
         json.dump(model_data, f, ensure_ascii=False, indent=2)
@@ -1,11 +1,29 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from 'recharts';
 import './styles.css';
 
+// Steps fetched per request while catching up with a long run
+const PAGE_SIZE = 1000;
+
+// Append a page of per-step metrics to what we already have
+const mergeProgress = (prev, page) => {
+    const { metrics, since, next, has_more, reset, ...summary } = page;
+    if (!prev || !prev.metrics) {
+        return { ...summary, metrics };
+    }
+    const merged = {};
+    Object.keys(metrics).forEach(key => {
+        merged[key] = (prev.metrics[key] || []).concat(metrics[key]);
+    });
+    return { ...prev, ...summary, metrics: merged };
+};
+
 const TrainingProgress = () => {
     const [progress, setProgress] = useState(null);
     const [selectedMetric, setSelectedMetric] = useState('compression_ratios');
     const [ws, setWs] = useState(null);
+    const cursorRef = useRef(0);
+    const etagRef = useRef(null);
 
     useEffect(() => {
         // Initial fetch
@@ -44,9 +62,25 @@ const TrainingProgress = () => {
 
     const fetchTrainingProgress = async () => {
         try {
-            const response = await fetch('http://localhost:8000/training-progress');
+            // Only ask for steps we have not seen; unchanged polls return 304
+            const headers = etagRef.current ? { 'If-None-Match': etagRef.current } : {};
+            const response = await fetch(
+                `http://localhost:8000/training-progress?since=${cursorRef.current}&limit=${PAGE_SIZE}&include_steps=false`,
+                { headers }
+            );
+            if (response.status === 304) return;
             const data = await response.json();
-            setProgress(data);
+            if (data.total_steps === undefined) {
+                setProgress(data);
+                return;
+            }
+            etagRef.current = response.headers.get('ETag');
+            const fresh = data.reset || data.since === 0;
+            setProgress(prevProgress => mergeProgress(fresh ? null : prevProgress, data));
+            cursorRef.current = data.next;
+            if (data.has_more) {
+                fetchTrainingProgress();
+            }
         } catch (error) {
             console.error('Error fetching training progress:', error);
         }
@@ -116,7 +150,8 @@ const TrainingProgress = () => {
     const TrainingStatus = ({ progress }) => {
         if (!progress) return null;
 
-        const isTraining = progress.steps?.length < progress.target_vocab_size;
+        const stepCount = progress.total_steps ?? progress.steps?.length ?? 0;
+        const isTraining = stepCount < progress.target_vocab_size;
         
         return (
             <div className={`training-status ${isTraining ? 'active' : ''}`}>
@@ -125,7 +160,7 @@ const TrainingProgress = () => {
                     {isTraining ? 'Training in Progress' : 'Training Complete'}
                 </span>
                 <div className="progress-details">
-                    <span>{progress.steps?.length || 0} / {progress.target_vocab_size}</span>
+                    <span>{stepCount} / {progress.target_vocab_size}</span>
                 </div>
             </div>
         );
@@ -191,7 +226,7 @@ const TrainingProgress = () => {
                     <div className="summary-stats">
                         <div>Initial Vocabulary: {progress.initial_vocab_size}</div>
                         <div>Target Vocabulary: {progress.target_vocab_size}</div>
-                        <div>Current Step: {progress.steps?.length || 0}</div>
+                        <div>Current Step: {progress.total_steps ?? progress.steps?.length ?? 0}</div>
                     </div>
                 )}
             </div>